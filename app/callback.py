@@ -2,29 +2,51 @@
 Root-level CLI options and callbacks for the application.
 
 This module defines the main callback function that handles global options
-(e.g., --version) for the CLI. It is intended to be used as the top-level
+(e.g., --version, --profile) for the CLI. It is intended to be used as the top-level
 callback for the Typer app, allowing global flags to be processed even when
 no subcommand is provided.
 """
+import os
 
 import typer
 
 from app import __app_name__, __version__
+from app.core import PROFILE_ENV, PROFILE_DUMP_ENV
+from app.core import profiling
 
 def callback(
+    ctx: typer.Context,
     version: bool = typer.Option(
         None,
         "--version",
         help="Show the application's version and exit.",
         is_eager=True
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print how long every phase of the command took to the standard" \
+        f" error. Can also be enabled with the {PROFILE_ENV} environment variable."
+    ),
+    profile_dump: str | None = typer.Option(
+        None,
+        "--profile-dump",
+        help="Profile the command with cProfile and write its statistics to" \
+        f" the given file. Can also be set with the {PROFILE_DUMP_ENV}" \
+        " environment variable."
     )
 ):
     """
     CLI callback function for handling global options.
 
     Args:
+        ctx (typer.Context): Context of the invoked command.
         version (bool): If provided, prints the application version and exits 
                         immediately.
+        profile (bool): Whether to report the time of phases of the command,
+                        see `app.core.profiling`.
+        profile_dump (str | None): File to write cProfile statistics of the
+                                   command to.
 
     This function is intended to be passed to `typer.Typer(callback=...)` and
     allows the app to respond to top-level flags like `--version`, even if no
@@ -32,4 +54,9 @@ def callback(
     """
     if version:
         print(f"{__app_name__} v{__version__}")
-        raise typer.Exit()
\ No newline at end of file
+        raise typer.Exit()
+
+    profile_dump = profile_dump or os.environ.get(PROFILE_DUMP_ENV)
+    if profile or profile_dump or os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+        profiling.start(profile_dump)
+        ctx.call_on_close(lambda: profiling.report(ctx.invoked_subcommand))
@@ -5,19 +5,51 @@ This module initializes the Typer application, registers subcommands, and
 attaches the root-level callback to handle global options such as --version.
 
 Subcommands are organized in separate modules under the `commands` package
-and are registered here using `app.add_typer(...)`.
+and are registered here by name in `COMMANDS`. A command module is imported
+only when its command is invoked (or listed in help), so running one command
+does not pay for importing the others and their dependencies.
 """
+import importlib
+import time
 
 import typer
+from typer.core import TyperGroup
 
 from app.callback import callback
-from app.commands.init import app as init_app
-from app.commands.add import app as add_app
-from app.commands.list import app as list_app
-from app.commands.delete import app as delete_app
-from app.commands.status import app as status_app
+from app.core import profiling
+
+COMMANDS = {
+    "init": "app.commands.init",
+    "add": "app.commands.add",
+    "import": "app.commands.import_notes",
+    "export": "app.commands.export",
+    "list": "app.commands.list",
+    "delete": "app.commands.delete",
+    "status": "app.commands.status",
+    "compact": "app.commands.compact",
+    "migrate": "app.commands.migrate",
+    "search": "app.commands.search",
+    "serve": "app.commands.serve"
+}
+
+class LazyGroup(TyperGroup):
+    """
+    Group of the application's commands, which loads a command from its
+    module in `COMMANDS` when it is first needed.
+    """
+    def list_commands(self, ctx):
+        return [*COMMANDS, *(name for name in self.commands if name not in COMMANDS)]
+
+    def get_command(self, ctx, cmd_name: str):
+        if cmd_name not in self.commands and cmd_name in COMMANDS:
+            start = time.perf_counter()
+            module = importlib.import_module(COMMANDS[cmd_name])
+            self.commands[cmd_name] = typer.main.get_command(module.app)
+            profiling.add(profiling.IMPORT, time.perf_counter() - start)
+        return self.commands.get(cmd_name)
 
 app = typer.Typer(
+    cls=LazyGroup,
     help="A simple CLI to manage notes.",
     callback=callback,
     invoke_without_command=True,
@@ -25,9 +57,3 @@ app = typer.Typer(
     add_help_option=True,
     no_args_is_help=True
 )
-
-app.add_typer(init_app)
-app.add_typer(add_app)
-app.add_typer(list_app)
-app.add_typer(delete_app)
-app.add_typer(status_app)
\ No newline at end of file
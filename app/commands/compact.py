@@ -0,0 +1,58 @@
+"""
+Compact command for the note application.
+
+This module defines the `compact` command which merges the repository journal
+into the repository file. It can also enable or disable journaling and
+compression for an existing repository.
+"""
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.repository import compact_repository, compression_report
+
+app = typer.Typer()
+
+@app.command()
+def compact(
+    journal: Annotated[
+        bool | None,
+        typer.Option(
+            "--journal/--no-journal",
+            help="Enable or disable journaling for the repository."
+        )
+    ] = None,
+    compression: Annotated[
+        str | None,
+        typer.Option(
+            "--compression",
+            "-c",
+            help="Compress the repository file with 'zlib', 'gzip' or 'lzma'," \
+            " or store it uncompressed with 'none'."
+        )
+    ] = None,
+    report: Annotated[
+        bool,
+        typer.Option(
+            "--report",
+            "-r",
+            help="Show the size of the repository file and the time needed to" \
+            " write and read it with every compression, without changing it."
+        )
+    ] = False
+):
+    """
+    Merge journaled changes into the repository file.
+
+    With journaling enabled, commands append their changes to a journal
+    instead of rewriting the repository. The journal is compacted
+    automatically when it grows large, run this command to do it now.
+    """
+    try:
+        if report:
+            compression_report()
+            return
+        merged = compact_repository(journal, compression)
+        print(f"Compacted repository, merged {merged} journal entries.")
+    except NoteAppError as error:
+        print(error)
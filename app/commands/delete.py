@@ -1,29 +1,81 @@
 """
 Delete command for the note application.
 
-This module defines the `delete` command which deletes note from repository.
+This module defines the `delete` command which deletes notes from repository,
+given by their ids, ranges of ids or filters.
 """
 import typer
 from typing_extensions import Annotated
 
 from app.core.errors import NoteAppError
-from app.core.repository import delete_note
+from app.core.repository import delete_notes
 
 app = typer.Typer()
 
 @app.command()
 def delete(
-    id: Annotated[
-        int,
+    ids: Annotated[
+        list[str] | None,
         typer.Argument(
-            help="ID of note to delete."
+            help="IDs of notes to delete, or ranges of IDs like 10-250."
         )
-    ]
+    ] = None,
+    tag_filter: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--tag",
+            "-t",
+            help="Delete notes with given tag. Can be used sequentially" \
+            " to delete notes that match any of given tags."
+        )
+    ] = None,
+    status_filter: Annotated[
+        str | None,
+        typer.Option(
+            "--status",
+            "-s",
+            help="Delete notes with given status."
+        )
+    ] = None,
+    where: Annotated[
+        str | None,
+        typer.Option(
+            "--where",
+            "-w",
+            help="Delete notes matching a filter of tag:NAME and status:NAME" \
+            " terms combined with AND, OR, NOT and parentheses."
+        )
+    ] = None
 ):
     """
-    Delete note with specified ID.
+    Delete notes with specified IDs or matching filters.
+
+    Notes are given by their IDs and ranges of IDs, like `note delete 3 7
+    10-250`, or by filters like in `note list`, for example `note delete
+    --tag obsolete --status DONE`. All notes are deleted at once.
     """
+    if ids and (tag_filter or status_filter or where):
+        print("You must not give note IDs together with filters -t, -s and -w.")
+        raise typer.Exit()
+    if not ids and not (tag_filter or status_filter or where):
+        print("Give IDs of notes to delete or filters -t, -s and -w.")
+        raise typer.Exit()
+
     try:
-        delete_note(id)
+        note_ids, ranges = _parse_ids(ids or [])
+        delete_notes(note_ids, ranges, tag_filter, status_filter, where)
     except NoteAppError as error:
-        print(error)
\ No newline at end of file
+        print(error)
+
+def _parse_ids(ids: list[str]):
+    note_ids = []
+    ranges = []
+    for value in ids:
+        first, separator, last = value.partition("-")
+        if not first.isdigit() or (separator and not last.isdigit()):
+            raise NoteAppError(f"'{value}' is not a note ID nor a range of IDs like 10-250.")
+        if separator:
+            ranges.append((int(first), int(last)))
+        else:
+            note_ids.append(int(first))
+    return note_ids, ranges
@@ -0,0 +1,101 @@
+"""
+Export command for the note application.
+
+This module defines the `export` command which writes notes to a file or the
+standard output in a format readable by other tools.
+"""
+import sys
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.exporter import detect_format
+from app.core.repository import export_notes
+from app.core.utils import discard_stdout
+
+app = typer.Typer()
+
+@app.command()
+def export(
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            help="File to export notes to. Notes are written to the standard" \
+            " output if it is not given or is '-'."
+        )
+    ] = None,
+    output_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Format of the notes, 'jsonl', 'csv' or 'md'. Detected from" \
+            " the file extension by default, jsonl for other files and the" \
+            " standard output."
+        )
+    ] = None,
+    tag_filter: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--tag",
+            "-t",
+            help="Export only notes with given tag. Can be used sequentially" \
+            " to export notes that match any of given tags."
+        )
+    ] = None,
+    status_filter: Annotated[
+        str | None,
+        typer.Option(
+            "--status",
+            "-s",
+            help="Export only notes with given status."
+        )
+    ] = None,
+    where: Annotated[
+        str | None,
+        typer.Option(
+            "--where",
+            "-w",
+            help="Export only notes matching a filter of tag:NAME and" \
+            " status:NAME terms combined with AND, OR, NOT and parentheses."
+        )
+    ] = None
+):
+    """
+    Export notes to a file or the standard output.
+
+    Notes are written in display order in one of the formats: 'jsonl' with a
+    JSON object per line, which `note import` reads back, 'csv' with a header
+    row and 'id', 'content', 'tags' and 'status' columns, or 'md' with a
+    Markdown table. Notes are written as they are read, so the output can be
+    piped to other tools.
+    """
+    if output is not None and str(output) == "-":
+        output = None
+    output_format = output_format or detect_format(output)
+
+    if output is None:
+        try:
+            export_notes(sys.stdout, output_format, tag_filter, status_filter, where)
+            sys.stdout.flush()
+        except NoteAppError as error:
+            print(error)
+        except BrokenPipeError:
+            discard_stdout()
+        return
+
+    try:
+        with output.open("w", encoding="utf-8", newline="") as file:
+            count = export_notes(file, output_format, tag_filter, status_filter, where)
+    except OSError as error:
+        print(f"Cannot write exported notes. {error}")
+        return
+    except NoteAppError as error:
+        output.unlink(missing_ok=True)
+        print(error)
+        return
+    print(f"Exported {count} notes to {output}.")
@@ -0,0 +1,85 @@
+"""
+Import command for the note application.
+
+This module defines the `import` command which adds many notes at once,
+read from a file or the standard input.
+"""
+import sys
+import time
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.importer import detect_format, read_notes
+from app.core.repository import import_notes as import_repository_notes
+from app.core.utils import parse_tags
+
+app = typer.Typer()
+
+@app.command("import")
+def import_notes(
+    source: Annotated[
+        Path | None,
+        typer.Argument(
+            help="File to import notes from. Notes are read from the standard" \
+            " input if it is not given or is '-'."
+        )
+    ] = None,
+    input_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Format of the notes, 'jsonl', 'csv' or 'text'. Detected from" \
+            " the file extension by default, text for other files and the" \
+            " standard input."
+        )
+    ] = None,
+    tags: Annotated[
+        str | None,
+        typer.Option(
+            "--tags",
+            "-t",
+            help="Tags added to imported notes which do not have their own." \
+            " Should be a string of comma separated values with no white" \
+            " characters between."
+        )
+    ] = None,
+    status: Annotated[
+        str | None,
+        typer.Option(
+            "--status",
+            "-s",
+            help="Status added to imported notes which do not have their own."
+        )
+    ] = None
+):
+    """
+    Import notes from a file or the standard input.
+
+    Notes are read in one of the formats: 'jsonl' with a JSON object per
+    line, like {"content": "Buy milk", "tags": ["home"], "status": "TODO"},
+    'csv' with a header row and 'content', 'tags' and 'status' columns, or
+    'text' with the content of a note per line. All notes are added at once,
+    if any of them is not valid no note is added.
+    """
+    if source is not None and str(source) == "-":
+        source = None
+
+    try:
+        tags_list = parse_tags(tags) if tags is not None else None
+        input_format = input_format or detect_format(source)
+        start = time.perf_counter()
+        if source is None:
+            count = import_repository_notes(read_notes(sys.stdin, input_format, tags_list, status))
+        else:
+            with source.open("r", encoding="utf-8", newline="") as file:
+                count = import_repository_notes(read_notes(file, input_format, tags_list, status))
+        elapsed = time.perf_counter() - start
+        print(f"Imported {count} notes in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.0f} notes per second).")
+    except OSError as error:
+        print(f"Cannot read notes to import. {error}")
+    except NoteAppError as error:
+        print(error)
@@ -6,19 +6,41 @@ for storing notes. It typically creates a `.notes` file in the current
 directory.
 """
 import typer
+from typing_extensions import Annotated
 
+from app.core.errors import NoteAppError
 from app.core.repository import create_repository
+from app.core.storage import DEFAULT_ENGINE
 
 app = typer.Typer()
 
 @app.command()
-def init():
+def init(
+    journal: Annotated[
+        bool,
+        typer.Option(
+            "--journal",
+            "-j",
+            help="Append changes to a journal instead of rewriting the whole" \
+            " repository file on every command."
+        )
+    ] = False,
+    engine: Annotated[
+        str,
+        typer.Option(
+            "--engine",
+            "-e",
+            help="Storage engine used for the repository, 'json', 'sqlite', 'binary'" \
+            " or 'segmented'."
+        )
+    ] = DEFAULT_ENGINE
+):
     """
     Initialize empty notes repository in working directory.
     """
     try:
-        repository = create_repository()
+        repository = create_repository(journal, engine)
         print(f"Initialized empty notes repository in {repository}")
-    except FileExistsError as error:
+    except (FileExistsError, NoteAppError) as error:
         print(error)
-    
\ No newline at end of file
+    
@@ -2,17 +2,24 @@
 List command for the note application.
 
 This module defines the `list` command, which displays notes from the current
-repository. Notes can be optionally filtered by tags. If no filter is provided,
-all notes in the repository are listed.
+repository. Notes can be optionally filtered by tags and status, or with a
+boolean filter combining them. If no filter is provided, all notes in the
+repository are listed.
 """
+import sys
+from pathlib import Path
+
 import typer
 from typing_extensions import Annotated
 
 from app.core.errors import NoteAppError
-from app.core.repository import list_notes, list_tags, list_statuses
+from app.core.repository import list_notes, list_all_notes, list_tags, list_statuses
+from app.core.utils import discard_stdout
 
 app = typer.Typer()
 
+PAGE_SIZE = 20
+
 @app.command()
 def list(
     tag_filter: Annotated[
@@ -24,6 +31,77 @@ def list(
             " to display notes that match any of given tags."
         )
     ] = None,
+    status_filter: Annotated[
+        str | None,
+        typer.Option(
+            "--status",
+            "-s",
+            help="List only notes with given status."
+        )
+    ] = None,
+    where: Annotated[
+        str | None,
+        typer.Option(
+            "--where",
+            "-w",
+            help="List only notes matching a filter of tag:NAME and status:NAME" \
+            " terms combined with AND, OR, NOT and parentheses."
+        )
+    ] = None,
+    limit: Annotated[
+        int | None,
+        typer.Option(
+            "--limit",
+            "-n",
+            min=1,
+            help="Maximum number of notes to display. Notes are displayed in" \
+            f" pages of {PAGE_SIZE} with --page if it is not given."
+        )
+    ] = None,
+    offset: Annotated[
+        int,
+        typer.Option(
+            "--offset",
+            min=0,
+            help="Number of notes to skip before the displayed ones."
+        )
+    ] = 0,
+    page: Annotated[
+        int | None,
+        typer.Option(
+            "--page",
+            "-p",
+            min=1,
+            help="Number of the page of notes to display, starting from 1."
+        )
+    ] = None,
+    output_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Print notes, tags or statuses in a machine-readable format," \
+            " 'plain', 'tsv', 'json' or 'ndjson', instead of a table."
+        )
+    ] = None,
+    recursive: Annotated[
+        Path | None,
+        typer.Option(
+            "--recursive",
+            "-r",
+            help="List notes of all repositories in the directory PATH and" \
+            " its subdirectories, with the path of their repository.",
+            metavar="PATH"
+        )
+    ] = None,
+    pager: Annotated[
+        bool,
+        typer.Option(
+            "--pager",
+            help="Display notes in the pager set in the PAGER environment" \
+            " variable, `less -R` by default."
+        )
+    ] = False,
     tags_only: Annotated[
         bool,
         typer.Option(
@@ -46,20 +124,52 @@ def list(
 
     If no filter is provided, all notes will be displayed. Use the `--tag` option
     to filter notes by one or more tags. Only notes that have at least one of the 
-    specified tags will be shown.
+    specified tags will be shown. Use the `--status` option to show only notes
+    with the given status, and the `--where` option for filters like
+    "tag:bug AND (status:OPEN OR tag:urgent) AND NOT tag:wontfix".
+
+    Long listings can be split into pages with `--page`, or with `--limit`
+    and `--offset`, and browsed with `--pager`. Rows are displayed as soon as
+    their notes are read. Use `--format` to print notes for other programs,
+    for example `note list -f tsv | cut -f 2`. Use `--recursive PATH` to
+    list notes of every repository found under PATH, for example
+    `note list -r ~/projects -t todo`.
     """
     
     options_only = [tags_only, statuses_only]
     if tag_filter and any(options_only):
         print("You must not use -T nor -S options with tag filter -t.") # TODO add test for that
         raise typer.Exit()
+    if (status_filter or where) and any(options_only):
+        print("You must not use -T nor -S options with filters -s and -w.")
+        raise typer.Exit()
+    if (limit or offset or page or pager) and any(options_only):
+        print("You must not use -T nor -S options with --limit, --offset, --page and --pager.")
+        raise typer.Exit()
+    if recursive is not None and (any(options_only) or output_format):
+        print("You must not use -T, -S nor --format options with --recursive.")
+        raise typer.Exit()
+    if output_format and pager:
+        print("You must not use --pager together with --format.")
+        raise typer.Exit()
+    if page and offset:
+        print("You must not use --page together with --offset.")
+        raise typer.Exit()
+    if page:
+        limit = limit or PAGE_SIZE
+        offset = (page - 1) * limit
     
     try:
-        if not any(options_only):
-            list_notes(tag_filter)
+        if recursive is not None:
+            list_all_notes(recursive, tag_filter, status_filter, where, limit, offset, pager)
+        elif not any(options_only):
+            list_notes(tag_filter, status_filter, where, limit, offset, pager, output_format)
         if tags_only:
-            list_tags()
+            list_tags(output_format)
         if statuses_only:
-            list_statuses()
+            list_statuses(output_format)
+        sys.stdout.flush()
     except NoteAppError as error:
         print(error)
+    except BrokenPipeError:
+        discard_stdout()
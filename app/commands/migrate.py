@@ -0,0 +1,42 @@
+"""
+Migrate command for the note application.
+
+This module defines the `migrate` command which converts the repository in
+the current directory to another storage engine.
+"""
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.repository import migrate_repository
+
+app = typer.Typer()
+
+@app.command()
+def migrate(
+    engine: Annotated[
+        str,
+        typer.Option(
+            "--engine",
+            "-e",
+            help="Storage engine to convert the repository to, 'json', 'sqlite'," \
+            " 'binary' or 'segmented'."
+        )
+    ]
+):
+    """
+    Convert the repository to another storage ENGINE.
+
+    The 'json' engine keeps the repository in a single JSON file. The 'sqlite'
+    engine keeps notes, tags and statuses in indexed tables, so changes to
+    large repositories do not rewrite the whole file. The 'binary' engine
+    stores tags and statuses once and refers to them from notes, which makes
+    the repository file smaller and faster to read. The 'segmented' engine
+    splits notes into small segment files, so commands read only the
+    segments they need.
+    """
+    try:
+        source = migrate_repository(engine)
+        print(f"Migrated repository from {source} to {engine} storage engine.")
+    except NoteAppError as error:
+        print(error)
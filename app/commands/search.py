@@ -0,0 +1,63 @@
+"""
+Search command for the note application.
+
+This module defines the `search` command, which finds notes by their content
+using the full-text index of the repository, or of all repositories under
+the current directory.
+"""
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.repository import search_notes, search_all_notes
+
+app = typer.Typer()
+
+@app.command()
+def search(
+    query: Annotated[
+        str,
+        typer.Argument(
+            help="Words to search for. Put a phrase in double quotes to match" \
+            " it as written, end a word with * to match words starting with it."
+        )
+    ],
+    limit: Annotated[
+        int,
+        typer.Option(
+            "--limit",
+            "-n",
+            min=1,
+            help="Maximum number of notes to display."
+        )
+    ] = 20,
+    all_repositories: Annotated[
+        bool,
+        typer.Option(
+            "--all",
+            "-a",
+            help="Search all repositories in the current directory and its" \
+            " subdirectories."
+        )
+    ] = False
+):
+    """
+    Search notes by their content.
+
+    Notes containing every word of the QUERY are displayed, best matches
+    first. For example `note search 'report "next week" meet*'` finds notes
+    with the word 'report', the phrase 'next week' and a word starting with
+    'meet'.
+
+    With `--all` notes of every repository found under the current directory
+    are searched and displayed with the path of their repository.
+    """
+    try:
+        if all_repositories:
+            search_all_notes(Path(), query, limit)
+        else:
+            search_notes(query, limit)
+    except NoteAppError as error:
+        print(error)
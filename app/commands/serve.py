@@ -0,0 +1,44 @@
+"""
+Serve command for the note application.
+
+This module defines the `serve` command, which runs a server keeping the
+repository loaded in memory. While it runs, other commands send their
+requests to it instead of loading the repository themselves.
+"""
+import typer
+from typing_extensions import Annotated
+
+from app.core.errors import NoteAppError
+from app.core.server import NoteServer, stop_server
+
+app = typer.Typer()
+
+@app.command()
+def serve(
+    stop: Annotated[
+        bool,
+        typer.Option(
+            "--stop",
+            help="Stop the server running for the repository."
+        )
+    ] = False
+):
+    """
+    Serve the repository to other note commands until stopped.
+
+    The server keeps the repository loaded and listens on the `.notes.sock`
+    socket next to it. Commands run in the repository directory send their
+    requests to the server, which saves changes before responding. Stop the
+    server with `note serve --stop`, Ctrl+C or SIGTERM.
+    """
+    try:
+        if stop:
+            if not stop_server():
+                print("There is no note server running for this repository.")
+            return
+        with NoteServer() as server:
+            server.preload()
+            print(f"Serving notes repository on {server.path.absolute()}. Run `note serve --stop` to stop.", flush=True)
+            server.serve()
+    except NoteAppError as error:
+        print(error)
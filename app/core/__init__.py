@@ -1,7 +1,22 @@
 REPOSITORY_FILENAME = ".notes"
+JOURNAL_FILENAME = ".notes.journal"
+JOURNAL_COMPACTION_SIZE = 4 * 1024 * 1024
+SEGMENTS_DIRNAME = ".notes.segments"
+TAG_INDEX_FILENAME = ".notes.tags"
+SEARCH_INDEX_FILENAME = ".notes.search"
+LOCK_FILENAME = ".notes.lock"
+SOCKET_FILENAME = ".notes.sock"
+PENDING_DIRNAME = ".notes.pending"
+CACHE_DIR_ENV = "NOTE_CACHE_DIR"
+GROUP_COMMIT_ENV = "NOTE_GROUP_COMMIT"
+PROFILE_ENV = "NOTE_PROFILE"
+PROFILE_DUMP_ENV = "NOTE_PROFILE_DUMP"
 REPOSITORY_TEMPLATE = {
     "notes": [],
     "config": {
-        "statuses": {}
+        "statuses": {},
+        "journal": False,
+        "compression": None,
+        "next_id": 1
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,113 @@
+"""
+Client of the note server started with `note serve` (see `app.core.server`).
+
+When a server is running for the repository, commands send their requests to
+it through the `.notes.sock` Unix socket next to the repository instead of
+loading the repository themselves. A request and its response are single
+lines of JSON sent over a new connection. The response holds the output of
+the request, printed by the client as it is, and the error message if the
+request failed.
+
+If there is no socket, or nothing listens on it, commands run as usual.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+from app.core import SOCKET_FILENAME
+from app.core import storage, profiling
+from app.core.errors import NoteAppError
+
+def socket_path() -> Path:
+    return storage.repository.parent / SOCKET_FILENAME
+
+def supported():
+    import socket
+
+    return hasattr(socket, "AF_UNIX")
+
+def connect():
+    """
+    Connects to the server of the repository in the current directory.
+
+    Returns:
+        socket.socket | None: The connection, or None if no server is running.
+    """
+    # The socket module is imported only when there is a socket, since
+    # commands check for a server every time they run.
+    path = socket_path()
+    if not path.exists() or not supported():
+        return None
+    import socket
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(str(path))
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+def send(connection: "socket.socket", message: dict):
+    connection.sendall(json.dumps(message).encode() + b"\n")
+
+def receive(connection: "socket.socket"):
+    """
+    Reads a message sent with `send`.
+
+    Returns:
+        dict | None: The message, or None if the connection was closed
+                     before a whole message was received.
+    """
+    with connection.makefile("rb") as file:
+        line = file.readline()
+    if not line.endswith(b"\n"):
+        return None
+    return json.loads(line)
+
+def forward(method: str, *args):
+    """
+    Sends a request to the server of the repository, if one is running, and
+    prints its output.
+
+    Args:
+        method (str): Name of the `Repository` method handling the request.
+        *args: Arguments of the method, which have to be JSON serializable.
+
+    Raises:
+        NoteAppError: If the request failed.
+
+    Returns:
+        bool: Whether the request was handled by a server.
+    """
+    connection = connect()
+    if connection is None:
+        return False
+
+    with connection, profiling.span("server request"):
+        send(connection, {"method": method, "args": args, "terminal": _terminal()})
+        response = receive(connection)
+    if response is None:
+        raise NoteAppError("The note server closed the connection before responding. Run the command again to see whether it was applied.")
+
+    sys.stdout.write(response["output"])
+    sys.stdout.flush()
+    if response["error"] is not None:
+        raise NoteAppError(response["error"])
+    return True
+
+def _terminal():
+    """
+    Describes the standard output, so the server renders output as it would
+    be rendered by the command itself.
+    """
+    columns = os.environ.get("COLUMNS")
+    width = int(columns) if columns and columns.isdigit() else None
+    is_terminal = sys.stdout.isatty()
+    if is_terminal and width is None:
+        try:
+            width = os.get_terminal_size(sys.stdout.fileno()).columns
+        except OSError:
+            pass
+    return {"width": width, "is_terminal": is_terminal}
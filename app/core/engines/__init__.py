@@ -0,0 +1,254 @@
+"""
+Storage engines used to persist the note repository.
+
+A storage engine knows how to create, load and save a repository kept in a
+single repository file. The engine of an existing repository is detected from
+the first bytes of its file, so commands work the same regardless of the
+engine chosen with `note init --engine` or `note migrate --engine`. Files
+compressed with one of the compressions in `app.core.engines.compression`
+are detected by their magic bytes and the engine is detected from their
+decompressed content.
+"""
+import os
+import stat
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator
+
+from app.core.engines.compression import Compression, detect_compression
+from app.core.errors import NoteAppError, RepositoryCorruptedError
+
+HEADER_SIZE = 16
+
+class StorageEngine(ABC):
+    """
+    Base class for storage engines.
+
+    Engines operate on the repository dictionary used by `Repository`, with
+    'notes' and 'config' fields. Changes are passed to `save` as operation
+    records (see `app.core.operations`), which lets engines persist only what
+    changed instead of rewriting the whole repository.
+
+    Engines with `supports_compression` set write the repository compressed
+    as chosen by the 'compression' field of the repository configuration.
+    """
+    name: str
+    supports_compression = False
+
+    def __init__(self, path: Path, compression: Compression | None = None):
+        self.path = path
+        self.compression = compression
+
+    @staticmethod
+    @abstractmethod
+    def matches(header: bytes) -> bool:
+        """
+        Checks whether a repository file starting with header uses this engine.
+        """
+
+    @abstractmethod
+    def create(self, notes_repository: dict):
+        """
+        Creates a new repository file with the given content.
+
+        Raises:
+            FileExistsError: If the repository file already exists.
+        """
+
+    @abstractmethod
+    def load(self) -> dict:
+        """
+        Loads the whole repository as a dictionary.
+
+        Raises:
+            RepositoryCorruptedError: If the repository file cannot be read.
+        """
+
+    @abstractmethod
+    def save(self, notes_repository: dict | None, changes: list[dict] | None = None):
+        """
+        Saves the repository. If changes are provided, they describe every
+        operation applied to the loaded repository to get notes_repository.
+
+        If notes_repository is None, the repository was not loaded and the
+        engine applies changes to the stored repository itself.
+        """
+
+    def load_metadata(self) -> dict:
+        """
+        Loads the repository without notes, reading as little of the
+        repository file as the engine allows.
+        """
+        notes_repository = self.load()
+        notes_repository.pop("notes", None)
+        return notes_repository
+
+    def load_config(self) -> dict:
+        """
+        Loads the repository configuration without loading notes if the
+        engine allows it.
+        """
+        notes_repository = self.load_metadata()
+        if "config" not in notes_repository.keys():
+            raise RepositoryCorruptedError("Notes repository does not contain field 'config'.")
+        return notes_repository["config"]
+
+    def iter_notes(self, tag_filter: list[str] | None = None) -> Iterator[tuple[int, dict]]:
+        """
+        Yields notes in display order as (index, note) pairs, where index is
+        the position of the note in the whole repository. If tag_filter is
+        provided, only notes with at least one of the given tags are yielded.
+
+        Engines override this to read notes incrementally, so listing does
+        not require the whole repository in memory.
+        """
+        for idx, note in enumerate(self.load()["notes"]):
+            if note_matches(note, tag_filter):
+                yield idx, note
+
+    def iter_notes_at(self, positions: list[int]) -> Iterator[tuple[int, dict]]:
+        """
+        Yields notes at the given sorted positions as (index, note) pairs.
+
+        Engines override this to skip reading notes at other positions.
+        """
+        if not positions:
+            return
+        wanted = set(positions)
+        for idx, note in self.iter_notes():
+            if idx in wanted:
+                yield idx, note
+            if idx >= positions[-1]:
+                return
+
+    def count_notes(self) -> int | None:
+        """
+        Counts notes in the repository without loading them.
+
+        Returns:
+            int | None: Number of notes, or None if the engine cannot count
+                        them without loading the whole repository.
+        """
+        return None
+
+    def compact(self, notes_repository: dict) -> int:
+        """
+        Rewrites the repository in its most compact form.
+
+        Returns:
+            int: Number of journal entries merged into the repository file.
+        """
+        self.save(notes_repository)
+        return 0
+
+    def replace(self, path: Path):
+        """
+        Moves the repository to path, replacing the repository there. Used
+        to put a migrated repository in place of the original one.
+        """
+        os.replace(self.path, path)
+        self.path = path
+
+    def cleanup(self):
+        """
+        Removes files kept by the engine next to the repository file. Called
+        after the repository has been migrated to another engine.
+        """
+
+    def close(self):
+        """
+        Releases resources held by the engine.
+        """
+
+def note_matches(note: dict, tag_filter: list[str] | None):
+    if not tag_filter:
+        return True
+    return bool(note["tags"]) and not set(note["tags"]).isdisjoint(tag_filter)
+
+def engine_names():
+    return [engine.name for engine in _engines()]
+
+def get_engine(name: str) -> type[StorageEngine]:
+    for engine in _engines():
+        if engine.name == name:
+            return engine
+    raise NoteAppError(f"Unknown storage engine '{name}'. Available engines: {', '.join(engine_names())}.")
+
+def detect_engine(path: Path) -> StorageEngine:
+    """
+    Opens the repository file at path with the engine it was written with.
+    Files that do not match any other engine are treated as JSON.
+
+    Raises:
+        RepositoryCorruptedError: If a compressed file cannot be decompressed
+                                  or its engine does not support compression.
+    """
+    from app.core.engines.json_engine import JsonEngine
+
+    with path.open("rb") as file:
+        header = file.read(HEADER_SIZE)
+        compression = detect_compression(header)
+        if compression is not None:
+            file.seek(0)
+            try:
+                header = compression.reader(file).read(HEADER_SIZE)
+            except compression.errors as error:
+                raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid {compression.name} file. {error}")
+
+    for engine in _engines():
+        if engine.matches(header):
+            if compression is not None and not engine.supports_compression:
+                raise RepositoryCorruptedError(f"Cannot read repository. The {engine.name} storage engine does not support compression.")
+            return engine(path, compression)
+    return JsonEngine(path, compression)
+
+def atomic_write(path: Path, write, mode: str = "w"):
+    """
+    Replaces the file at path with content produced by write(file).
+
+    The content is written to a temporary file in the same directory, flushed
+    to disk and renamed over the original, so a crash leaves either the old or
+    the new file and never a truncated one.
+    """
+    directory = path.absolute().parent
+    descriptor, temporary = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, mode) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        if path.exists():
+            os.chmod(temporary, stat.S_IMODE(path.stat().st_mode))
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+    fsync_directory(directory)
+
+def fsync_directory(directory: Path):
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+def _engines() -> Iterator[type[StorageEngine]]:
+    """
+    Yields storage engines, importing each one only when it is reached, so
+    opening a JSON repository does not import the other engines.
+    """
+    from app.core.engines.json_engine import JsonEngine
+    yield JsonEngine
+    from app.core.engines.sqlite_engine import SqliteEngine
+    yield SqliteEngine
+    from app.core.engines.binary_engine import BinaryEngine
+    yield BinaryEngine
+    from app.core.engines.segmented_engine import SegmentedEngine
+    yield SegmentedEngine
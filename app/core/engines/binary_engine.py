@@ -0,0 +1,228 @@
+"""
+Compact binary storage engine for the note repository.
+
+Tags, status names and styles are stored once in a string table and notes
+refer to them by index, so repeated strings do not take space in every note.
+The snapshot layout, with all integers little-endian, is:
+
+    magic           8 bytes, "NOTEBIN" followed by the format version (2)
+    metadata        u32 length + UTF-8 JSON of the repository without notes
+                    and statuses
+    string table    u32 count, then u32 length + UTF-8 bytes per string
+    statuses        u32 count, then u32 name, u32 style, i64 priority
+    notes           u32 count, then one length-prefixed record per note:
+                    u32 record length, i32 status (-1 if not set), i32 tag
+                    count (-1 if tags are not set), i64 note id (-1 if not
+                    set), u32 tag per tag and the UTF-8 content in the rest
+                    of the record
+
+Records can be skipped without decoding them, and tag filters are checked
+against tag indexes before the content of a note is decoded. Files of format
+version 1, written before notes had ids, have records without the note id and
+are still read.
+"""
+import json
+import struct
+from typing import BinaryIO
+
+from app.core.engines.snapshot import SnapshotEngine
+from app.core.errors import RepositoryCorruptedError
+
+MAGIC_PREFIX = b"NOTEBIN"
+VERSION = 2
+MAGIC = MAGIC_PREFIX + bytes([VERSION])
+NOT_SET = -1
+
+LENGTH = struct.Struct("<I")
+STATUS = struct.Struct("<IIq")
+RECORDS = {1: struct.Struct("<Iii"), 2: struct.Struct("<Iiiq")}
+RECORD = RECORDS[VERSION]
+
+class BinaryEngine(SnapshotEngine):
+    name = "binary"
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.startswith(MAGIC_PREFIX) and len(header) >= len(MAGIC) and header[len(MAGIC_PREFIX)] in RECORDS
+
+    def write_snapshot(self, file: BinaryIO, notes_repository: dict):
+        strings = _StringTable()
+        config = notes_repository["config"]
+        metadata = {key: value for key, value in notes_repository.items() if key != "notes"}
+        metadata["config"] = {key: value for key, value in config.items() if key != "statuses"}
+
+        statuses = [
+            STATUS.pack(strings.add(name), strings.add(status["style"]), status["priority"])
+            for name, status in config["statuses"].items()
+        ]
+
+        records = []
+        for note in notes_repository["notes"]:
+            status = NOT_SET if note["status"] is None else strings.add(note["status"])
+            tags = note["tags"]
+            references = [] if tags is None else [strings.add(tag) for tag in tags]
+            content = note["content"].encode()
+            body_length = RECORD.size - LENGTH.size + 4 * len(references) + len(content)
+            note_id = note.get("id")
+            records.append(RECORD.pack(body_length, status, NOT_SET if tags is None else len(tags), NOT_SET if note_id is None else note_id))
+            records.append(struct.pack(f"<{len(references)}I", *references))
+            records.append(content)
+
+        file.write(MAGIC)
+        _write_bytes(file, json.dumps(metadata).encode())
+        file.write(LENGTH.pack(len(strings.values)))
+        for value in strings.values:
+            _write_bytes(file, value.encode())
+        file.write(LENGTH.pack(len(statuses)))
+        file.write(b"".join(statuses))
+        file.write(LENGTH.pack(len(notes_repository["notes"])))
+        file.write(b"".join(records))
+
+    def read_snapshot(self, file: BinaryIO):
+        data = file.read()
+        notes_repository, strings, offset = self._read_header(data)
+        record = RECORDS[data[len(MAGIC_PREFIX)]]
+
+        try:
+            (count,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            notes = []
+            tag_structs = {}
+            for _ in range(count):
+                body_length, status, tag_count, *note_id = record.unpack_from(data, offset)
+                end = offset + LENGTH.size + body_length
+                offset += record.size
+                if tag_count == NOT_SET:
+                    tags = None
+                else:
+                    tags_struct = tag_structs.get(tag_count) or tag_structs.setdefault(tag_count, struct.Struct(f"<{tag_count}I"))
+                    tags = [strings[tag] for tag in tags_struct.unpack_from(data, offset)]
+                    offset += tags_struct.size
+                notes.append(_note(data[offset:end].decode(), tags, None if status == NOT_SET else strings[status], note_id))
+                offset = end
+        except (struct.error, IndexError, UnicodeDecodeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid binary repository. {error}")
+
+        notes_repository["notes"] = notes
+        return notes_repository
+
+    def read_snapshot_metadata(self, file: BinaryIO):
+        notes_repository, _, _ = self._read_header_from(file)
+        return notes_repository
+
+    def iter_snapshot_notes(self, file: BinaryIO, tag_filter: list[str] | None):
+        _, strings, version = self._read_header_from(file)
+        record = RECORDS[version]
+        wanted = {idx for idx, value in enumerate(strings) if value in tag_filter} if tag_filter else None
+
+        try:
+            (count,) = LENGTH.unpack(_read_exactly(file, LENGTH.size))
+            for idx in range(count):
+                body_length, status, tag_count, *note_id = record.unpack(_read_exactly(file, record.size))
+                body = _read_exactly(file, body_length - record.size + LENGTH.size)
+                reference_count = max(tag_count, 0)
+                references = struct.unpack_from(f"<{reference_count}I", body)
+                if wanted is not None and wanted.isdisjoint(references):
+                    continue
+                yield idx, _note(
+                    body[4 * reference_count:].decode(),
+                    None if tag_count == NOT_SET else [strings[tag] for tag in references],
+                    None if status == NOT_SET else strings[status],
+                    note_id
+                )
+        except (struct.error, IndexError, UnicodeDecodeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid binary repository. {error}")
+
+    def _read_header_from(self, file: BinaryIO):
+        """
+        Reads everything before the notes from a file, leaving it positioned
+        at the notes section. Returns the repository without notes, the
+        string table and the format version.
+        """
+        try:
+            parts = [file.read(len(MAGIC)), _read_prefixed(file)]
+            (count,) = LENGTH.unpack(_read_exactly(file, LENGTH.size))
+            parts.append(LENGTH.pack(count))
+            parts.extend(_read_prefixed(file) for _ in range(count))
+            (count,) = LENGTH.unpack(_read_exactly(file, LENGTH.size))
+            parts.append(LENGTH.pack(count) + _read_exactly(file, count * STATUS.size))
+        except struct.error as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid binary repository. {error}")
+
+        notes_repository, strings, _ = self._read_header(b"".join(parts))
+        return notes_repository, strings, parts[0][len(MAGIC_PREFIX)]
+
+    def _read_header(self, data: bytes):
+        """
+        Parses everything before the notes. Returns the repository without
+        notes, the string table and the offset of the notes section.
+        """
+        if not self.matches(data[:len(MAGIC)]):
+            raise RepositoryCorruptedError("Cannot read repository. File is not a valid binary repository.")
+
+        try:
+            offset = len(MAGIC)
+            metadata, offset = _unpack_bytes(data, offset)
+            notes_repository = json.loads(metadata)
+
+            (count,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            strings = []
+            for _ in range(count):
+                value, offset = _unpack_bytes(data, offset)
+                strings.append(value.decode())
+
+            (count,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            statuses = {}
+            for _ in range(count):
+                name, style, priority = STATUS.unpack_from(data, offset)
+                statuses[strings[name]] = {"style": strings[style], "priority": priority}
+                offset += STATUS.size
+            notes_repository["config"]["statuses"] = statuses
+        except (struct.error, IndexError, KeyError, UnicodeDecodeError, json.JSONDecodeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid binary repository. {error}")
+
+        return notes_repository, strings, offset
+
+def _note(content: str, tags: list[str] | None, status: str | None, note_id: list[int]):
+    """
+    Builds a note from a record, note_id holds the id if the record has one.
+    """
+    note = {"content": content, "tags": tags, "status": status}
+    if note_id and note_id[0] != NOT_SET:
+        note["id"] = note_id[0]
+    return note
+
+class _StringTable:
+    def __init__(self):
+        self.values = []
+        self.indexes = {}
+
+    def add(self, value: str):
+        if value not in self.indexes:
+            self.indexes[value] = len(self.values)
+            self.values.append(value)
+        return self.indexes[value]
+
+def _write_bytes(file: BinaryIO, value: bytes):
+    file.write(LENGTH.pack(len(value)))
+    file.write(value)
+
+def _unpack_bytes(data: bytes, offset: int):
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if offset + length > len(data):
+        raise struct.error("unexpected end of file")
+    return data[offset:offset + length], offset + length
+
+def _read_exactly(file: BinaryIO, size: int):
+    data = file.read(size)
+    if len(data) != size:
+        raise struct.error("unexpected end of file")
+    return data
+
+def _read_prefixed(file: BinaryIO):
+    prefix = _read_exactly(file, LENGTH.size)
+    (length,) = LENGTH.unpack(prefix)
+    return prefix + _read_exactly(file, length)
@@ -0,0 +1,150 @@
+"""
+Compression of repository snapshots.
+
+A compressed snapshot is the snapshot written by its storage engine, passed
+through one of the standard library compressors. The compression of an
+existing file is detected from its magic bytes, the compression used when the
+snapshot is written is chosen by the 'compression' field of the repository
+configuration.
+"""
+import gzip
+import io
+import lzma
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from app.core.errors import NoteAppError
+
+NONE = "none"
+CHUNK_SIZE = 64 * 1024
+
+class Compression(ABC):
+    name: str
+    errors: tuple[type[Exception], ...] = (EOFError,)
+
+    @staticmethod
+    @abstractmethod
+    def matches(header: bytes) -> bool:
+        """
+        Checks whether a file starting with header uses this compression.
+        """
+
+    @abstractmethod
+    def reader(self, file: BinaryIO) -> BinaryIO:
+        """
+        Returns a file object decompressing file while it is read.
+        """
+
+    @abstractmethod
+    def writer(self, file: BinaryIO) -> BinaryIO:
+        """
+        Returns a file object compressing data written to file. The content
+        is complete once the returned object is closed, which leaves file
+        open.
+        """
+
+class ZlibCompression(Compression):
+    name = "zlib"
+    errors = (EOFError, zlib.error)
+
+    @staticmethod
+    def matches(header: bytes):
+        return len(header) >= 2 and header[0] == 0x78 and (header[0] << 8 | header[1]) % 31 == 0
+
+    def reader(self, file: BinaryIO):
+        return io.BufferedReader(_ZlibReader(file), CHUNK_SIZE)
+
+    def writer(self, file: BinaryIO):
+        return io.BufferedWriter(_ZlibWriter(file), CHUNK_SIZE)
+
+class GzipCompression(Compression):
+    name = "gzip"
+    errors = (EOFError, gzip.BadGzipFile, zlib.error)
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.startswith(b"\x1f\x8b")
+
+    def reader(self, file: BinaryIO):
+        return gzip.GzipFile(fileobj=file, mode="rb")
+
+    def writer(self, file: BinaryIO):
+        return gzip.GzipFile(fileobj=file, mode="wb", mtime=0)
+
+class LzmaCompression(Compression):
+    name = "lzma"
+    errors = (EOFError, lzma.LZMAError)
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.startswith(b"\xfd7zXZ\x00")
+
+    def reader(self, file: BinaryIO):
+        return lzma.LZMAFile(file, "rb")
+
+    def writer(self, file: BinaryIO):
+        return lzma.LZMAFile(file, "wb")
+
+COMPRESSIONS = [ZlibCompression(), GzipCompression(), LzmaCompression()]
+
+def compression_names():
+    return [NONE] + [compression.name for compression in COMPRESSIONS]
+
+def get_compression(name: str | None) -> Compression | None:
+    """
+    Returns the compression with the given name, or None for 'none'.
+
+    Raises:
+        NoteAppError: If the compression does not exist.
+    """
+    if name is None or name == NONE:
+        return None
+    for compression in COMPRESSIONS:
+        if compression.name == name:
+            return compression
+    raise NoteAppError(f"Unknown compression '{name}'. Available compressions: {', '.join(compression_names())}.")
+
+def detect_compression(header: bytes) -> Compression | None:
+    for compression in COMPRESSIONS:
+        if compression.matches(header):
+            return compression
+    return None
+
+class _ZlibReader(io.RawIOBase):
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.decompressor = zlib.decompressobj()
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.buffer and not self.decompressor.eof:
+            data = self.decompressor.unconsumed_tail or self.file.read(CHUNK_SIZE)
+            if not data:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            self.buffer = self.decompressor.decompress(data, CHUNK_SIZE)
+
+        size = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+class _ZlibWriter(io.RawIOBase):
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.compressor = zlib.compressobj()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.file.write(self.compressor.flush())
+        super().close()
@@ -0,0 +1,68 @@
+"""
+JSON storage engine, the default format of the note repository.
+
+The repository is kept as a single JSON document, optionally followed by a
+journal (see `app.core.engines.snapshot`). Notes are written after all other
+fields, so listing can read the configuration and then stream notes one by
+one (see `app.core.engines.json_stream`).
+"""
+import io
+import json
+from typing import BinaryIO
+
+from app.core.engines import note_matches
+from app.core.engines.json_stream import JsonStream
+from app.core.engines.snapshot import SnapshotEngine
+from app.core.errors import RepositoryCorruptedError
+
+ENCODING = "utf-8"
+
+class JsonEngine(SnapshotEngine):
+    name = "json"
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.lstrip().startswith(b"{")
+
+    def read_snapshot(self, file: BinaryIO):
+        try:
+            return json.load(file)
+        except (json.JSONDecodeError, UnicodeDecodeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not valid JSON. {error}")
+
+    def write_snapshot(self, file: BinaryIO, notes_repository: dict):
+        # json.dumps encodes the whole repository with the C encoder, which
+        # is several times faster than json.dump writing it piece by piece.
+        text = io.TextIOWrapper(file, encoding=ENCODING)
+        text.write(json.dumps(_notes_last(notes_repository)))
+        text.flush()
+        text.detach()
+
+    def read_snapshot_metadata(self, file: BinaryIO):
+        """
+        Reads fields other than notes, stopping at the notes once the
+        configuration has been read, which is right away for files written
+        by this engine.
+        """
+        metadata = {}
+        for key, value in JsonStream(io.TextIOWrapper(file, encoding=ENCODING)).events():
+            if key != "note":
+                metadata[key] = value
+            elif "config" in metadata:
+                break
+        return metadata
+
+    def iter_snapshot_notes(self, file: BinaryIO, tag_filter: list[str] | None):
+        idx = 0
+        for key, note in JsonStream(io.TextIOWrapper(file, encoding=ENCODING)).events():
+            if key != "note":
+                continue
+            if note_matches(note, tag_filter):
+                yield idx, note
+            idx += 1
+
+def _notes_last(notes_repository: dict):
+    return {
+        **{key: value for key, value in notes_repository.items() if key != "notes"},
+        "notes": list(notes_repository.get("notes", []))
+    }
@@ -0,0 +1,125 @@
+"""
+Incremental reader for JSON repository files.
+
+The reader walks the top-level repository object and its 'notes' array one
+value at a time, reading the file in chunks. Only the value being decoded is
+held in memory, so large repositories can be listed without loading them.
+"""
+import json
+from typing import Iterator, TextIO
+
+from app.core.errors import RepositoryCorruptedError
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+class JsonStream:
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.offset = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def events(self) -> Iterator[tuple[str, object]]:
+        """
+        Yields (key, value) pairs of the top-level object in document order.
+        Elements of the 'notes' array are yielded one by one as ('note', note)
+        pairs instead of a single 'notes' pair.
+
+        Raises:
+            RepositoryCorruptedError: If the file is not a valid repository.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "notes":
+                yield from (("note", note) for note in self._array())
+            else:
+                yield key, self._value()
+
+            if self._closes("}"):
+                return
+
+    def _array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._next()
+            return
+
+        while True:
+            yield self._value()
+            if self._closes("]"):
+                return
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.offset)
+            except json.JSONDecodeError as error:
+                if self._fill():
+                    continue
+                raise RepositoryCorruptedError(f"Cannot read repository. File is not valid JSON. {error}")
+
+            # A value ending at the end of the buffer, such as a number, may
+            # continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+
+            self.offset = end
+            return value
+
+    def _peek(self):
+        while True:
+            while self.offset < len(self.buffer) and self.buffer[self.offset] in WHITESPACE:
+                self.offset += 1
+            if self.offset < len(self.buffer):
+                return self.buffer[self.offset]
+            if not self._fill():
+                raise RepositoryCorruptedError("Cannot read repository. File is not valid JSON. Unexpected end of file.")
+
+    def _next(self):
+        character = self._peek()
+        self.offset += 1
+        return character
+
+    def _expect(self, expected: str):
+        character = self._next()
+        if character != expected:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not valid JSON. Expected '{expected}' but found '{character}'.")
+
+    def _closes(self, closing: str):
+        """
+        Consumes the separator after a value. Returns True if it closes the
+        current object or array, False if another value follows.
+        """
+        character = self._next()
+        if character == closing:
+            return True
+        if character != ",":
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not valid JSON. Expected ',' or '{closing}' but found '{character}'.")
+        return False
+
+    def _fill(self):
+        """
+        Reads the next chunk, dropping the consumed part of the buffer. The
+        chunk grows with the buffer, so decoding a long value is retried only
+        a logarithmic number of times.
+        """
+        if self.eof:
+            return False
+
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.offset))
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.offset:] + chunk
+        self.offset = 0
+        return True
@@ -0,0 +1,365 @@
+"""
+Segmented storage engine for the note repository.
+
+Notes are split into segment files of at most `SEGMENT_SIZE` notes kept in
+the `.notes.segments` directory, in display order. The repository file itself
+is a small manifest listing the segments together with a summary of each:
+the number of notes, the statuses and tags they use and the offsets of
+deleted notes. Operations read only the segments they need:
+
+- listing notes with a tag filter skips segments without any of the tags,
+  or without any of the positions found in the tag index,
+- adding a note reads and rewrites the one segment it is inserted into,
+- deleting a note records a tombstone in the manifest and reads no segment.
+
+Segment files are never changed. A changed segment is written to a new file,
+the manifest is replaced atomically and the old file is removed afterwards.
+Rewriting a segment drops its tombstones, and segments with more deleted than
+live notes are rewritten when the repository is saved. This compaction runs
+in the saving process, under the exclusive repository lock, rather than in
+the background, so no other process sees a half-compacted repository.
+`note compact` merges all segments into full ones. Loading the whole
+repository reads segments in parallel with a process pool once there are at
+least `PARALLEL_SEGMENTS`.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+from app.core import SEGMENTS_DIRNAME
+from app.core import operations
+from app.core.engines import StorageEngine, atomic_write, fsync_directory, note_matches
+from app.core.engines.compression import Compression
+from app.core.errors import RepositoryCorruptedError
+
+MAGIC = b"NOTESEG\x01"
+SEGMENT_SIZE = 1000
+PARALLEL_SEGMENTS = 16
+NO_STATUS = ""
+
+class SegmentedEngine(StorageEngine):
+    name = "segmented"
+
+    def __init__(self, path: Path, compression: Compression | None = None):
+        super().__init__(path, compression)
+        self.segments_directory = path.parent / SEGMENTS_DIRNAME
+        self._manifest = None
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.startswith(MAGIC)
+
+    def create(self, notes_repository: dict):
+        if self.path.exists():
+            raise FileExistsError(f"Notes repository already initialized in {self.path.absolute()}")
+        self._write_all(notes_repository, {"next_segment": 0})
+
+    def load(self):
+        manifest = self._read_manifest()
+        notes_repository = json.loads(json.dumps(manifest["repository"]))
+        segments = [_Segment(entry) for entry in manifest["segments"]]
+        notes_repository["notes"] = [
+            note
+            for segment, notes in zip(segments, self._read_segments(segments))
+            for offset, note in enumerate(notes) if offset not in segment.deleted
+        ]
+        return notes_repository
+
+    def load_metadata(self):
+        return json.loads(json.dumps(self._read_manifest()["repository"]))
+
+    def count_notes(self):
+        return sum(_Segment(entry).live for entry in self._read_manifest()["segments"])
+
+    def iter_notes(self, tag_filter: list[str] | None = None):
+        """
+        Yields notes segment by segment. Segments that do not contain any of
+        the filtered tags are skipped without reading them, the others are
+        read in parallel like in `load`.
+        """
+        segments = [_Segment(entry) for entry in self._read_manifest()["segments"]]
+        contents = self._read_segments([
+            segment for segment in segments
+            if not (tag_filter and segment.tags.isdisjoint(tag_filter))
+        ])
+        idx = 0
+        for segment in segments:
+            if tag_filter and segment.tags.isdisjoint(tag_filter):
+                idx += segment.live
+                continue
+
+            for offset, note in enumerate(next(contents)):
+                if offset in segment.deleted:
+                    continue
+                if note_matches(note, tag_filter):
+                    yield idx, note
+                idx += 1
+
+    def iter_notes_at(self, positions: list[int]):
+        """
+        Yields notes at the given positions, reading only the segments that
+        hold them.
+        """
+        idx = 0
+        remaining = iter(positions)
+        position = next(remaining, None)
+        for entry in self._read_manifest()["segments"]:
+            if position is None:
+                return
+            segment = _Segment(entry)
+            if position >= idx + segment.live:
+                idx += segment.live
+                continue
+
+            for note in self._live_notes(segment):
+                if idx == position:
+                    yield idx, note
+                    position = next(remaining, None)
+                    if position is None:
+                        return
+                idx += 1
+
+    def save(self, notes_repository: dict | None, changes: list[dict] | None = None):
+        if changes is None:
+            self._write_all(notes_repository, self._read_manifest())
+            return
+
+        manifest = self._read_manifest()
+        repository = manifest["repository"]
+        try:
+            config = repository["config"]
+            statuses = config["statuses"]
+        except KeyError as error:
+            raise RepositoryCorruptedError(f"Notes repository does not contain field {error}.")
+        segments = [_Segment(entry) for entry in manifest["segments"]]
+
+        for idx, change in enumerate(changes):
+            try:
+                kind = change["op"]
+                if kind == operations.ADD_NOTE:
+                    self._insert(segments, statuses, change["note"])
+                    operations.apply_operations([], config, [change])
+                elif kind == operations.DELETE_NOTE:
+                    _delete(segments, change["position"])
+                elif kind == operations.DELETE_NOTES:
+                    for position in reversed(change["positions"]):
+                        _delete(segments, position)
+                elif _reorders(segments, change):
+                    notes = [note for segment in segments for note in self._live_notes(segment)]
+                    operations.apply_operations(notes, config, changes[idx:])
+                    segments = _split(notes)
+                    break
+                else:
+                    operations.apply_operations([], config, [change])
+            except (KeyError, IndexError, TypeError) as error:
+                raise RepositoryCorruptedError(f"Cannot apply repository operation {change}. {error}")
+
+        if notes_repository is not None:
+            repository = _metadata(notes_repository)
+        self._write_segments(repository, segments, manifest)
+
+    def compact(self, notes_repository: dict):
+        self._write_all(notes_repository, self._read_manifest())
+        return 0
+
+    def replace(self, path: Path):
+        destination = path.parent / SEGMENTS_DIRNAME
+        if destination.exists():
+            shutil.rmtree(destination)
+        os.replace(self.segments_directory, destination)
+        super().replace(path)
+
+    def cleanup(self):
+        shutil.rmtree(self.segments_directory, ignore_errors=True)
+
+    def _read_manifest(self):
+        if self._manifest is None:
+            try:
+                with self.path.open("rb") as file:
+                    if file.read(len(MAGIC)) != MAGIC:
+                        raise RepositoryCorruptedError("Cannot read repository. File is not a valid segmented repository manifest.")
+                    self._manifest = json.load(file)
+            except (json.JSONDecodeError, UnicodeDecodeError) as error:
+                raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid segmented repository manifest. {error}")
+        return self._manifest
+
+    def _segment_path(self, file: str):
+        return self.segments_directory / file
+
+    def _read_segments(self, segments: list["_Segment"]):
+        """
+        Yields the notes of every segment, in order. Once there are at least
+        `PARALLEL_SEGMENTS` segments they are read with a process pool; reads
+        not yet started are cancelled if the notes are not all consumed.
+        """
+        if len(segments) < PARALLEL_SEGMENTS or (os.cpu_count() or 1) < 2:
+            for segment in segments:
+                yield self._load_segment(segment)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor()
+        try:
+            yield from pool.map(_read_segment, [self._segment_path(segment.file) for segment in segments])
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _load_segment(self, segment: "_Segment"):
+        if segment.notes is None:
+            segment.notes = _read_segment(self._segment_path(segment.file))
+        return segment.notes
+
+    def _live_notes(self, segment: "_Segment"):
+        return [note for offset, note in enumerate(self._load_segment(segment)) if offset not in segment.deleted]
+
+    def _insert(self, segments: list["_Segment"], statuses: dict, note: dict):
+        """
+        Inserts a note after the last note with at least its priority, like
+        a stable sort does. Segment summaries tell which segment holds that
+        note, so only that segment is read.
+        """
+        def priority(status: str | None):
+            return 0 if not status else statuses[status]["priority"]
+
+        note_priority = priority(note["status"])
+        if not segments:
+            segments.append(_Segment.new([]))
+
+        target = 0
+        for idx, segment in enumerate(segments):
+            if any(priority(status) >= note_priority for status in segment.statuses):
+                target = idx
+
+        segment = segments[target]
+        notes = self._live_notes(segment)
+        position = next(
+            (offset for offset in range(len(notes), 0, -1) if priority(notes[offset - 1]["status"]) >= note_priority),
+            0
+        )
+        notes.insert(position, note)
+        segments[target:target + 1] = _split(notes)
+
+    def _write_all(self, notes_repository: dict, manifest: dict):
+        self._write_segments(_metadata(notes_repository), _split(notes_repository["notes"]), manifest)
+
+    def _write_segments(self, repository: dict, segments: list["_Segment"], manifest: dict):
+        """
+        Writes new and changed segments to new files, replaces the manifest
+        and removes segment files it no longer refers to.
+        """
+        self.segments_directory.mkdir(exist_ok=True)
+        next_segment = manifest.get("next_segment", 0)
+        entries = []
+        for segment in segments:
+            if segment.notes is None and len(segment.deleted) * 2 > segment.count:
+                segment = _Segment.new(self._live_notes(segment))
+            if segment.live == 0:
+                continue
+            if segment.file is None:
+                segment.file = f"{next_segment:08d}.json"
+                next_segment += 1
+                atomic_write(self._segment_path(segment.file), lambda file: json.dump(segment.notes, file))
+            entries.append(segment.entry())
+
+        self._manifest = {"repository": repository, "segments": entries, "next_segment": next_segment}
+        fsync_directory(self.segments_directory)
+        atomic_write(self.path, lambda file: _write_manifest(file, self._manifest), "wb")
+
+        referenced = {entry["file"] for entry in entries}
+        for path in self.segments_directory.iterdir():
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+
+class _Segment:
+    """
+    A segment as described in the manifest. Segments created while saving
+    hold their notes and have no file until they are written.
+    """
+    def __init__(self, entry: dict):
+        try:
+            self.file = entry["file"]
+            self.count = entry["count"]
+            self.deleted = set(entry["deleted"])
+            self.statuses = {status or None for status in entry["statuses"]}
+            self.tags = set(entry["tags"])
+        except (KeyError, TypeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. Invalid segment in manifest. {error}")
+        self.notes = None
+
+    @staticmethod
+    def new(notes: list[dict]):
+        segment = _Segment({
+            "file": None,
+            "count": len(notes),
+            "deleted": [],
+            "statuses": sorted({note["status"] or NO_STATUS for note in notes}),
+            "tags": sorted({tag for note in notes for tag in note["tags"] or []})
+        })
+        segment.notes = notes
+        return segment
+
+    @property
+    def live(self):
+        return self.count - len(self.deleted)
+
+    def entry(self):
+        return {
+            "file": self.file,
+            "count": self.count,
+            "deleted": sorted(self.deleted),
+            "statuses": sorted(status or NO_STATUS for status in self.statuses),
+            "tags": sorted(self.tags)
+        }
+
+def _delete(segments: list[_Segment], position: int):
+    """
+    Records a tombstone for the note at position in the segment holding it.
+    """
+    if position < 0:
+        raise IndexError("note position out of range")
+    for segment in segments:
+        if position >= segment.live:
+            position -= segment.live
+            continue
+
+        if segment.file is None:
+            segment.notes.pop(position)
+            segment.count -= 1
+            return
+
+        offset = position
+        for deleted in sorted(segment.deleted):
+            if deleted <= offset:
+                offset += 1
+        segment.deleted.add(offset)
+        return
+    raise IndexError("note position out of range")
+
+def _reorders(segments: list[_Segment], change: dict):
+    """
+    Checks whether a status operation changes the order of stored notes.
+    """
+    if change["op"] == operations.EDIT_STATUS and not change["priority"]:
+        return False
+    if change["op"] not in (operations.EDIT_STATUS, operations.DELETE_STATUS):
+        return False
+    return any(change["name"] in segment.statuses for segment in segments)
+
+def _split(notes: list[dict]):
+    return [_Segment.new(notes[start:start + SEGMENT_SIZE]) for start in range(0, len(notes), SEGMENT_SIZE)]
+
+def _metadata(notes_repository: dict):
+    return {key: value for key, value in notes_repository.items() if key != "notes"}
+
+def _read_segment(path: Path):
+    try:
+        with path.open("r") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError) as error:
+        raise RepositoryCorruptedError(f"Cannot read repository segment {path.name}. {error}")
+
+def _write_manifest(file, manifest: dict):
+    file.write(MAGIC)
+    file.write(json.dumps(manifest).encode())
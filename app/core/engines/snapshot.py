@@ -0,0 +1,311 @@
+"""
+Base class for storage engines that keep the repository in a single snapshot
+file, optionally followed by a journal.
+
+When journaling is enabled in the repository configuration, changes are not
+written by rewriting the whole snapshot. Instead, the operations that caused
+them are appended to a journal file next to the repository. The journal is
+replayed on load and merged into the snapshot during compaction, which happens
+explicitly or automatically once the journal grows past
+`JOURNAL_COMPACTION_SIZE` bytes.
+
+The snapshot is never rewritten in place. It is written to a temporary file,
+flushed to disk and atomically renamed over the previous version. Snapshots
+can be compressed (see `app.core.engines.compression`), the journal is always
+kept uncompressed so it can be appended to.
+"""
+import io
+import json
+import os
+import time
+from abc import abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from app.core import JOURNAL_FILENAME, JOURNAL_COMPACTION_SIZE
+from app.core import operations
+from app.core.engines import StorageEngine, atomic_write
+from app.core.engines.compression import Compression, get_compression
+from app.core.errors import RepositoryDoesNotExistError, RepositoryCorruptedError
+
+class SnapshotEngine(StorageEngine):
+    """
+    Subclasses define how the snapshot is read from and written to a binary
+    file object.
+    """
+    supports_compression = True
+
+    def __init__(self, path: Path, compression: Compression | None = None):
+        super().__init__(path, compression)
+        self.journal = path.parent / JOURNAL_FILENAME
+        self._journal_length = 0
+
+    @abstractmethod
+    def read_snapshot(self, file: BinaryIO) -> dict:
+        """
+        Reads the whole repository from the snapshot file.
+        """
+
+    @abstractmethod
+    def write_snapshot(self, file: BinaryIO, notes_repository: dict):
+        """
+        Writes the whole repository to the snapshot file.
+        """
+
+    @abstractmethod
+    def read_snapshot_metadata(self, file: BinaryIO) -> dict:
+        """
+        Reads the repository without notes from the snapshot file.
+        """
+
+    @abstractmethod
+    def iter_snapshot_notes(self, file: BinaryIO, tag_filter: list[str] | None) -> Iterator[tuple[int, dict]]:
+        """
+        Reads notes from the snapshot file one by one, see `iter_notes`.
+        """
+
+    def create(self, notes_repository: dict):
+        compression = _configured_compression(notes_repository)
+        with self.path.open("xb") as file:
+            self._write_compressed(file, notes_repository, compression)
+        self.compression = compression
+
+    def load(self):
+        """
+        Loads the snapshot. If a journal exists for the repository, its
+        operations are replayed on top of it.
+        """
+        with self._open_snapshot() as file:
+            notes_repository = self.read_snapshot(file)
+
+        journal_operations = self._read_journal(notes_repository.get("generation", 0))
+        self._journal_length = len(journal_operations)
+        _replay(notes_repository, notes_repository.get("notes"), journal_operations)
+
+        return notes_repository
+
+    def load_metadata(self):
+        """
+        Reads the snapshot up to its notes. Changes recorded in the journal
+        are replayed on the result without notes, so statuses and the next
+        note id are up to date, deletions of notes are skipped.
+        """
+        notes_repository = self._read_metadata()
+        journal_operations = [
+            operation for operation in self._read_journal(notes_repository.get("generation", 0))
+            if operation.get("op") not in (operations.DELETE_NOTE, operations.DELETE_NOTES)
+        ]
+        _replay(notes_repository, [], journal_operations)
+        return notes_repository
+
+    def save(self, notes_repository: dict | None, changes: list[dict] | None = None):
+        """
+        Saves the snapshot.
+
+        If journaling is enabled and the operations that led to the current
+        state are provided, they are appended to the journal instead. The
+        repository is compacted when the journal exceeds
+        `JOURNAL_COMPACTION_SIZE` bytes.
+
+        Raises:
+            RepositoryDoesNotExistError: If the repository file does not exist.
+        """
+        if not self.path.exists():
+            raise RepositoryDoesNotExistError(f"Notes repository does not exist. Run `note init` to initialize repository.")
+
+        snapshot = self._read_metadata() if notes_repository is None else notes_repository
+        journaling = snapshot.get("config", {}).get("journal", False)
+        if journaling and changes is not None and not self._journal_needs_compaction():
+            self._append_journal(snapshot.get("generation", 0), changes)
+            return
+
+        if notes_repository is None:
+            notes_repository = self.load()
+            _replay(notes_repository, notes_repository.get("notes"), changes or [])
+
+        self._write_snapshot(notes_repository)
+
+    def iter_notes(self, tag_filter: list[str] | None = None):
+        """
+        Streams notes from the snapshot one by one. Repositories with a
+        pending journal are loaded whole, because the journal may reorder
+        notes.
+        """
+        if self._has_journal():
+            yield from super().iter_notes(tag_filter)
+            return
+
+        with self._open_snapshot() as file:
+            yield from self.iter_snapshot_notes(file, tag_filter)
+
+    def compact(self, notes_repository: dict):
+        self._write_snapshot(notes_repository)
+        return self._journal_length
+
+    def cleanup(self):
+        self.journal.unlink(missing_ok=True)
+
+    def measure_compression(self, notes_repository: dict, compression: Compression | None):
+        """
+        Writes the repository with the given compression to memory and reads
+        it back.
+
+        Returns:
+            tuple[int, float, float]: Size of the snapshot in bytes and the
+                                      time in seconds it took to write and
+                                      to read it.
+        """
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        self._write_compressed(buffer, notes_repository, compression)
+        write_time = time.perf_counter() - start
+
+        size = buffer.tell()
+        buffer.seek(0)
+        start = time.perf_counter()
+        with self._reading(buffer, compression) as file:
+            self.read_snapshot(file)
+        read_time = time.perf_counter() - start
+
+        return size, write_time, read_time
+
+    def _write_snapshot(self, notes_repository: dict):
+        """
+        Rewrites the snapshot. If a journal exists, the snapshot generation
+        is increased before the journal is removed, so a journal left behind
+        by an interrupted compaction is never replayed twice.
+        """
+        if self.journal.exists():
+            notes_repository["generation"] = notes_repository.get("generation", 0) + 1
+
+        compression = _configured_compression(notes_repository)
+        atomic_write(self.path, lambda file: self._write_compressed(file, notes_repository, compression), "wb")
+        self.compression = compression
+
+        self.journal.unlink(missing_ok=True)
+
+    def _write_compressed(self, file: BinaryIO, notes_repository: dict, compression: Compression | None):
+        if compression is None:
+            self.write_snapshot(file, notes_repository)
+            return
+
+        with compression.writer(file) as compressed:
+            self.write_snapshot(compressed, notes_repository)
+
+    @contextmanager
+    def _open_snapshot(self):
+        with self.path.open("rb") as file:
+            with self._reading(file, self.compression) as snapshot:
+                yield snapshot
+
+    @contextmanager
+    def _reading(self, file: BinaryIO, compression: Compression | None):
+        if compression is None:
+            yield file
+            return
+
+        try:
+            with compression.reader(file) as decompressed:
+                yield decompressed
+        except compression.errors as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid {compression.name} file. {error}")
+
+    def _read_metadata(self):
+        with self._open_snapshot() as file:
+            return self.read_snapshot_metadata(file)
+
+    def _has_journal(self):
+        return self.journal.exists() and self.journal.stat().st_size > 0
+
+    def _journal_needs_compaction(self):
+        return self.journal.exists() and self.journal.stat().st_size > JOURNAL_COMPACTION_SIZE
+
+    def _read_journal(self, generation: int):
+        """
+        Reads operations recorded in the journal for the given snapshot
+        generation.
+
+        The first line of the journal is a header with the generation of the
+        snapshot it applies to; every following line is a single operation. An
+        incomplete last line is the result of an interrupted append and is
+        ignored.
+        """
+        if not self.journal.exists():
+            return []
+
+        with self.journal.open("r") as file:
+            lines = file.read().split("\n")
+
+        # A complete journal ends with a newline, so the last element is either
+        # empty or a partially written operation.
+        lines = lines[:-1]
+        if not lines:
+            return []
+
+        try:
+            header = json.loads(lines[0])
+            if header.get("generation") != generation:
+                return []
+            return [json.loads(line) for line in lines[1:]]
+        except (json.JSONDecodeError, AttributeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository journal. {error}")
+
+    def _append_journal(self, generation: int, changes: list[dict]):
+        if not changes:
+            return
+
+        lines = [json.dumps(change) for change in changes]
+
+        with self.journal.open("a+b") as file:
+            _discard_incomplete_line(file)
+            if file.tell() > 0 and _journal_generation(file) != generation:
+                # Left behind by an interrupted compaction, already merged.
+                file.truncate(0)
+                file.seek(0)
+            if file.tell() == 0:
+                lines.insert(0, json.dumps({"generation": generation}))
+            file.write("".join(f"{line}\n" for line in lines).encode())
+            file.flush()
+            os.fsync(file.fileno())
+
+def _configured_compression(notes_repository: dict):
+    return get_compression(notes_repository.get("config", {}).get("compression"))
+
+def _replay(notes_repository: dict, notes: list[dict] | None, journal_operations: list[dict]):
+    if not journal_operations:
+        return
+    try:
+        config = notes_repository["config"]
+    except KeyError as error:
+        raise RepositoryCorruptedError(f"Cannot replay journal, repository does not contain field {error}.")
+    if notes is None:
+        raise RepositoryCorruptedError("Cannot replay journal, repository does not contain field 'notes'.")
+    operations.apply_operations(notes, config, journal_operations)
+
+def _journal_generation(file):
+    file.seek(0)
+    try:
+        generation = json.loads(file.readline()).get("generation")
+    except (json.JSONDecodeError, AttributeError):
+        generation = None
+    file.seek(0, 2)
+    return generation
+
+def _discard_incomplete_line(file):
+    """
+    Truncates a partially written operation left at the end of the journal and
+    leaves the file positioned at its end.
+    """
+    size = file.seek(0, 2)
+    if size == 0:
+        return
+
+    file.seek(size - 1)
+    if file.read(1) == b"\n":
+        return
+
+    file.seek(0)
+    content = file.read()
+    file.truncate(content.rfind(b"\n") + 1)
+    file.seek(0, 2)
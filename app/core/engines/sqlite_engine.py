@@ -0,0 +1,311 @@
+"""
+SQLite storage engine for the note repository.
+
+Notes, their tags and statuses are kept in indexed tables of an SQLite
+database. Changes are applied operation by operation, so adding or deleting a
+note only touches the pages holding its rows and indexes instead of rewriting
+the whole repository.
+
+Notes are stored with their ids as the primary key of the `notes` table, so a
+note is found by its id with a single index lookup. The display order of
+notes is stored in the `position` column. A new note is
+placed between the last note of at least its priority and the first note of a
+lower one, and positions are renumbered only when a status change reorders
+notes.
+"""
+import json
+import sqlite3
+from pathlib import Path
+
+from app.core import operations
+from app.core.engines import StorageEngine
+from app.core.engines.compression import Compression
+from app.core.errors import RepositoryCorruptedError
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+SCHEMA = """
+CREATE TABLE metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE statuses (
+    name TEXT PRIMARY KEY,
+    style TEXT NOT NULL,
+    priority INTEGER NOT NULL
+);
+CREATE TABLE notes (
+    id INTEGER PRIMARY KEY,
+    position REAL NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT,
+    status TEXT
+);
+CREATE INDEX notes_position ON notes (position);
+CREATE INDEX notes_status ON notes (status, position);
+CREATE TABLE note_tags (
+    note_id INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX note_tags_tag ON note_tags (tag, note_id);
+CREATE INDEX note_tags_note ON note_tags (note_id);
+"""
+
+class SqliteEngine(StorageEngine):
+    name = "sqlite"
+
+    def __init__(self, path: Path, compression: Compression | None = None):
+        super().__init__(path, compression)
+        self._connection = None
+
+    @staticmethod
+    def matches(header: bytes):
+        return header.startswith(SQLITE_HEADER)
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+        return self._connection
+
+    def create(self, notes_repository: dict):
+        if self.path.exists():
+            raise FileExistsError(f"Notes repository already initialized in {self.path.absolute()}")
+
+        try:
+            with self.connection:
+                self.connection.executescript(SCHEMA)
+                self._write(notes_repository)
+        except (sqlite3.Error, KeyError, TypeError) as error:
+            raise RepositoryCorruptedError(f"Cannot create SQLite repository. {error}")
+
+    def load(self):
+        notes_repository = self._load_metadata()
+        notes_repository["notes"] = [note for _, note in self.iter_notes()]
+        return notes_repository
+
+    def load_metadata(self):
+        return self._load_metadata()
+
+    def iter_notes(self, tag_filter: list[str] | None = None):
+        """
+        Yields notes ordered by position. A tag filter is answered with the
+        tag index, so only matching notes are read.
+        """
+        query = """
+            SELECT idx, id, content, tags, status FROM (
+                SELECT ROW_NUMBER() OVER (ORDER BY position) - 1 AS idx, id, position, content, tags, status FROM notes
+            )
+        """
+        parameters = []
+        if tag_filter:
+            query += f" WHERE id IN (SELECT note_id FROM note_tags WHERE tag IN ({', '.join('?' * len(tag_filter))}))"
+            parameters = tag_filter
+        query += " ORDER BY position"
+
+        try:
+            for idx, note_id, content, tags, status in self.connection.execute(query, parameters):
+                yield idx, {"content": content, "tags": json.loads(tags), "status": status, "id": note_id}
+        except (sqlite3.Error, json.JSONDecodeError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid SQLite repository. {error}")
+
+    def save(self, notes_repository: dict | None, changes: list[dict] | None = None):
+        try:
+            with self.connection:
+                if changes is None:
+                    self._clear()
+                    self._write(notes_repository)
+                    return
+
+                for change in changes:
+                    self._apply(change)
+                if notes_repository is None and any(change["op"] == operations.ADD_NOTE for change in changes):
+                    notes_repository = self._load_metadata()
+                    operations.apply_operations([], notes_repository["config"], [change for change in changes if change["op"] == operations.ADD_NOTE])
+                if notes_repository is not None:
+                    self._write_metadata(notes_repository)
+        except sqlite3.Error as error:
+            raise RepositoryCorruptedError(f"Cannot save repository. {error}")
+
+    def count_notes(self):
+        try:
+            return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+        except sqlite3.Error as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid SQLite repository. {error}")
+
+    def compact(self, notes_repository: dict):
+        self.save(notes_repository)
+        self.connection.execute("VACUUM")
+        return 0
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _load_metadata(self):
+        """
+        Loads the repository without notes.
+        """
+        try:
+            row = self.connection.execute("SELECT value FROM metadata WHERE key = 'repository'").fetchone()
+            notes_repository = json.loads(row[0]) if row else {"config": {}}
+            notes_repository["config"]["statuses"] = {
+                name: {"style": style, "priority": priority}
+                for name, style, priority in self.connection.execute("SELECT name, style, priority FROM statuses")
+            }
+        except (sqlite3.Error, json.JSONDecodeError, KeyError) as error:
+            raise RepositoryCorruptedError(f"Cannot read repository. File is not a valid SQLite repository. {error}")
+        return notes_repository
+
+    def _clear(self):
+        for table in ("metadata", "statuses", "notes", "note_tags"):
+            self.connection.execute(f"DELETE FROM {table}")
+
+    def _write(self, notes_repository: dict):
+        self._write_metadata(notes_repository)
+        self.connection.executemany(
+            "INSERT INTO statuses (name, style, priority) VALUES (?, ?, ?)",
+            [(name, status["style"], status["priority"]) for name, status in notes_repository["config"]["statuses"].items()]
+        )
+        for position, note in enumerate(notes_repository["notes"]):
+            self._insert_note(note, float(position))
+
+    def _write_metadata(self, notes_repository: dict):
+        """
+        Stores everything except notes and statuses as a single JSON value.
+        """
+        metadata = {key: value for key, value in notes_repository.items() if key != "notes"}
+        metadata["config"] = {key: value for key, value in notes_repository["config"].items() if key != "statuses"}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES ('repository', ?)",
+            (json.dumps(metadata),)
+        )
+
+    def _insert_note(self, note: dict, position: float):
+        cursor = self.connection.execute(
+            "INSERT INTO notes (id, position, content, tags, status) VALUES (?, ?, ?, ?, ?)",
+            (note.get("id"), position, note["content"], json.dumps(note["tags"]), note["status"])
+        )
+        if note["tags"]:
+            self.connection.executemany(
+                "INSERT INTO note_tags (note_id, tag) VALUES (?, ?)",
+                [(cursor.lastrowid, tag) for tag in note["tags"]]
+            )
+
+    def _apply(self, change: dict):
+        kind = change["op"]
+        if kind == operations.ADD_NOTE:
+            note = change["note"]
+            self._insert_note(note, self._insertion_position(self._priority(note["status"])))
+        elif kind == operations.DELETE_NOTE:
+            if change.get("id") is not None:
+                row = self.connection.execute("SELECT id FROM notes WHERE id = ?", (change["id"],)).fetchone()
+            else:
+                row = self.connection.execute(
+                    "SELECT id FROM notes ORDER BY position LIMIT 1 OFFSET ?", (change["position"],)
+                ).fetchone()
+            if row is None:
+                raise RepositoryCorruptedError(f"Cannot apply repository operation {change}.")
+            self.connection.execute("DELETE FROM notes WHERE id = ?", row)
+            self.connection.execute("DELETE FROM note_tags WHERE note_id = ?", row)
+        elif kind == operations.DELETE_NOTES:
+            self._delete_notes(change)
+        elif kind == operations.CREATE_STATUS:
+            status = change["status"]
+            self.connection.execute(
+                "INSERT INTO statuses (name, style, priority) VALUES (?, ?, ?)",
+                (change["name"], status["style"], status["priority"])
+            )
+        elif kind == operations.EDIT_STATUS:
+            if change["style"]:
+                self.connection.execute("UPDATE statuses SET style = ? WHERE name = ?", (change["style"], change["name"]))
+            if change["priority"]:
+                self.connection.execute("UPDATE statuses SET priority = ? WHERE name = ?", (change["priority"], change["name"]))
+                self._renumber()
+        elif kind == operations.DELETE_STATUS:
+            cursor = self.connection.execute("UPDATE notes SET status = NULL WHERE status = ?", (change["name"],))
+            if cursor.rowcount:
+                self._renumber()
+            self.connection.execute("DELETE FROM statuses WHERE name = ?", (change["name"],))
+        else:
+            raise RepositoryCorruptedError(f"Unknown repository operation '{kind}'.")
+
+    def _delete_notes(self, change: dict):
+        """
+        Deletes notes by their ids, or by their positions when some of them
+        have no id, with one statement per table.
+        """
+        note_ids = change["ids"]
+        if any(note_id is None for note_id in note_ids):
+            rows = self.connection.execute("SELECT id FROM notes ORDER BY position").fetchall()
+            try:
+                note_ids = [rows[position][0] for position in change["positions"]]
+            except IndexError:
+                raise RepositoryCorruptedError(f"Cannot apply repository operation {change}.")
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS deleted (id INTEGER PRIMARY KEY)")
+        self.connection.execute("DELETE FROM deleted")
+        self.connection.executemany("INSERT OR IGNORE INTO deleted (id) VALUES (?)", [(note_id,) for note_id in note_ids])
+        cursor = self.connection.execute("DELETE FROM notes WHERE id IN (SELECT id FROM deleted)")
+        if cursor.rowcount != len(set(note_ids)):
+            raise RepositoryCorruptedError(f"Cannot apply repository operation {change}.")
+        self.connection.execute("DELETE FROM note_tags WHERE note_id IN (SELECT id FROM deleted)")
+
+    def _priority(self, status: str | None):
+        if status is None:
+            return 0
+        row = self.connection.execute("SELECT priority FROM statuses WHERE name = ?", (status,)).fetchone()
+        if row is None:
+            raise RepositoryCorruptedError(f"There is no status {status} in the repository.")
+        return row[0]
+
+    def _insertion_position(self, priority: int):
+        """
+        Finds a position right after the last note with at least the given
+        priority, using the (status, position) index once per status.
+        """
+        statuses = self.connection.execute("SELECT name, priority FROM statuses").fetchall()
+        before = [name for name, status_priority in statuses if status_priority >= priority]
+        after = [name for name, status_priority in statuses if status_priority < priority]
+
+        last = max(
+            (position for position in self._positions(before, 0 >= priority, "MAX") if position is not None),
+            default=None
+        )
+        first = min(
+            (position for position in self._positions(after, 0 < priority, "MIN") if position is not None),
+            default=None
+        )
+
+        if last is None and first is None:
+            return 0.0
+        if first is None:
+            return last + 1
+        if last is None:
+            return first - 1
+
+        position = (last + first) / 2
+        if not last < position < first:
+            self._renumber()
+            return self._insertion_position(priority)
+        return position
+
+    def _positions(self, statuses: list[str], with_unset: bool, aggregate: str):
+        for status in statuses:
+            yield self.connection.execute(f"SELECT {aggregate}(position) FROM notes WHERE status = ?", (status,)).fetchone()[0]
+        if with_unset:
+            yield self.connection.execute(f"SELECT {aggregate}(position) FROM notes WHERE status IS NULL").fetchone()[0]
+
+    def _renumber(self):
+        """
+        Assigns consecutive positions to notes sorted by descending priority.
+        Notes with equal priority keep their order, like a stable sort does.
+        """
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS ordering (id INTEGER PRIMARY KEY, position INTEGER NOT NULL)")
+        self.connection.execute("DELETE FROM ordering")
+        self.connection.execute("""
+            INSERT INTO ordering (id, position)
+            SELECT notes.id, ROW_NUMBER() OVER (ORDER BY COALESCE(statuses.priority, 0) DESC, notes.position)
+            FROM notes LEFT JOIN statuses ON statuses.name = notes.status
+        """)
+        self.connection.execute("UPDATE notes SET position = (SELECT position FROM ordering WHERE ordering.id = notes.id)")
@@ -0,0 +1,105 @@
+"""
+Writing notes exported with `note export`.
+
+Notes are written one by one to a text stream in one of the formats:
+
+- `jsonl` - a JSON object per line with the 'id', 'content', 'tags' and
+  'status' of the note, which `note import` reads back,
+- `csv` - a header row followed by a row per note, with 'id', 'content',
+  'tags' (comma separated) and 'status' columns,
+- `md` - a Markdown table like the one printed by `note list`.
+
+Every note is formatted and written as soon as it is read, so exporting does
+not keep the exported notes in memory.
+"""
+import csv
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from app.core.errors import NoteAppError
+from app.core.models import NoteWithStatus
+
+JSONL = "jsonl"
+CSV = "csv"
+MARKDOWN = "md"
+FORMATS = {
+    ".jsonl": JSONL,
+    ".ndjson": JSONL,
+    ".csv": CSV,
+    ".md": MARKDOWN,
+    ".markdown": MARKDOWN
+}
+COLUMNS = ["id", "content", "tags", "status"]
+
+def detect_format(path: Path | None):
+    """
+    Returns the format of a file by its extension, jsonl for other files and
+    the standard output.
+    """
+    return JSONL if path is None else FORMATS.get(path.suffix.lower(), JSONL)
+
+def check_format(output_format: str):
+    """
+    Raises:
+        NoteAppError: If the format does not exist.
+    """
+    if output_format not in (JSONL, CSV, MARKDOWN):
+        raise NoteAppError(f"Unknown export format '{output_format}'. Available formats: {JSONL}, {CSV}, {MARKDOWN}.")
+
+def write_notes(file: TextIO, notes: Iterable[NoteWithStatus], output_format: str):
+    """
+    Writes notes to file.
+
+    Args:
+        file (TextIO): Stream to write notes to.
+        notes (Iterable[NoteWithStatus]): Notes to write, read lazily.
+        output_format (str): One of `JSONL`, `CSV` or `MARKDOWN`.
+
+    Raises:
+        NoteAppError: If the format does not exist.
+
+    Returns:
+        int: Number of written notes.
+    """
+    check_format(output_format)
+    writers = {JSONL: _write_jsonl, CSV: _write_csv, MARKDOWN: _write_markdown}
+    return writers[output_format](file, note_records(notes))
+
+def note_records(notes: Iterable[NoteWithStatus]) -> Iterator[dict]:
+    """
+    Yields notes as dictionaries with their 'id', 'content', 'tags' and
+    'status', the records of the exported formats.
+    """
+    for note_with_status in notes:
+        note = note_with_status.note
+        note_id = note.id if note.id is not None else note_with_status.idx + 1
+        yield {"id": note_id, "content": note.content, "tags": note.tags or [], "status": note.status}
+
+def _write_jsonl(file: TextIO, records: Iterator[dict]):
+    count = 0
+    for record in records:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+def _write_csv(file: TextIO, records: Iterator[dict]):
+    writer = csv.writer(file, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    count = 0
+    for record in records:
+        writer.writerow([record["id"], record["content"], ",".join(record["tags"]), record["status"] or ""])
+        count += 1
+    return count
+
+def _write_markdown(file: TextIO, records: Iterator[dict]):
+    file.write("| ID | Content | Status | Tags |\n| --- | --- | --- | --- |\n")
+    count = 0
+    for record in records:
+        tags = " ".join(f"#{tag}" for tag in record["tags"])
+        file.write(f"| {record['id']} | {_markdown_cell(record['content'])} | {record['status'] or ''} | {tags} |\n")
+        count += 1
+    return count
+
+def _markdown_cell(text: str):
+    return text.replace("\\", "\\\\").replace("|", "\\|").replace("\r\n", "<br>").replace("\n", "<br>")
@@ -0,0 +1,104 @@
+"""
+Group commit of notes added by concurrent `note add` processes.
+
+When the `NOTE_GROUP_COMMIT` environment variable is set to `1`, a session
+that only adds notes does not save the repository itself. It writes its
+changes as a batch file to the `.notes.pending` directory and waits for the
+exclusive repository lock. The first writer to get the lock becomes the
+leader: it saves the batches of every waiting writer at once and removes
+them, assigning ids to the added notes. Writers whose batch is already gone
+when they get the lock were committed by a leader and return without touching
+the repository, so many parallel writers share a single save.
+"""
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from app.core import GROUP_COMMIT_ENV, PENDING_DIRNAME
+from app.core import storage, operations
+from app.core.engines import atomic_write
+from app.core.errors import NoteAppError, StatusDoesNotExistError
+
+BATCH_SUFFIX = ".json"
+FAILED_SUFFIX = ".failed"
+
+def enabled():
+    return os.environ.get(GROUP_COMMIT_ENV) == "1"
+
+def pending_directory() -> Path:
+    return storage.repository.absolute().parent / PENDING_DIRNAME
+
+def commit(changes: list[dict]):
+    """
+    Commits changes together with the changes of other waiting writers.
+
+    Args:
+        changes (list[dict]): Operations to commit, only additions of notes
+                              are supported.
+
+    Raises:
+        NoteAppError: If the batch could not be applied to the repository.
+    """
+    if not changes:
+        return
+
+    directory = pending_directory()
+    directory.mkdir(exist_ok=True)
+    batch = directory / f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex}{BATCH_SUFFIX}"
+    atomic_write(batch, lambda file: json.dump(changes, file))
+
+    with storage.lock_repository():
+        if batch.exists():
+            _commit_pending(directory)
+
+    failure = batch.with_suffix(FAILED_SUFFIX)
+    if failure.exists():
+        message = failure.read_text()
+        failure.unlink()
+        raise NoteAppError(message)
+
+def _commit_pending(directory: Path):
+    """
+    Saves every pending batch with a single save. Must be called with the
+    exclusive repository lock held.
+
+    Batches are applied in the order they were written. A batch adding a note
+    with a status that was deleted in the meantime is not applied; its writer
+    finds the reason in a `.failed` file next to the batch.
+    """
+    batches = sorted(directory.glob(f"*{BATCH_SUFFIX}"))
+    if not batches:
+        return
+
+    engine = storage.open_repository()
+    try:
+        config = engine.load_config()
+        if "next_id" not in config:
+            config = storage.number_notes(engine)
+        statuses = config.get("statuses", {})
+        changes = []
+        for batch in batches:
+            batch_changes = json.loads(batch.read_text())
+            error = _validate(batch_changes, statuses)
+            if error is None:
+                changes.extend(batch_changes)
+            else:
+                batch.with_suffix(FAILED_SUFFIX).write_text(error)
+        operations.assign_ids(config, changes)
+        storage.save_changes(engine, None, changes)
+    finally:
+        engine.close()
+
+    for batch in batches:
+        batch.unlink(missing_ok=True)
+
+def _validate(changes: list[dict], statuses: dict):
+    for change in changes:
+        if change.get("op") != operations.ADD_NOTE:
+            return f"Cannot commit repository operation '{change.get('op')}' in a group."
+        status = change["note"]["status"]
+        if status and status not in statuses:
+            return str(StatusDoesNotExistError(f"There is no status {status} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one."))
+    return None
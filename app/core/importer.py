@@ -0,0 +1,117 @@
+"""
+Reading notes to import with `note import`.
+
+Notes are read one by one from a text stream in one of the formats:
+
+- `jsonl` - a JSON object per line with the 'content' of the note and
+  optionally its 'tags', as a list or a comma separated string, and 'status',
+- `csv` - a header row followed by a row per note, with a 'content' column
+  and optionally 'tags' (comma separated) and 'status' columns,
+- `text` - the content of a note per line.
+
+Blank lines are skipped. Tags are validated like tags given to `note add`,
+statuses are checked against the repository when notes are added (see
+`app.core.repository.Repository.import_notes`).
+"""
+import csv
+import json
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from app.core.errors import NoteAppError
+from app.core.models import Note
+from app.core.utils import parse_tags
+
+JSONL = "jsonl"
+CSV = "csv"
+TEXT = "text"
+FORMATS = {
+    ".jsonl": JSONL,
+    ".ndjson": JSONL,
+    ".csv": CSV
+}
+
+def detect_format(path: Path | None):
+    """
+    Returns the format of a file by its extension, text for other files and
+    the standard input.
+    """
+    return TEXT if path is None else FORMATS.get(path.suffix.lower(), TEXT)
+
+def read_notes(file: TextIO, input_format: str, tags: list[str] | None = None, status: str | None = None) -> Iterator[tuple[int, Note]]:
+    """
+    Reads notes from file.
+
+    Args:
+        file (TextIO): Stream to read notes from.
+        input_format (str): One of `JSONL`, `CSV` or `TEXT`.
+        tags (list[str] | None): Tags of notes which do not have their own.
+        status (str | None): Status of notes which do not have their own.
+
+    Raises:
+        NoteAppError: If the format does not exist or a note is not valid.
+
+    Yields:
+        tuple[int, Note]: Number of the line a note was read from and the note.
+    """
+    if input_format == JSONL:
+        records = _read_jsonl(file)
+    elif input_format == CSV:
+        records = _read_csv(file)
+    elif input_format == TEXT:
+        records = ((line, {"content": content}) for line, content in _lines(file))
+    else:
+        raise NoteAppError(f"Unknown import format '{input_format}'. Available formats: {JSONL}, {CSV}, {TEXT}.")
+
+    for line, record in records:
+        try:
+            note_tags = _tags(record.get("tags"))
+        except NoteAppError as error:
+            raise _error(line, error)
+        note_status = record.get("status") or None
+        if note_status is not None and not isinstance(note_status, str):
+            raise _error(line, "Status should be a string.")
+        yield line, Note.create(record["content"], note_tags or tags, note_status or status)
+
+def _lines(file: TextIO):
+    for line, text in enumerate(file, 1):
+        text = text.rstrip("\r\n")
+        if text.strip():
+            yield line, text
+
+def _read_jsonl(file: TextIO):
+    for line, text in _lines(file):
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as error:
+            raise _error(line, f"It is not valid JSON. {error}")
+        if not isinstance(record, dict) or not isinstance(record.get("content"), str):
+            raise _error(line, "It should be a JSON object with the 'content' of the note.")
+        yield line, record
+
+def _read_csv(file: TextIO):
+    reader = csv.DictReader(file)
+    if reader.fieldnames is None or "content" not in reader.fieldnames:
+        raise NoteAppError("Notes were not imported. CSV input should start with a header row with a 'content' column.")
+    try:
+        for record in reader:
+            if record["content"] is None or not record["content"].strip():
+                continue
+            yield reader.line_num, record
+    except csv.Error as error:
+        raise _error(reader.line_num, f"It is not valid CSV. {error}")
+
+def _tags(tags: str | list | None):
+    if not tags:
+        return None
+    if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+        tags = ",".join(tags)
+    if not isinstance(tags, str):
+        raise NoteAppError("Tags should be a list or a comma separated string.")
+    try:
+        return parse_tags(tags)
+    except NoteAppError:
+        raise NoteAppError("Tags should contain only letters and numbers.")
+
+def _error(line: int, reason: str | Exception):
+    return NoteAppError(f"Notes were not imported because of an error in line {line}. {reason}")
@@ -0,0 +1,57 @@
+"""
+Advisory locking of the note repository.
+
+Sessions that only read the repository hold a shared lock, sessions that
+change it hold an exclusive one, so concurrent `note` processes never lose
+each other's changes. The lock is taken on a separate lock file, because the
+repository file itself is replaced on every save.
+
+Locking relies on `fcntl` and is skipped on platforms that do not provide it.
+"""
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class RepositoryLock:
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self, shared: bool = False):
+        """
+        Blocks until the lock is acquired.
+
+        Args:
+            shared (bool): Whether to take a shared lock, which can be held by
+                           many readers at once, instead of an exclusive one.
+        """
+        if fcntl is None or self._file is not None:
+            return
+
+        self._file = self.path.open("a")
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+
+    def release(self):
+        if self._file is None:
+            return
+
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
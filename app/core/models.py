@@ -1,10 +1,11 @@
 from dataclasses import dataclass, asdict
 
-@dataclass
+@dataclass(slots=True)
 class Note:
     content: str
     tags: list[str] | None
     status: str | None
+    id: int | None = None
 
     @staticmethod
     def create(content: str, tags: list[str] | None = None, status: str | None = None):
@@ -13,7 +14,7 @@ class Note:
     def to_dict(self):
         return asdict(self)
 
-@dataclass
+@dataclass(slots=True)
 class Status:
     style: str
     priority: int
@@ -24,8 +25,19 @@ class Status:
         priority = priority if priority else 0
         return Status(style, priority)
 
-@dataclass
+@dataclass(slots=True)
 class NoteWithStatus:
     idx: int
     note: Note
     status: Status
+    # Path of the repository of the note when notes of many repositories are
+    # listed together, see `app.core.scanner`.
+    repository: str | None = None
+
+@dataclass(slots=True)
+class CompressionReport:
+    compression: str
+    size: int
+    write_time: float
+    read_time: float
+    current: bool
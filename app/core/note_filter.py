@@ -0,0 +1,179 @@
+"""
+Boolean filters of notes by tags and statuses, used by `note list --where`.
+
+A filter is made of terms `tag:NAME` and `status:NAME` combined with `AND`,
+`OR`, `NOT` and parentheses, for example:
+
+    tag:bug AND (status:OPEN OR tag:urgent) AND NOT tag:wontfix
+
+`NOT` binds tighter than `AND`, which binds tighter than `OR`. A parsed filter
+is evaluated against the tag index (see `app.core.tag_index`): the positions
+of notes with every tag and status used by the filter are turned into bitmaps,
+Python integers with a bit set for every matching position, and the filter is
+computed with a few bitwise operations on them instead of checking notes one
+by one.
+"""
+import re
+from array import array
+
+from app.core.errors import NoteAppError
+from app.core.tag_index import TagIndex
+
+TOKEN = re.compile(r"\(|\)|[^\s()]+")
+TAG = "tag"
+STATUS = "status"
+AND = "AND"
+OR = "OR"
+NOT = "NOT"
+
+class Bitmaps:
+    """
+    Bitmaps of the notes described by a tag index, built when first needed.
+    """
+    def __init__(self, index: TagIndex):
+        self.index = index
+        self.all = (1 << index.count) - 1
+        self._cache = {}
+
+    def get(self, kind: str, name: str):
+        key = (kind, name)
+        if key not in self._cache:
+            postings = self.index.tags if kind == TAG else self.index.statuses
+            self._cache[key] = _bitmap(postings.get(name, ()), self.index.count)
+        return self._cache[key]
+
+class Term:
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def evaluate(self, bitmaps: Bitmaps):
+        return bitmaps.get(self.kind, self.name)
+
+    def statuses(self):
+        return {self.name} if self.kind == STATUS else set()
+
+class Not:
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, bitmaps: Bitmaps):
+        return bitmaps.all & ~self.operand.evaluate(bitmaps)
+
+    def statuses(self):
+        return self.operand.statuses()
+
+class And:
+    def __init__(self, operands: list):
+        self.operands = operands
+
+    def evaluate(self, bitmaps: Bitmaps):
+        result = bitmaps.all
+        for operand in self.operands:
+            result &= operand.evaluate(bitmaps)
+            if not result:
+                break
+        return result
+
+    def statuses(self):
+        return set().union(*(operand.statuses() for operand in self.operands))
+
+class Or(And):
+    def evaluate(self, bitmaps: Bitmaps):
+        result = 0
+        for operand in self.operands:
+            result |= operand.evaluate(bitmaps)
+        return result
+
+class NoteFilter:
+    """
+    A parsed filter.
+
+    Raises:
+        NoteAppError: If the filter is not valid.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self._tokens = TOKEN.findall(text)
+        self._next = 0
+        if not self._tokens:
+            raise NoteAppError("Invalid filter, it does not contain any terms.")
+        self.expression = self._or()
+        if self._peek() is not None:
+            raise NoteAppError(f"Invalid filter, unexpected '{self._peek()}'.")
+
+    def statuses(self):
+        """
+        Returns names of statuses used by the filter.
+        """
+        return self.expression.statuses()
+
+    def positions(self, index: TagIndex):
+        """
+        Returns sorted positions of notes matching the filter.
+        """
+        return _positions(self.expression.evaluate(Bitmaps(index)))
+
+    def _peek(self):
+        return self._tokens[self._next] if self._next < len(self._tokens) else None
+
+    def _keyword(self, keyword: str):
+        token = self._peek()
+        if token is not None and token.upper() == keyword:
+            self._next += 1
+            return True
+        return False
+
+    def _or(self):
+        operands = [self._and()]
+        while self._keyword(OR):
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _and(self):
+        operands = [self._not()]
+        while self._keyword(AND):
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _not(self):
+        if self._keyword(NOT):
+            return Not(self._not())
+        return self._operand()
+
+    def _operand(self):
+        token = self._peek()
+        if token is None:
+            raise NoteAppError("Invalid filter, it ends unexpectedly.")
+        self._next += 1
+
+        if token == "(":
+            expression = self._or()
+            if self._peek() != ")":
+                raise NoteAppError("Invalid filter, missing ')'.")
+            self._next += 1
+            return expression
+
+        kind, _, name = token.partition(":")
+        if kind.lower() not in (TAG, STATUS) or not name:
+            raise NoteAppError(f"Invalid filter term '{token}'. Use tag:NAME or status:NAME.")
+        return Term(kind.lower(), name)
+
+def _bitmap(positions: array, count: int):
+    bits = bytearray((count + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+def _positions(bitmap: int):
+    """
+    Returns positions of set bits, found with string searches rather than by
+    checking every bit.
+    """
+    bits = bin(bitmap)[:1:-1]
+    positions = []
+    position = bits.find("1")
+    while position >= 0:
+        positions.append(position)
+        position = bits.find("1", position + 1)
+    return positions
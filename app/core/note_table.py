@@ -0,0 +1,167 @@
+"""
+Compact in-memory table of notes used by `Repository`.
+
+Notes are kept column by column instead of as a list of dictionaries. Contents
+are a list of strings, and ids, statuses and tags are arrays of integers:
+status names and tag lists are interned, so every distinct status and every
+distinct list of tags is stored once and notes refer to it by index. A note
+takes a few bytes besides its content, compared to a few hundred bytes for a
+dictionary holding a list of tags.
+
+The table is a mutable sequence of notes in the storage format (see
+`app.core.operations`), so operations are applied to it like to a list.
+Notes read from the table are new dictionaries; changing them does not
+change the table, they have to be assigned back.
+"""
+from array import array
+from collections.abc import MutableSequence
+from typing import Iterable
+
+NOT_SET = -1
+NO_ID = 0
+
+class NoteTable(MutableSequence):
+    def __init__(self, notes: Iterable[dict] = ()):
+        self.contents: list[str] = []
+        self.ids = array("q")
+        self.status_ids = array("i")
+        self.tag_ids = array("i")
+        self.statuses: list[str] = []
+        self.tags: list[tuple[str, ...]] = []
+        self._status_index: dict[str, int] = {}
+        self._tags_index: dict[tuple[str, ...], int] = {}
+        self.extend(notes)
+
+    def __len__(self):
+        return len(self.contents)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return [self._note(idx) for idx in range(*index.indices(len(self)))]
+        return self._note(index)
+
+    def __setitem__(self, index: int | slice, value):
+        if isinstance(index, slice):
+            contents, ids, status_ids, tag_ids = self._encode(value)
+            self.contents[index] = contents
+            self.ids[index] = ids
+            self.status_ids[index] = status_ids
+            self.tag_ids[index] = tag_ids
+            return
+
+        content, note_id, status_id, tag_id = self._encode_note(value)
+        self.contents[index] = content
+        self.ids[index] = note_id
+        self.status_ids[index] = status_id
+        self.tag_ids[index] = tag_id
+
+    def __delitem__(self, index: int | slice):
+        del self.contents[index]
+        del self.ids[index]
+        del self.status_ids[index]
+        del self.tag_ids[index]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._note(idx)
+
+    def insert(self, index: int, value: dict):
+        content, note_id, status_id, tag_id = self._encode_note(value)
+        self.contents.insert(index, content)
+        self.ids.insert(index, note_id)
+        self.status_ids.insert(index, status_id)
+        self.tag_ids.insert(index, tag_id)
+
+    def extend(self, values: Iterable[dict]):
+        for value in values:
+            content, note_id, status_id, tag_id = self._encode_note(value)
+            self.contents.append(content)
+            self.ids.append(note_id)
+            self.status_ids.append(status_id)
+            self.tag_ids.append(tag_id)
+
+    def delete_positions(self, positions: list[int]):
+        """
+        Removes notes at the given sorted positions, compacting every column
+        once.
+        """
+        removed = set(positions)
+        start = positions[0]
+        kept = [idx for idx in range(start, len(self)) if idx not in removed]
+        self.contents[start:] = [self.contents[idx] for idx in kept]
+        for column in (self.ids, self.status_ids, self.tag_ids):
+            column[start:] = array(column.typecode, [column[idx] for idx in kept])
+
+    def to_notes(self):
+        """
+        Converts the table to the list of notes stored by storage engines.
+        """
+        return list(self)
+
+    def has_status(self, status: str):
+        status_id = self._status_index.get(status)
+        return status_id is not None and status_id in self.status_ids
+
+    def tag_positions(self, tags: list[str]):
+        """
+        Returns positions of notes with at least one of the given tags.
+        """
+        tags = set(tags)
+        matching = {tag_id for tag_id, note_tags in enumerate(self.tags) if not tags.isdisjoint(note_tags)}
+        return [idx for idx, tag_id in enumerate(self.tag_ids) if tag_id in matching]
+
+    def all_tags(self):
+        """
+        Returns tags of every note, including repeated ones.
+        """
+        counts = {}
+        for tag_id in self.tag_ids:
+            if tag_id != NOT_SET:
+                counts[tag_id] = counts.get(tag_id, 0) + 1
+        return [tag for tag_id, count in counts.items() for tag in self.tags[tag_id] * count]
+
+    def _note(self, idx: int):
+        status_id = self.status_ids[idx]
+        tag_id = self.tag_ids[idx]
+        note = {
+            "content": self.contents[idx],
+            "tags": None if tag_id == NOT_SET else list(self.tags[tag_id]),
+            "status": None if status_id == NOT_SET else self.statuses[status_id]
+        }
+        if self.ids[idx] != NO_ID:
+            note["id"] = self.ids[idx]
+        return note
+
+    def _encode(self, notes: Iterable[dict]):
+        columns = ([], array("q"), array("i"), array("i"))
+        for note in notes:
+            for column, value in zip(columns, self._encode_note(note)):
+                column.append(value)
+        return columns
+
+    def _encode_note(self, note: dict):
+        return (
+            note["content"],
+            note.get("id") or NO_ID,
+            self._intern_status(note["status"]),
+            self._intern_tags(note["tags"])
+        )
+
+    def _intern_status(self, status: str | None):
+        if status is None:
+            return NOT_SET
+        status_id = self._status_index.get(status)
+        if status_id is None:
+            status_id = self._status_index[status] = len(self.statuses)
+            self.statuses.append(status)
+        return status_id
+
+    def _intern_tags(self, tags: list[str] | None):
+        if tags is None:
+            return NOT_SET
+        key = tuple(tags)
+        tag_id = self._tags_index.get(key)
+        if tag_id is None:
+            tag_id = self._tags_index[key] = len(self.tags)
+            self.tags.append(key)
+        return tag_id
@@ -0,0 +1,202 @@
+"""
+Defines operation records describing changes made to the note repository.
+
+Every mutation performed by `Repository` is expressed as an operation - a plain
+dictionary that can be serialized to JSON. Operations are applied to the
+in-memory repository and, when journaling is enabled, appended to the
+repository journal so they can be replayed on load.
+
+Notes are identified by ids stored in their records. Ids are allocated from
+the 'next_id' field of the repository configuration when a note is added by
+a session holding the exclusive repository lock (see `assign_ids`) and are
+never reused. Repositories created before ids were introduced do not have
+the field until their notes are numbered, see
+`app.core.storage.number_notes`.
+"""
+from bisect import bisect_left, bisect_right
+
+from app.core.errors import RepositoryCorruptedError
+from app.core.note_table import NoteTable
+
+ADD_NOTE = "add_note"
+DELETE_NOTE = "delete_note"
+DELETE_NOTES = "delete_notes"
+CREATE_STATUS = "create_status"
+EDIT_STATUS = "edit_status"
+DELETE_STATUS = "delete_status"
+
+def add_note(note: dict):
+    return {"op": ADD_NOTE, "note": note}
+
+def delete_note(position: int, note_id: int | None = None):
+    return {"op": DELETE_NOTE, "position": position, "id": note_id}
+
+def delete_notes(positions: list[int], note_ids: list[int | None]):
+    """
+    Deletes many notes at once. Positions are sorted and refer to the notes
+    before any of them is deleted.
+    """
+    return {"op": DELETE_NOTES, "positions": positions, "ids": note_ids}
+
+def create_status(name: str, status: dict):
+    return {"op": CREATE_STATUS, "name": name, "status": status}
+
+def edit_status(name: str, style: str | None, priority: int | None):
+    return {"op": EDIT_STATUS, "name": name, "style": style, "priority": priority}
+
+def delete_status(name: str):
+    return {"op": DELETE_STATUS, "name": name}
+
+def assign_ids(config: dict, changes: list[dict]):
+    """
+    Assigns ids to notes added by changes that do not have one yet. The
+    configuration is not changed, applying the changes updates it.
+    """
+    next_id = config["next_id"]
+    for change in changes:
+        if change["op"] == ADD_NOTE and change["note"].get("id") is None:
+            change["note"]["id"] = next_id
+            next_id += 1
+
+def priority(statuses: dict, status: str | None):
+    return 0 if status is None else statuses[status]["priority"]
+
+def bucket(notes: list[dict], statuses: dict, value: int):
+    """
+    Finds the bucket of notes with the given priority.
+
+    Notes are kept sorted by descending priority, so notes with equal
+    priority form a contiguous bucket, found by binary search.
+
+    Returns:
+        tuple[int, int]: Start and end of the bucket in notes.
+    """
+    key = lambda note: -priority(statuses, note["status"])
+    return bisect_left(notes, -value, key=key), bisect_right(notes, -value, key=key)
+
+def status_positions(notes: list[dict], statuses: dict, name: str):
+    """
+    Returns positions of notes with the given status, looked up only in the
+    bucket of its priority.
+    """
+    start, end = bucket(notes, statuses, statuses[name]["priority"])
+    return [position for position in range(start, end) if notes[position]["status"] == name]
+
+def apply_operations(notes: list[dict], config: dict, operations: list[dict]):
+    """
+    Applies operations to the notes list and repository configuration in
+    place.
+
+    Notes are kept sorted by descending priority of their statuses, with
+    notes of equal priority in the order they were added, as a stable sort
+    would leave them. An added note goes to the end of the bucket of its
+    priority (see `bucket`); consecutive additions are grouped, so each
+    bucket is extended once. When a status changes its priority, only its
+    notes are moved, to the start of the new bucket if the priority
+    decreased or to its end if it increased. Adding a note with an id moves
+    the 'next_id' field of the configuration past it.
+
+    Args:
+        notes (list[dict]): Notes of the repository, sorted.
+        config (dict): Configuration of the repository.
+        operations (list[dict]): Operation records to apply, in order.
+
+    Raises:
+        RepositoryCorruptedError: If an operation is unknown or cannot be applied.
+    """
+    try:
+        statuses = config["statuses"]
+    except (KeyError, TypeError) as error:
+        raise RepositoryCorruptedError(f"Notes repository configuration does not contain field {error}.")
+
+    added = {}
+    for operation in operations:
+        try:
+            kind = operation["op"]
+            if kind == ADD_NOTE:
+                note = operation["note"]
+                added.setdefault(priority(statuses, note["status"]), []).append(note)
+                if note.get("id") is not None and "next_id" in config:
+                    config["next_id"] = max(config["next_id"], note["id"] + 1)
+                continue
+
+            _insert_added(notes, statuses, added)
+
+            if kind == DELETE_NOTE:
+                notes.pop(operation["position"])
+            elif kind == DELETE_NOTES:
+                delete_positions(notes, operation["positions"])
+            elif kind == CREATE_STATUS:
+                statuses[operation["name"]] = operation["status"]
+            elif kind == EDIT_STATUS:
+                status = statuses[operation["name"]]
+                if operation["style"]:
+                    status["style"] = operation["style"]
+                if operation["priority"]:
+                    _move_status(notes, statuses, operation["name"], operation["priority"])
+            elif kind == DELETE_STATUS:
+                _move_status(notes, statuses, operation["name"], 0, clear=True)
+                statuses.pop(operation["name"])
+            else:
+                raise RepositoryCorruptedError(f"Unknown repository operation '{kind}'.")
+        except (KeyError, IndexError, TypeError) as error:
+            raise RepositoryCorruptedError(f"Cannot apply repository operation {operation}. {error}")
+
+    try:
+        _insert_added(notes, statuses, added)
+    except (KeyError, TypeError) as error:
+        raise RepositoryCorruptedError(f"Cannot apply repository operations. {error}")
+
+def delete_positions(notes: list[dict], positions: list[int]):
+    """
+    Removes notes at the given sorted positions in a single pass over the
+    notes following the first of them.
+
+    Raises:
+        IndexError: If a position is out of range.
+    """
+    if not positions:
+        return
+    if positions[-1] >= len(notes) or positions[0] < 0:
+        raise IndexError("note position out of range")
+    if isinstance(notes, NoteTable):
+        notes.delete_positions(positions)
+        return
+
+    removed = set(positions)
+    start = positions[0]
+    notes[start:] = [note for position, note in enumerate(notes[start:], start) if position not in removed]
+
+def _insert_added(notes: list[dict], statuses: dict, added: dict[int, list[dict]]):
+    for value, group in added.items():
+        _, end = bucket(notes, statuses, value)
+        notes[end:end] = group
+    added.clear()
+
+def _move_status(notes: list[dict], statuses: dict, name: str, value: int, clear: bool = False):
+    """
+    Changes the priority of a status and moves its notes to the bucket of
+    the new priority. If clear is set, the status is removed from the moved
+    notes. Notes are replaced rather than changed in place, so notes can be
+    any mutable sequence of notes, like `app.core.note_table.NoteTable`.
+    """
+    status = statuses[name]
+    previous = status["priority"]
+    start, end = bucket(notes, statuses, previous)
+    bucket_notes = notes[start:end]
+    status["priority"] = value
+    moving = [note["status"] == name for note in bucket_notes]
+    if not any(moving):
+        return
+
+    if clear:
+        bucket_notes = [dict(note, status=None) if move else note for note, move in zip(bucket_notes, moving)]
+    if value == previous:
+        if clear:
+            notes[start:end] = bucket_notes
+        return
+
+    notes[start:end] = [note for note, move in zip(bucket_notes, moving) if not move]
+    start, end = bucket(notes, statuses, value)
+    position = start if value < previous else end
+    notes[position:position] = [note for note, move in zip(bucket_notes, moving) if move]
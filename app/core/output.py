@@ -0,0 +1,102 @@
+"""
+Machine-readable output of `note list --format`.
+
+Notes, tags and statuses are written straight to a text stream, without Rich,
+in one of the formats:
+
+- `plain` - a line per note with its id, content, status in brackets and
+  tags, a tag per line, or a status and its priority per line,
+- `tsv` - tab separated values without a header row: id, content, status and
+  comma separated tags of notes, or name, priority and style of statuses,
+- `json` - a JSON array of objects (strings for tags),
+- `ndjson` - a JSON object (a string for tags) per line.
+
+Tabs, new lines and backslashes in plain and tsv values are escaped as `\\t`,
+`\\n` and `\\\\`, so every record takes exactly one line. Records are written
+as they are read, so notes are never kept in memory.
+"""
+import json
+from typing import Iterable, TextIO
+
+from app.core import profiling
+from app.core.errors import NoteAppError
+from app.core.exporter import note_records
+from app.core.models import NoteWithStatus, Status
+
+PLAIN = "plain"
+TSV = "tsv"
+JSON = "json"
+NDJSON = "ndjson"
+FORMATS = (PLAIN, TSV, JSON, NDJSON)
+
+def check_format(output_format: str):
+    """
+    Raises:
+        NoteAppError: If the format does not exist.
+    """
+    if output_format not in FORMATS:
+        raise NoteAppError(f"Unknown output format '{output_format}'. Available formats: {', '.join(FORMATS)}.")
+
+def write_notes(file: TextIO, notes: Iterable[NoteWithStatus], output_format: str):
+    check_format(output_format)
+    with profiling.span("render"):
+        _write_notes(file, profiling.timed_iter("read", notes), output_format)
+
+def _write_notes(file: TextIO, notes: Iterable[NoteWithStatus], output_format: str):
+    records = note_records(notes)
+    if output_format == PLAIN:
+        lines = (
+            " ".join([
+                str(record["id"]), _escape(record["content"]),
+                *([f"[{record['status']}]"] if record["status"] else []),
+                *(f"#{tag}" for tag in record["tags"])
+            ]) + "\n"
+            for record in records
+        )
+    elif output_format == TSV:
+        lines = (
+            "\t".join([
+                str(record["id"]), _escape(record["content"]),
+                record["status"] or "", ",".join(record["tags"])
+            ]) + "\n"
+            for record in records
+        )
+    else:
+        lines = _json_lines(records, output_format)
+    file.writelines(lines)
+
+def write_tags(file: TextIO, tags: Iterable[str], output_format: str):
+    check_format(output_format)
+    tags = dict.fromkeys(tags)
+    if output_format in (PLAIN, TSV):
+        file.writelines(f"{tag}\n" for tag in tags)
+    else:
+        file.writelines(_json_lines(tags, output_format))
+
+def write_statuses(file: TextIO, statuses: Iterable[tuple[str, Status]], output_format: str):
+    check_format(output_format)
+    if output_format == PLAIN:
+        file.writelines(f"{name} {status.priority}\n" for name, status in statuses)
+    elif output_format == TSV:
+        file.writelines(f"{name}\t{status.priority}\t{status.style}\n" for name, status in statuses)
+    else:
+        records = ({"name": name, "style": status.style, "priority": status.priority} for name, status in statuses)
+        file.writelines(_json_lines(records, output_format))
+
+def _json_lines(values: Iterable, output_format: str):
+    """
+    Yields values as lines of a JSON array, or a value per line for ndjson.
+    """
+    if output_format == NDJSON:
+        for value in values:
+            yield json.dumps(value, ensure_ascii=False) + "\n"
+        return
+
+    separator = "[\n"
+    for value in values:
+        yield separator + json.dumps(value, ensure_ascii=False)
+        separator = ",\n"
+    yield "[]\n" if separator == "[\n" else "\n]\n"
+
+def _escape(text: str):
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\r", "\\r").replace("\n", "\\n")
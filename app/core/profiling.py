@@ -0,0 +1,135 @@
+"""
+Timing of the phases of a command, reported with `note --profile`.
+
+Modules mark their phases with `span`, like loading the repository or
+rendering notes. Spans do nothing until profiling is started with `start`;
+then the time spent in every span is summed by its path of enclosing spans,
+and `report` prints the breakdown to the standard error when the command
+ends. Notes streamed from the storage engine are read while they are
+printed, so the time spent reading them is counted with `timed_iter` as a
+phase within printing.
+
+Profiling is started by the `--profile` option or the `NOTE_PROFILE`
+environment variable, for example in batch jobs. With `--profile-dump FILE`
+or `NOTE_PROFILE_DUMP=FILE` the command is also profiled with cProfile and
+its statistics are written to FILE, to be read with `pstats`.
+"""
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator
+
+STARTED = time.perf_counter()
+IMPORT = "import"
+
+_enabled = False
+_stack: list[str] = []
+_phases: dict[tuple[str, ...], list] = {}
+_profiler = None
+_dump_path = None
+_disabled_span = nullcontext()
+
+def start(dump_path: str | None = None):
+    """
+    Starts profiling the command, and cProfile if dump_path is given.
+    """
+    global _enabled, _profiler, _dump_path
+    _enabled = True
+    if dump_path:
+        import cProfile
+
+        _dump_path = dump_path
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+def span(name: str):
+    """
+    Context manager timing a phase named name, nested in the spans it is
+    entered within.
+    """
+    if not _enabled:
+        return _disabled_span
+    return _span(name)
+
+@contextmanager
+def _span(name: str):
+    _stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(tuple(_stack), time.perf_counter() - start)
+        _stack.pop()
+
+def timed_iter(name: str, items: Iterable) -> Iterator:
+    """
+    Yields items, timing the time spent getting every next item as a phase
+    named name.
+    """
+    if not _enabled:
+        yield from items
+        return
+    iterator = iter(items)
+    while True:
+        with span(name):
+            item = next(iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+_END = object()
+
+def add(path: tuple[str, ...] | str, elapsed: float):
+    """
+    Adds time spent in a phase. Phases added before profiling is started,
+    like importing the command, are reported as well.
+    """
+    if isinstance(path, str):
+        path = (path,)
+    phase = _phases.setdefault(path, [0.0, 0])
+    phase[0] += elapsed
+    phase[1] += 1
+
+def report(command: str | None = None):
+    """
+    Prints the time of every phase and writes the cProfile statistics, and
+    stops profiling. Time not spent in any phase is reported as 'other'.
+    """
+    global _enabled, _profiler
+    if not _enabled:
+        return
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_dump_path)
+    _enabled = False
+
+    total = time.perf_counter() - STARTED
+    accounted = sum(elapsed for path, (elapsed, _) in _phases.items() if len(path) == 1)
+    lines = [f"Profile of `note{' ' + command if command else ''}`: {total * 1000:.1f} ms"]
+    for path in _ordered(_phases):
+        elapsed, count = _phases[path]
+        name = "  " * len(path) + path[-1]
+        calls = f"  {count}x" if count > 1 else ""
+        lines.append(f"{name:<32} {elapsed * 1000:10.1f} ms{calls}")
+    lines.append(f"{'  other':<32} {max(total - accounted, 0) * 1000:10.1f} ms")
+    if _profiler is not None:
+        lines.append(f"cProfile statistics written to {_dump_path}.")
+        _profiler = None
+    _phases.clear()
+    print("\n".join(lines), file=sys.stderr)
+
+def _ordered(phases: dict[tuple[str, ...], list]):
+    """
+    Orders phases so every phase follows the phase it is nested in, in the
+    order they were first entered.
+    """
+    children = {}
+    for path in phases:
+        children.setdefault(path[:-1], []).append(path)
+
+    def walk(parent):
+        for path in children.get(parent, []):
+            yield path
+            yield from walk(path)
+
+    return list(walk(()))
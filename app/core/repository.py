@@ -2,22 +2,149 @@
 Provides high-level operations on the note repository, such as creating the repository
 and adding notes. This module separates core logic from low-level file storage operations.
 """
-from copy import deepcopy
+import sys
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
 
 import typer
 
-from app.core import storage
+from app.core import storage, operations, group_commit, tag_index, client, profiling
 from app.core.models import Note, Status, NoteWithStatus
+from app.core.note_table import NoteTable
+from app.core.note_filter import NoteFilter
 from app.core.errors import RepositoryCorruptedError, NotesNotFoundError, NoteAppError, StatusDoesNotExistError
-from app.core.utils import print_notes, print_tags, print_statuses
+from app.core.utils import print_notes, print_tags, print_statuses, print_compression_report
 
 class Repository:
+    """
+    A session on the notes repository, used as a context manager.
+
+    The repository is loaded when first needed and saved on exit, but only
+    if the session changed it and no exception was raised. Changes that do
+    not need notes, like adding a note, are checked against the repository
+    configuration only and passed to the storage engine without loading the
+    notes. Sessions opened with `read_only=True` never write to the
+    repository. Listing notes in a session that has not loaded the repository
+    streams them from the storage engine instead.
+
+    A session holds a shared lock on the repository if it only reads it and
+    an exclusive lock otherwise. Sessions opened with `batched=True` may only
+    add notes; when group commit is enabled (see `app.core.group_commit`)
+    they hold a shared lock and their changes are saved together with those
+    of other waiting writers.
+
+    Added notes get their ids in sessions holding the exclusive lock, or
+    when their batch is committed otherwise. Notes are found by their ids
+    with a hash index: of the loaded notes, or the tag index (see
+    `app.core.tag_index`) if the repository is not loaded.
+
+    Sessions opened with a `RepositoryCache` start with the repository kept
+    in it, as long as the repository files have not changed since, and
+    leave the loaded repository in it when they end, with the tag index of
+    its notes if one was built for `--where` filters. Notes, tags and
+    statuses are printed to the Rich `console` of the session if it is
+    given, like the note server does for every request, and to the global
+    console otherwise.
+    """
+    def __init__(self, read_only: bool = False, batched: bool = False, cache: "RepositoryCache | None" = None, console=None):
+        self.read_only = read_only
+        self.console = console
+        self.batched = batched and group_commit.enabled()
+        self.cache = cache
+
     def __enter__(self):
-        self.repository = storage.load_repository()
+        self._lock = storage.lock_repository(shared=self.read_only or self.batched)
+        try:
+            self.engine = storage.open_repository()
+        except BaseException:
+            self._lock.release()
+            raise
+        self._repository = None
+        self._config = None
+        self._changes = []
+        self._note_positions = None
+        self._note_views = None
+        self._tag_index = None
+        try:
+            if self.cache is not None:
+                self._repository = self.cache.get(tag_index.stamp(self.engine))
+                if self._repository is not None:
+                    self._tag_index = self.cache.index
+            if not (self.read_only or self.batched) and "next_id" not in self._configuration:
+                self._repository = None
+                self._tag_index = None
+                self._config = storage.number_notes(self.engine)
+        except BaseException:
+            self.engine.close()
+            self._lock.release()
+            raise
         return self
     
     def __exit__(self, exc_type, exc_value, traceback):
-        storage.save_repository(self.repository)
+        try:
+            if exc_type is None and self.dirty and not self.batched:
+                storage.save_changes(self.engine, self._repository, self._changes)
+            if self.cache is not None:
+                self._update_cache(exc_type is None)
+        finally:
+            self.engine.close()
+            self._lock.release()
+
+        if exc_type is None and self.dirty and self.batched:
+            group_commit.commit(self._changes)
+
+    def _update_cache(self, saved: bool):
+        """
+        Keeps the loaded repository in the cache. The cached repository is
+        changed in place by sessions, so it is dropped if changes were not
+        saved.
+        """
+        if self.dirty and not saved:
+            self.cache.clear()
+        elif self.loaded:
+            self.cache.put(tag_index.stamp(self.engine), self._repository, self._tag_index)
+
+    @property
+    def repository(self):
+        """
+        The loaded repository. Its notes are kept in a `NoteTable`, filled
+        while they are streamed from the storage engine (in parallel for
+        segmented repositories, see `SegmentedEngine.iter_notes`), which is
+        saved by storage engines like a list of notes.
+        """
+        if self._repository is None:
+            with profiling.span("load"):
+                repository = self.engine.load_metadata()
+                repository["notes"] = NoteTable(note for _, note in self.engine.iter_notes())
+            self._repository = repository
+            if self._changes:
+                with profiling.span("apply"):
+                    operations.apply_operations(self._notes, self._configuration, self._changes)
+        return self._repository
+
+    @property
+    def loaded(self):
+        return self._repository is not None
+
+    @property
+    def dirty(self):
+        return bool(self._changes)
+
+    def _apply(self, operation: dict):
+        if self.read_only:
+            raise NoteAppError("Cannot change the repository in a read-only session.")
+        if self.batched and operation["op"] != operations.ADD_NOTE:
+            raise NoteAppError("Only notes can be added in a batched session.")
+        with profiling.span("apply"):
+            if self.loaded:
+                operations.apply_operations(self._notes, self._configuration, [operation])
+            elif operation["op"] not in (operations.DELETE_NOTE, operations.DELETE_NOTES):
+                operations.apply_operations([], self._configuration, [operation])
+        self._note_positions = None
+        self._note_views = None
+        self._tag_index = None
+        self._changes.append(operation)
 
     @property
     def _notes(self):
@@ -25,40 +152,79 @@ class Repository:
             raise RepositoryCorruptedError("Notes repository does not contain field 'notes'.")
         return self.repository["notes"]
     
+    @property
+    def _configuration(self):
+        if self.loaded:
+            if "config" not in self.repository.keys():
+                raise RepositoryCorruptedError("Notes repository does not contain field 'config'.")
+            return self.repository["config"]
+
+        if self._config is None:
+            self._config = self.engine.load_config()
+        return self._config
+
     @property
     def _statuses(self):
-        if "config" not in self.repository.keys():
-            raise RepositoryCorruptedError("Notes repository does not contain field 'config'.")
-        
-        if "statuses" not in self.repository["config"].keys():
+        return self._config_statuses(self._configuration)
+
+    @staticmethod
+    def _config_statuses(config: dict):
+        if "statuses" not in config.keys():
             raise RepositoryCorruptedError("Notes repository configuration does not contain field 'statuses'.")
         
-        return self.repository["config"]["statuses"]
+        return config["statuses"]
 
     @property
     def _indexed_notes(self):
-        return [
-            NoteWithStatus(
-                idx, 
-                Note(**note), 
-                Status(**self._statuses[note["status"]]) if note["status"] else Status.create()
-            ) 
-            for idx, note in enumerate(self._notes)
-        ]
+        """
+        Views of the loaded notes with their statuses, built when first
+        needed and kept until the session changes the repository. Notes with
+        the same status share a single `Status`.
+        """
+        if self._note_views is None:
+            notes = self._notes
+            with profiling.span("note views"):
+                statuses = {name: Status(**status) for name, status in self._statuses.items()}
+                no_status = Status.create()
+                self._note_views = [
+                    NoteWithStatus(idx, Note(**note), statuses[note["status"]] if note["status"] else no_status)
+                    for idx, note in enumerate(notes)
+                ]
+        return self._note_views
 
     @property
-    def _notes_sorter(self):
-        return lambda note_dict: 0 if note_dict["status"] is None else -self._statuses[note_dict["status"]]["priority"]
+    def _loaded_tag_index(self):
+        """
+        Tag index of the loaded notes, built when first needed and kept
+        until the session changes the repository.
+        """
+        if self._tag_index is None:
+            with profiling.span("tag index"):
+                self._tag_index = tag_index.TagIndex.build(self._notes, self._statuses)
+        return self._tag_index
+
+    @staticmethod
+    def _with_status(idx: int, note: dict, statuses: dict):
+        return NoteWithStatus(
+            idx, 
+            Note(**note), 
+            Status(**statuses[note["status"]]) if note["status"] else Status.create()
+        )
 
     @staticmethod
-    def init_repository():
+    def init_repository(use_journal: bool = False, engine: str = storage.DEFAULT_ENGINE):
         """
         Initializes a new note repository by delegating to the storage layer.
 
+        Args:
+            use_journal (bool): Whether changes should be appended to the
+                                repository journal.
+            engine (str): Name of the storage engine used for the repository.
+
         Returns:
             Path: The absolute path to the newly created repository file.
         """
-        return storage.create_repository()
+        return storage.create_repository(use_journal, engine)
 
     def add_note(self, note: Note):
         """
@@ -79,113 +245,537 @@ class Repository:
         if note.status and note.status not in self._statuses.keys():
             raise StatusDoesNotExistError(f"There is no status {note.status} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one.")
 
-        self._notes.append(note.to_dict())
-        self._notes.sort(key=self._notes_sorter)
+        note_dict = note.to_dict()
+        if not self.batched:
+            note_dict["id"] = self._configuration["next_id"]
+        self._apply(operations.add_note(note_dict))
 
-    def list_notes(self, tag_filter: list[str] | None = None):
-        if not self._indexed_notes:
-            raise NotesNotFoundError("Repository is empty. Run `note add` to add a note.")
-        
-        filtered_notes = deepcopy(self._indexed_notes)
-        if tag_filter:
-            filtered_notes = [inote for inote in filtered_notes if inote.note.tags and set(inote.note.tags) & set(tag_filter)]
-            if not filtered_notes:
-                filter_msg = ", ".join(tag_filter)
-                raise NotesNotFoundError(f"There are no notes matching filter: '{filter_msg}' in repository.")
+    def import_notes(self, notes: Iterable[tuple[int, Note]]):
+        """
+        Adds many notes at once, see `app.core.importer.read_notes`. Notes are
+        saved together when the session ends, in a single write.
+
+        Args:
+            notes (Iterable[tuple[int, Note]]): Notes to add, with the
+                                                numbers of lines they were
+                                                read from.
+
+        Raises:
+            StatusDoesNotExistError: If a note has a non-existing status.
+
+        Returns:
+            int: Number of added notes.
+        """
+        statuses = self._statuses
+        count = 0
+        for line, note in notes:
+            if note.status and note.status not in statuses.keys():
+                raise StatusDoesNotExistError(f"Notes were not imported because of an error in line {line}. There is no status {note.status} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one.")
+            self.add_note(note)
+            count += 1
+        return count
+
+    def list_notes(
+        self,
+        tag_filter: list[str] | None = None,
+        status_filter: str | None = None,
+        where: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        pager: bool = False,
+        output_format: str | None = None
+    ):
+        """
+        Prints notes matching all given filters.
+
+        Args:
+            tag_filter (list[str] | None): Tags, at least one of which a note has to have.
+            status_filter (str | None): Status a note has to have.
+            where (str | None): Boolean filter, see `app.core.note_filter`.
+            limit (int | None): Maximum number of notes to print.
+            offset (int): Number of matching notes to skip.
+            pager (bool): Whether to print notes to the pager, see
+                          `app.core.utils.print_notes`.
+            output_format (str | None): Machine-readable format to print
+                                        notes in instead of a table, see
+                                        `app.core.output`. No notes is not
+                                        an error then.
+
+        Raises:
+            NoteAppError: If the where filter or the format is not valid.
+            StatusDoesNotExistError: If a filter uses a non existing status.
+            NotesNotFoundError: If no notes match the filters.
+        """
+        if output_format:
+            from app.core import output
+
+            output.check_format(output_format)
+        note_filter = self._note_filter(status_filter, where)
+        page = slice(offset, None if limit is None else offset + limit) if limit is not None or offset else None
+        notes = self._iter_indexed_notes(tag_filter, status_filter, note_filter, page)
+        if output_format:
+            output.write_notes(sys.stdout, notes, output_format)
+            return
+        first_note = next(notes, None)
+        if first_note is None:
+            if not (tag_filter or status_filter or where or offset) or self._is_empty():
+                raise NotesNotFoundError("Repository is empty. Run `note add` to add a note.")
+            if offset:
+                raise NotesNotFoundError(f"There are no notes to list after the first {offset} notes.")
+            raise NotesNotFoundError(f"There are no notes matching filter: '{_filter_message(tag_filter, status_filter, where)}' in repository.")
         
-        print_notes(filtered_notes)
+        print_notes(chain([first_note], notes), pager, console=self.console)
+
+    def export_notes(self, file: TextIO, output_format: str, tag_filter: list[str] | None = None, status_filter: str | None = None, where: str | None = None):
+        """
+        Writes notes matching all given filters to file, see
+        `app.core.exporter.write_notes`. Notes are streamed from the storage
+        engine if the repository is not loaded.
+
+        Raises:
+            NoteAppError: If the format or the where filter is not valid.
+            StatusDoesNotExistError: If a filter uses a non existing status.
+
+        Returns:
+            int: Number of exported notes.
+        """
+        from app.core import exporter
+
+        exporter.check_format(output_format)
+        note_filter = self._note_filter(status_filter, where)
+        return exporter.write_notes(file, self._iter_indexed_notes(tag_filter, status_filter, note_filter), output_format)
+
+    def _note_filter(self, status_filter: str | None, where: str | None):
+        """
+        Parses the where filter and checks that the statuses used by the
+        filters exist.
+        """
+        note_filter = NoteFilter(where) if where else None
+        used_statuses = note_filter.statuses() if note_filter else set()
+        if status_filter:
+            used_statuses.add(status_filter)
+        for status in sorted(used_statuses):
+            if status not in self._statuses.keys():
+                raise StatusDoesNotExistError(f"There is no status {status} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one.")
+        return note_filter
+
+    def _iter_indexed_notes(
+        self,
+        tag_filter: list[str] | None = None,
+        status_filter: str | None = None,
+        note_filter: NoteFilter | None = None,
+        page: slice | None = None
+    ) -> Iterator[NoteWithStatus]:
+        """
+        Yields notes matching all given filters, only those in the page of
+        matching notes if it is given. Notes before the page are skipped
+        without reading them when their positions are known.
+        """
+        if not self.loaded:
+            statuses = self._statuses
+            if tag_filter or status_filter or note_filter:
+                positions = self._filtered_positions(tag_filter, status_filter, note_filter)
+                notes = self.engine.iter_notes_at(positions[page] if page else positions)
+            elif page and page.start and (count := self.engine.count_notes()) is not None:
+                notes = self.engine.iter_notes_at(list(range(*page.indices(count))))
+            elif page:
+                notes = islice(self.engine.iter_notes(), page.start, page.stop)
+            else:
+                notes = self.engine.iter_notes()
+            for idx, note in notes:
+                yield self._with_status(idx, note, statuses)
+            return
+
+        if not (tag_filter or status_filter or note_filter):
+            yield from (self._indexed_notes[page] if page else self._indexed_notes)
+            return
+
+        positions = self._filtered_positions(tag_filter, status_filter, note_filter)
+        if page:
+            positions = positions[page]
+        if self._note_views is not None:
+            yield from (self._note_views[idx] for idx in positions)
+            return
+        statuses = self._statuses
+        for idx in positions:
+            yield self._with_status(idx, self._notes[idx], statuses)
+
+    def _filtered_positions(self, tag_filter: list[str] | None, status_filter: str | None, note_filter: NoteFilter | None = None):
+        """
+        Finds sorted positions of notes matching the filters: in the loaded
+        notes, or in the tag index, which keeps the positions of notes with
+        every status, if the repository is not loaded.
+        """
+        with profiling.span("filter"):
+            filters = []
+            if self.loaded:
+                if status_filter:
+                    filters.append(operations.status_positions(self._notes, self._statuses, status_filter))
+                if tag_filter:
+                    filters.append(self._notes.tag_positions(tag_filter))
+                if note_filter:
+                    filters.append(note_filter.positions(self._loaded_tag_index))
+            else:
+                index = tag_index.get_index(self.engine)
+                if tag_filter:
+                    filters.append(index.positions(tag_filter))
+                if status_filter:
+                    filters.append(index.statuses.get(status_filter, []))
+                if note_filter:
+                    filters.append(note_filter.positions(index))
+            if len(filters) == 1:
+                return list(filters[0])
+            return sorted(set(filters[0]).intersection(*filters[1:]))
+
+    def _is_empty(self):
+        if not self.loaded:
+            return next(self.engine.iter_notes(), None) is None
+        return not self._notes
+
+    def search_notes(self, query: str, limit: int | None = None):
+        """
+        Prints notes matching the query, best matches first.
+
+        Args:
+            query (str): Search query, see `app.core.search_index`.
+            limit (int | None): Maximum number of notes to print.
 
-    def list_tags(self):
-        tags = [note["tags"] for note in self._notes if note["tags"]]
-        tags = [tag for group in tags for tag in group]
+        Raises:
+            NoteAppError: If the query does not contain any words.
+            NotesNotFoundError: If no notes match the query.
+        """
+        from app.core import search_index
+
+        parsed_query = search_index.Query(query)
+        index = search_index.get_index(self.engine)
+        with profiling.span("search"):
+            results = index.search(parsed_query)
+        if parsed_query.phrases:
+            notes = dict(self.engine.iter_notes_at(sorted(position for position, _ in results)))
+            results = [(position, score) for position, score in results if parsed_query.matches_phrases(notes[position]["content"])]
+        results = results[:limit]
+        if not results:
+            raise NotesNotFoundError(f"There are no notes matching query: '{query}' in repository.")
+
+        if not parsed_query.phrases:
+            notes = dict(self.engine.iter_notes_at(sorted(position for position, _ in results)))
+        statuses = self._statuses
+        print_notes((self._with_status(position, notes[position], statuses) for position, _ in results), console=self.console)
+
+    def list_tags(self, output_format: str | None = None):
+        if output_format:
+            from app.core import output
+
+            output.check_format(output_format)
+        if self.loaded:
+            tags = self._notes.all_tags()
+        else:
+            tags = tag_index.get_index(self.engine).tag_names()
+        if output_format:
+            output.write_tags(sys.stdout, tags, output_format)
+            return
         if not tags:
             raise NotesNotFoundError("There are no tagged notes in the repository.")
-        print_tags(tags)
+        print_tags(tags, self.console)
+
+    def list_statuses(self, output_format: str | None = None):
+        if output_format:
+            from app.core import output
 
-    def list_statuses(self):
+            output.check_format(output_format)
         statuses = [(name, Status.create(**status)) for name, status in self._statuses.items()]
+        if output_format:
+            output.write_statuses(sys.stdout, statuses, output_format)
+            return
         if not statuses:
             raise NoteAppError("There are no statuses in repository configuration. Run `note status --add` to create one.") # TODO test for that
-        print_statuses(statuses)
+        print_statuses(statuses, self.console)
+
+    def delete_notes(
+        self,
+        note_ids: list[int] | None = None,
+        ranges: list[tuple[int, int]] | None = None,
+        tag_filter: list[str] | None = None,
+        status_filter: str | None = None,
+        where: str | None = None
+    ):
+        """
+        Deletes many notes at once: notes with the given ids, with ids in the
+        given ranges and matching all given filters. All notes are found
+        before any of them is deleted and they are removed with a single
+        operation, in one pass over the notes.
+
+        Args:
+            note_ids (list[int] | None): Ids of notes to delete.
+            ranges (list[tuple[int, int]] | None): Inclusive ranges of ids
+                                                   of notes to delete, ids
+                                                   with no note are skipped.
+            tag_filter (list[str] | None): Tags, at least one of which a note has to have.
+            status_filter (str | None): Status a note has to have.
+            where (str | None): Boolean filter, see `app.core.note_filter`.
+
+        Raises:
+            NoteAppError: If the where filter is not valid.
+            StatusDoesNotExistError: If a filter uses a non existing status.
+            NotesNotFoundError: If a note with one of the ids does not exist
+                                or no notes match.
+
+        Returns:
+            int: Number of deleted notes.
+        """
+        positions = set()
+        for note_id in note_ids or []:
+            position = self._position(note_id)
+            if position is None:
+                raise NotesNotFoundError(f"There is no note with id {note_id} in the repository. Run `note list` to see all notes.")
+            positions.add(position)
+        ids = self._note_ids()
+        if ranges:
+            positions.update(
+                position for position, note_id in enumerate(ids)
+                if any(first <= note_id <= last for first, last in ranges)
+            )
+        if tag_filter or status_filter or where:
+            note_filter = self._note_filter(status_filter, where)
+            positions.update(self._filtered_positions(tag_filter, status_filter, note_filter))
+
+        if not positions:
+            if tag_filter or status_filter or where:
+                raise NotesNotFoundError(f"There are no notes matching filter: '{_filter_message(tag_filter, status_filter, where)}' in repository.")
+            raise NotesNotFoundError("There are no notes with the given ids in the repository. Run `note list` to see all notes.")
+        positions = sorted(positions)
+        self._apply(operations.delete_notes(positions, [ids[position] or None for position in positions]))
+        return len(positions)
+
+    def _note_ids(self):
+        """
+        Returns ids of notes by position, 0 for notes without one, like
+        `_position` finds them.
+        """
+        if not self.loaded and not self._changes:
+            return tag_index.get_index(self.engine).ids
+        return self._notes.ids
+
+    def _position(self, note_id: int):
+        """
+        Finds the position of the note with the given id. The tag index
+        describes the stored repository, so it is used only until the
+        session changes notes.
+        """
+        if not self.loaded and not self._changes:
+            return tag_index.get_index(self.engine).position(note_id)
 
-    def delete_note(self, idx: int):
-        if not 1 <= idx <= len(self._notes):
-            raise NotesNotFoundError(f"There is no note with id {idx} in the repository. Run `note list` to see all notes.")
-        self._notes.pop(idx - 1)
+        if self._note_positions is None:
+            self._note_positions = {note_id: position for position, note_id in enumerate(self._notes.ids) if note_id}
+        return self._note_positions.get(note_id)
 
     def create_status(self, name: str, status: Status):
         if name in self._statuses.keys():
             raise NoteAppError(f"Status {name} already exists. Use `note config status -e` to edit statuses.")
         
-        self._statuses[name] = {
+        self._apply(operations.create_status(name, {
             "style": status.style,
             "priority": status.priority
-        } 
+        }))
     
     def edit_status(self, name: str, style: str | None, priority: int | None):
         if name not in self._statuses.keys():
             raise StatusDoesNotExistError(f"There is no status {name} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one.")
 
-        if style:
-            self._statuses[name]["style"] = style
-
-        if priority:
-            self._statuses[name]["priority"] = priority
-
-        self._notes.sort(key=self._notes_sorter)
+        self._apply(operations.edit_status(name, style, priority))
 
     def delete_status(self, name: str):
         if name not in self._statuses.keys():
             raise StatusDoesNotExistError(f"There is no status {name} in the repository configuration. Run `note list -S` to see all statuses or `note status --add STATUS` to add a new one.")
         
-        notes_with_status = [note for note in self._notes if note["status"] == name]
-
-        if notes_with_status:
+        if self._notes.has_status(name):
             confirmation = typer.confirm(f"There exist a note with status {name}, would you like to proceed? Note's status will be removed.")
             if not confirmation:
                 return
-            for note in notes_with_status:
-                note["status"] = None
-            self._notes.sort(key=self._notes_sorter)
         
-        self._statuses.pop(name)
+        self._apply(operations.delete_status(name))
         # TODO add tests:
         # status deleted
         # ask for confirmation when note has status
         # status not deleted after No respond
         # notes sorted after removing status
 
-def create_repository():
-    return Repository.init_repository()
+class RepositoryCache:
+    """
+    A loaded repository kept between sessions, together with the state of
+    the repository files it was read from or saved to (see
+    `app.core.tag_index.stamp`) and the tag index of its notes, if a session
+    built one.
+    """
+    def __init__(self):
+        self.stamp = None
+        self.repository = None
+        self.index = None
+
+    def get(self, stamp: list):
+        """
+        Returns the cached repository, or None if the repository files were
+        changed since it was cached.
+        """
+        return self.repository if stamp == self.stamp else None
 
-def add_note(note: Note):
-    with Repository() as repo:
-        repo.add_note(note)
+    def put(self, stamp: list, repository: dict, index: "tag_index.TagIndex | None" = None):
+        self.stamp = stamp
+        self.repository = repository
+        self.index = index
 
-def list_notes(tag_filter: list[str] | None = None):
-    with Repository() as repo:
-        repo.list_notes(tag_filter)
+    def clear(self):
+        self.stamp = None
+        self.repository = None
+        self.index = None
 
-def list_tags():
-    with Repository() as repo:
-        repo.list_tags()
+def create_repository(use_journal: bool = False, engine: str = storage.DEFAULT_ENGINE):
+    return Repository.init_repository(use_journal, engine)
 
-def list_statuses():
-    with Repository() as repo:
-        repo.list_statuses()
+def compact_repository(use_journal: bool | None = None, compression: str | None = None):
+    return storage.compact_repository(use_journal, compression)
+
+def compression_report():
+    print_compression_report(storage.compression_report())
+
+def migrate_repository(engine: str):
+    return storage.migrate_repository(engine)
 
-def delete_note(idx: int):
+def add_note(note: Note):
+    if client.forward("add_note", note.to_dict()):
+        return
+    with Repository(batched=True) as repo:
+        repo.add_note(note)
+
+def import_notes(notes: Iterable[tuple[int, Note]]):
     with Repository() as repo:
-        repo.delete_note(idx)
+        return repo.import_notes(notes)
+
+def list_notes(
+    tag_filter: list[str] | None = None,
+    status_filter: str | None = None,
+    where: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    pager: bool = False,
+    output_format: str | None = None
+):
+    # The pager runs in the terminal of the command, so paged listings are
+    # not sent to the note server.
+    if not pager and client.forward("list_notes", tag_filter, status_filter, where, limit, offset, False, output_format):
+        return
+    with Repository(read_only=True) as repo:
+        repo.list_notes(tag_filter, status_filter, where, limit, offset, pager, output_format)
+
+def export_notes(file: TextIO, output_format: str, tag_filter: list[str] | None = None, status_filter: str | None = None, where: str | None = None):
+    with Repository(read_only=True) as repo:
+        return repo.export_notes(file, output_format, tag_filter, status_filter, where)
+
+def search_notes(query: str, limit: int | None = None):
+    if client.forward("search_notes", query, limit):
+        return
+    with Repository(read_only=True) as repo:
+        repo.search_notes(query, limit)
+
+def list_all_notes(
+    root: Path,
+    tag_filter: list[str] | None = None,
+    status_filter: str | None = None,
+    where: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    pager: bool = False
+):
+    """
+    Prints notes of all repositories under root matching all given filters,
+    with the path of their repository. Repositories are filtered in parallel,
+    see `app.core.scanner`, and those which cannot be read are reported and
+    skipped.
+
+    Raises:
+        NoteAppError: If root is not a directory or the where filter is not valid.
+        StatusDoesNotExistError: If a filter uses a status none of the repositories has.
+        NotesNotFoundError: If there are no repositories or no notes match the filters.
+    """
+    from app.core import scanner
+
+    notes = scanner.iter_notes(_scan(root, scanner.ScanRequest(tag_filter, status_filter, where)))
+    if limit is not None or offset:
+        notes = islice(notes, offset, None if limit is None else offset + limit)
+    first_note = next(notes, None)
+    if first_note is None:
+        if offset:
+            raise NotesNotFoundError(f"There are no notes to list after the first {offset} notes.")
+        if tag_filter or status_filter or where:
+            raise NotesNotFoundError(f"There are no notes matching filter: '{_filter_message(tag_filter, status_filter, where)}' in repositories under {root}.")
+        raise NotesNotFoundError(f"Repositories under {root} are empty. Run `note add` to add a note.")
+
+    print_notes(chain([first_note], notes), pager, repositories=True)
+
+def search_all_notes(root: Path, query: str, limit: int | None = None):
+    """
+    Prints notes of all repositories under root matching the query, best
+    matches first, with the path of their repository.
+
+    Raises:
+        NoteAppError: If root is not a directory or the query does not contain any words.
+        NotesNotFoundError: If there are no repositories or no notes match the query.
+    """
+    from app.core import scanner, search_index
+
+    parsed_query = search_index.Query(query)
+    results = scanner.search(_scan(root, scanner.ScanRequest(query=query)), parsed_query, limit)
+    if not results:
+        raise NotesNotFoundError(f"There are no notes matching query: '{query}' in repositories under {root}.")
+    print_notes(results, repositories=True)
+
+def _scan(root: Path, request: "scanner.ScanRequest"):
+    from app.core import scanner
+
+    repositories, errors = scanner.scan(root, request)
+    for error in errors:
+        print(error)
+    return repositories
+
+def list_tags(output_format: str | None = None):
+    if client.forward("list_tags", output_format):
+        return
+    with Repository(read_only=True) as repo:
+        repo.list_tags(output_format)
+
+def list_statuses(output_format: str | None = None):
+    if client.forward("list_statuses", output_format):
+        return
+    with Repository(read_only=True) as repo:
+        repo.list_statuses(output_format)
+
+def delete_notes(
+    note_ids: list[int] | None = None,
+    ranges: list[tuple[int, int]] | None = None,
+    tag_filter: list[str] | None = None,
+    status_filter: str | None = None,
+    where: str | None = None
+):
+    if client.forward("delete_notes", note_ids, ranges, tag_filter, status_filter, where):
+        return
+    with Repository() as repo:
+        repo.delete_notes(note_ids, ranges, tag_filter, status_filter, where)
 
 def create_status(name: str, status: Status):
+    if client.forward("create_status", name, {"style": status.style, "priority": status.priority}):
+        return
     with Repository() as repo:
         repo.create_status(name, status)
 
 def edit_status(name: str, style: str | None, priority: int | None):
+    if client.forward("edit_status", name, style, priority):
+        return
     with Repository() as repo:
         repo.edit_status(name, style, priority)
 
 def delete_status(name: str):
     with Repository() as repo:
         repo.delete_status(name)
+
+def _filter_message(tag_filter: list[str] | None, status_filter: str | None, where: str | None):
+    return ", ".join([*(tag_filter or []), *([status_filter] if status_filter else []), *([where] if where else [])])
@@ -0,0 +1,314 @@
+"""
+Notes of all repositories in a directory tree, used by `note list --recursive`
+and `note search --all`.
+
+Repositories are found by walking the tree for `.notes` files; hidden
+directories, like `.git` or the `.notes.segments` directories of repositories,
+are skipped. Every repository is read by a worker of a process pool, once
+there are at least `PARALLEL_REPOSITORIES` of them, which also applies the
+filters and the search query, using the tag and search indexes of the
+repository when they are up to date. Only matching notes are sent back and
+merged in the scanning process. Scanning never writes to the repositories: a
+shared lock is taken only if the repository already has a lock file, and
+indexes are not saved.
+
+Search results of all repositories are ranked together: workers also return
+how many notes contain every term of the query, and the scores are computed
+from their sums (see `app.core.search_index.score`).
+
+A manifest of the repositories found, with the state of their files (see
+`app.core.tag_index.path_stamp`), the number of notes, their tags and the
+statuses of the repository, is kept for every scanned directory in the cache
+directory: `NOTE_CACHE_DIR`, or `notecli` in `XDG_CACHE_HOME` or
+`~/.cache`. Repositories which did not change since the last scan are
+skipped without opening them when they cannot match the tag and status
+filters, and empty ones always.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Iterator
+
+from app.core import REPOSITORY_FILENAME, LOCK_FILENAME, CACHE_DIR_ENV
+from app.core import engines, profiling, search_index, tag_index
+from app.core.engines import atomic_write
+from app.core.errors import NoteAppError, NotesNotFoundError, StatusDoesNotExistError
+from app.core.locking import RepositoryLock
+from app.core.models import Note, Status, NoteWithStatus
+from app.core.note_filter import NoteFilter
+from app.core.search_index import Query, SearchIndex
+from app.core.tag_index import TagIndex
+
+MANIFEST_VERSION = 2
+PARALLEL_REPOSITORIES = 4
+
+@dataclass(slots=True)
+class ScanRequest:
+    tag_filter: list[str] | None = None
+    status_filter: str | None = None
+    where: str | None = None
+    query: str | None = None
+
+@dataclass(slots=True)
+class ScannedRepository:
+    # Path of the repository directory relative to the scanned one, '.' for
+    # the scanned directory itself.
+    path: str
+    # Manifest entry of the repository.
+    summary: dict
+    statuses: dict
+    # Matching notes with their positions, in display order.
+    notes: list[tuple[int, dict]]
+    # Number of notes, their total length in words and the number of notes
+    # containing every term of the query, for searches.
+    count: int = 0
+    total_length: int = 0
+    frequencies: dict[str, int] = field(default_factory=dict)
+
+def cache_directory():
+    cache = os.environ.get(CACHE_DIR_ENV)
+    if cache:
+        return Path(cache)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "notecli"
+
+def find_repositories(root: Path):
+    """
+    Returns sorted paths of directories with a repository under root,
+    relative to it.
+    """
+    paths = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+        if REPOSITORY_FILENAME in filenames:
+            paths.append(Path(directory).relative_to(root).as_posix())
+    return sorted(paths)
+
+def scan(root: Path, request: ScanRequest):
+    """
+    Finds notes matching the request in all repositories under root.
+
+    Raises:
+        NoteAppError: If root is not a directory or the where filter or the
+                      query is not valid.
+        NotesNotFoundError: If there are no repositories under root.
+        StatusDoesNotExistError: If a filter uses a status which none of the
+                                 repositories has.
+
+    Returns:
+        tuple[list[ScannedRepository], list[str]]: Repositories with matching
+            notes ordered by their paths, and messages about repositories
+            which could not be read.
+    """
+    if not root.is_dir():
+        raise NoteAppError(f"Cannot scan {root}, it is not a directory.")
+    note_filter = NoteFilter(request.where) if request.where else None
+    if request.query:
+        Query(request.query)
+
+    manifest_path = cache_directory() / "scan" / f"{hashlib.sha256(str(root.resolve()).encode()).hexdigest()}.json"
+    with profiling.span("find"):
+        paths = find_repositories(root)
+    if not paths:
+        raise NotesNotFoundError(f"There are no note repositories under {root}.")
+    cached = _load_manifest(manifest_path)
+
+    summaries = {}
+    to_scan = []
+    for path in paths:
+        summary = cached.get(path)
+        if summary is not None and summary["stamp"] == tag_index.path_stamp(root / path / REPOSITORY_FILENAME):
+            summaries[path] = summary
+            if not _may_match(summary, request):
+                continue
+        to_scan.append(path)
+
+    repositories = []
+    errors = []
+    with profiling.span("read repositories"):
+        for path, result in zip(to_scan, _scan_repositories(root, to_scan, request)):
+            if isinstance(result, str):
+                summaries.pop(path, None)
+                errors.append(f"Cannot read repository {path}. {result}")
+            else:
+                summaries[path] = result.summary
+                repositories.append(result)
+    if summaries != cached:
+        _save_manifest(manifest_path, summaries)
+
+    used_statuses = note_filter.statuses() if note_filter else set()
+    if request.status_filter:
+        used_statuses.add(request.status_filter)
+    for status in sorted(used_statuses):
+        if summaries and not any(status in summary["statuses"] for summary in summaries.values()):
+            raise StatusDoesNotExistError(f"There is no status {status} in any of the repositories.")
+    return repositories, errors
+
+def iter_notes(repositories: list[ScannedRepository]) -> Iterator[NoteWithStatus]:
+    """
+    Yields scanned notes of all repositories, repository by repository.
+    """
+    for repository in repositories:
+        statuses = _statuses(repository)
+        for position, note in repository.notes:
+            yield _with_status(repository, position, note, statuses)
+
+def search(repositories: list[ScannedRepository], query: Query, limit: int | None = None):
+    """
+    Ranks scanned notes of all repositories by the query, best matches
+    first, as if they were in a single repository.
+
+    Returns:
+        list[NoteWithStatus]: Best matching notes.
+    """
+    count = sum(repository.count for repository in repositories)
+    total_length = sum(repository.total_length for repository in repositories)
+    frequencies = Counter()
+    for repository in repositories:
+        frequencies.update(repository.frequencies)
+
+    with profiling.span("search"):
+        results = sorted(
+            (
+                (-search_index.score(query, note["content"], frequencies, count, total_length), repository_idx, position, note)
+                for repository_idx, repository in enumerate(repositories)
+                for position, note in repository.notes
+            ),
+            key=lambda result: result[:3]
+        )[:limit]
+    statuses = {}
+    matches = []
+    for _, repository_idx, position, note in results:
+        repository = repositories[repository_idx]
+        if repository_idx not in statuses:
+            statuses[repository_idx] = _statuses(repository)
+        matches.append(_with_status(repository, position, note, statuses[repository_idx]))
+    return matches
+
+def _may_match(summary: dict, request: ScanRequest):
+    """
+    Tells from the manifest entry of a repository whether any of its notes
+    may match the request.
+    """
+    if not summary["count"]:
+        return False
+    if request.tag_filter and set(summary["tags"]).isdisjoint(request.tag_filter):
+        return False
+    return not request.status_filter or request.status_filter in summary["statuses"]
+
+def _scan_repositories(root: Path, paths: list[str], request: ScanRequest):
+    scan_repository = partial(_scan_repository, root=root, request=request)
+    if len(paths) >= PARALLEL_REPOSITORIES and (os.cpu_count() or 1) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor() as pool:
+            return list(pool.map(scan_repository, paths))
+    return [scan_repository(path) for path in paths]
+
+def _scan_repository(path: str, root: Path, request: ScanRequest):
+    """
+    Reads notes of the repository in directory path matching the request,
+    run in the workers of the process pool.
+
+    Returns:
+        ScannedRepository | str: The repository, or the reason it could not
+                                 be read.
+    """
+    directory = root / path
+    lock = RepositoryLock(directory / LOCK_FILENAME)
+    try:
+        if lock.path.exists():
+            lock.acquire(shared=True)
+    except OSError:
+        # Lock files we cannot open for writing are not locked.
+        pass
+    try:
+        repository_path = directory / REPOSITORY_FILENAME
+        stamp = tag_index.path_stamp(repository_path)
+        engine = engines.detect_engine(repository_path)
+        try:
+            return _read_matching(engine, path, stamp, request)
+        finally:
+            engine.close()
+    except (NoteAppError, OSError) as error:
+        return str(error)
+    except (KeyError, TypeError, AttributeError) as error:
+        return f"Repository is not valid. {error}"
+    finally:
+        lock.release()
+
+def _read_matching(engine, path: str, stamp: list, request: ScanRequest):
+    statuses = engine.load_config()["statuses"]
+    notes = None
+
+    def all_notes():
+        nonlocal notes
+        if notes is None:
+            notes = [note for _, note in engine.iter_notes()]
+        return notes
+
+    index = tag_index.open_index(engine) or TagIndex.build(all_notes(), statuses)
+    summary = {"stamp": stamp, "count": index.count, "tags": sorted(index.tag_names()), "statuses": sorted(statuses)}
+    repository = ScannedRepository(path, summary, statuses, [])
+
+    filters = []
+    if request.tag_filter:
+        filters.append(index.positions(request.tag_filter))
+    if request.status_filter:
+        filters.append(index.statuses.get(request.status_filter, []) if request.status_filter in statuses else [])
+    if request.where:
+        filters.append(NoteFilter(request.where).positions(index))
+    query = Query(request.query) if request.query else None
+    if query:
+        search = search_index.open_index(engine) or SearchIndex.build(all_notes())
+        repository.count, repository.total_length = search.count, search.total_length
+        repository.frequencies = search.document_frequencies(query)
+        filters.append(sorted(position for position, _ in search.search(query)))
+
+    if not filters:
+        positions = None
+    elif len(filters) == 1:
+        positions = list(filters[0])
+    else:
+        positions = sorted(set(filters[0]).intersection(*filters[1:]))
+
+    if positions is None:
+        matching = list(enumerate(all_notes()))
+    elif notes is not None:
+        matching = [(position, notes[position]) for position in positions]
+    else:
+        matching = list(engine.iter_notes_at(positions))
+    if query and query.phrases:
+        matching = [(position, note) for position, note in matching if query.matches_phrases(note["content"])]
+    repository.notes = matching
+    return repository
+
+def _load_manifest(path: Path):
+    try:
+        with path.open("r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("repositories", {})
+
+def _save_manifest(path: Path, summaries: dict):
+    def write(file):
+        json.dump({"version": MANIFEST_VERSION, "repositories": summaries}, file, ensure_ascii=False)
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, write)
+    except OSError:
+        pass
+
+def _statuses(repository: ScannedRepository):
+    return {name: Status(**status) for name, status in repository.statuses.items()}
+
+def _with_status(repository: ScannedRepository, position: int, note: dict, statuses: dict[str, Status]):
+    status = statuses.get(note["status"]) if note["status"] else None
+    return NoteWithStatus(position, Note(**note), status or Status.create(), repository.path)
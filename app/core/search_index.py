@@ -0,0 +1,381 @@
+"""
+Persistent full-text index of note contents used by `note search`.
+
+Note contents are split into lowercase words. For every word the index keeps
+the notes containing it and how many times, which is enough to rank notes
+with BM25 without reading them. Notes are identified by ids assigned when
+they are indexed, so adding a note only appends to the postings of its words.
+The order of ids follows the display order of notes and is updated with the
+position changes reported by the tag index (see `app.core.tag_index`), which
+is saved together with this index by `app.core.storage.save_changes`.
+
+Deleted notes are only marked as deleted, and the index is rebuilt when they
+outnumber the remaining notes. The index is kept in the `.notes.search` file
+next to the repository.
+
+Queries are made of words, which all have to be present in a note, words
+ending with `*`, which match any word starting with them, and phrases in
+double quotes, which have to be present in a note as written.
+"""
+import json
+import math
+import re
+import struct
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from app.core import SEARCH_INDEX_FILENAME
+from app.core import tag_index, profiling
+from app.core.engines import StorageEngine, atomic_write
+from app.core.errors import NoteAppError, RepositoryCorruptedError
+
+MAGIC = b"NOTESRC\x01"
+LENGTH = struct.Struct("<I")
+WORD = re.compile(r"\w+")
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+K1 = 1.2
+B = 0.75
+
+def tokenize(text: str):
+    return WORD.findall(text.lower())
+
+class Query:
+    """
+    A parsed search query.
+
+    Attributes:
+        words (list[str]): Words that have to be present in a note.
+        prefixes (list[str]): Prefixes of words that have to be present.
+        phrases (list[list[str]]): Phrases that have to be present, as words.
+    """
+    def __init__(self, text: str):
+        self.words = []
+        self.prefixes = []
+        self.phrases = []
+        for phrase, part in QUERY_PART.findall(text):
+            if phrase:
+                words = tokenize(phrase)
+                self.words.extend(words)
+                if len(words) > 1:
+                    self.phrases.append(words)
+                continue
+
+            words = tokenize(part)
+            if part.endswith("*") and words:
+                self.prefixes.append(words.pop())
+            self.words.extend(words)
+
+        if not self.words and not self.prefixes:
+            raise NoteAppError("Search query does not contain any words.")
+
+    def matches_phrases(self, content: str):
+        words = tokenize(content)
+        return all(
+            any(words[start:start + len(phrase)] == phrase for start in range(len(words) - len(phrase) + 1))
+            for phrase in self.phrases
+        )
+
+class SearchIndex:
+    def __init__(self):
+        self.order = array("I")
+        self.alive = bytearray()
+        self.lengths = array("I")
+        self.total_length = 0
+        self.terms: dict[str, tuple[array, array]] = {}
+        # Postings read from the index file are decoded when first needed,
+        # these are their offsets and sizes in _data.
+        self._stored: dict[str, tuple[int, int]] = {}
+        self._data = b""
+
+    @property
+    def count(self):
+        return len(self.order)
+
+    @property
+    def outdated(self):
+        """
+        Whether deleted notes outnumber indexed ones.
+        """
+        return len(self.alive) - self.count > self.count
+
+    @staticmethod
+    def build(notes: list[dict]):
+        index = SearchIndex()
+        index.order = array("I", [index._add(note) for note in notes])
+        return index
+
+    @staticmethod
+    def load(path: Path, stamp: list):
+        """
+        Loads the index from path.
+
+        Returns:
+            SearchIndex | None: The index, or None if it does not exist,
+                                cannot be read or was built for other
+                                repository files.
+        """
+        index = SearchIndex()
+        try:
+            with path.open("rb") as file:
+                data = file.read()
+            if not data.startswith(MAGIC):
+                return None
+            (length,) = LENGTH.unpack_from(data, len(MAGIC))
+            offset = len(MAGIC) + LENGTH.size
+            header = json.loads(data[offset:offset + length])
+            if header["stamp"] != stamp or header["byteorder"] != sys.byteorder:
+                return None
+            offset += length
+            index.order, offset = _unpack_array(data, offset, header["count"])
+            index.lengths, offset = _unpack_array(data, offset, header["ids"])
+            index.alive = bytearray(data[offset:offset + header["ids"]])
+            offset += header["ids"]
+            index.total_length = header["total_length"]
+            for term, size in header["terms"]:
+                index._stored[term] = (offset, size)
+                offset += 8 * size
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return None
+        if offset != len(data) or len(index.alive) != len(index.lengths):
+            return None
+        index._data = data
+        return index
+
+    def save(self, path: Path, stamp: list):
+        header = json.dumps({
+            "stamp": stamp,
+            "byteorder": sys.byteorder,
+            "count": self.count,
+            "ids": len(self.alive),
+            "total_length": self.total_length,
+            "terms": [[term, len(ids)] for term, (ids, _) in self.terms.items()] +
+                [[term, size] for term, (_, size) in self._stored.items()]
+        }).encode()
+
+        def write(file):
+            file.write(MAGIC)
+            file.write(LENGTH.pack(len(header)))
+            file.write(header)
+            self.order.tofile(file)
+            self.lengths.tofile(file)
+            file.write(self.alive)
+            for ids, frequencies in self.terms.values():
+                ids.tofile(file)
+                frequencies.tofile(file)
+            for offset, size in self._stored.values():
+                file.write(self._data[offset:offset + 8 * size])
+
+        atomic_write(path, write, "wb")
+
+    def apply(self, events: list[tuple]):
+        """
+        Updates the index with position changes reported by
+        `app.core.tag_index.TagIndex.apply`.
+        """
+        # Notes added at consecutive positions are inserted into the order
+        # at once, rather than moving the rest of it for every note.
+        start, added = 0, array("I")
+        for kind, position, value in events:
+            if kind == tag_index.ADD:
+                if added and position != start + len(added):
+                    self.order[start:start] = added
+                    added = array("I")
+                if not added:
+                    start = position
+                added.append(self._add(value))
+                continue
+            if added:
+                self.order[start:start] = added
+                added = array("I")
+
+            if kind == tag_index.DELETE:
+                note_id = self.order.pop(position)
+                self.alive[note_id] = 0
+                self.total_length -= self.lengths[note_id]
+            elif kind == tag_index.DELETE_MANY:
+                removed = set(value)
+                for position in value:
+                    note_id = self.order[position]
+                    self.alive[note_id] = 0
+                    self.total_length -= self.lengths[note_id]
+                if value:
+                    self.order[value[0]:] = array("I", [
+                        note_id for position, note_id in enumerate(self.order[value[0]:], value[0])
+                        if position not in removed
+                    ])
+            elif kind == tag_index.MOVE:
+                start, end, moved, to_front = value
+                self.order[start:end] = tag_index.moved_slice(self.order[start:end], start, set(moved), to_front)
+        if added:
+            self.order[start:start] = added
+
+    def search(self, query: Query):
+        """
+        Finds notes with every word and prefix of the query, ranked by BM25.
+        Phrases are not checked, see `Query.matches_phrases`.
+
+        Returns:
+            list[tuple[int, float]]: Positions of matching notes and their
+                                     scores, best matches first.
+        """
+        scores = None
+        for group in [[word] for word in dict.fromkeys(query.words)] + [self._expand(prefix) for prefix in query.prefixes]:
+            group_scores = {}
+            for term in group:
+                for note_id, score in self._score(term):
+                    group_scores[note_id] = group_scores.get(note_id, 0.0) + score
+            if scores is None:
+                scores = group_scores
+            else:
+                scores = {note_id: score + group_scores[note_id] for note_id, score in scores.items() if note_id in group_scores}
+            if not scores:
+                return []
+
+        positions = self._positions(scores.keys())
+        return sorted(
+            ((positions[note_id], score) for note_id, score in scores.items() if note_id in positions),
+            key=lambda result: (-result[1], result[0])
+        )
+
+    def _add(self, note: dict):
+        """
+        Indexes a note and returns its id, which still has to be inserted
+        into the order.
+        """
+        note_id = len(self.alive)
+        words = tokenize(note["content"])
+        self.alive.append(1)
+        self.lengths.append(len(words))
+        self.total_length += len(words)
+        for term, frequency in Counter(words).items():
+            ids, frequencies = self._postings(term) or self.terms.setdefault(term, (array("I"), array("I")))
+            ids.append(note_id)
+            frequencies.append(frequency)
+        return note_id
+
+    def _postings(self, term: str):
+        if term in self._stored:
+            offset, size = self._stored.pop(term)
+            ids, offset = _unpack_array(self._data, offset, size)
+            frequencies, _ = _unpack_array(self._data, offset, size)
+            self.terms[term] = (ids, frequencies)
+        return self.terms.get(term)
+
+    def _expand(self, prefix: str):
+        return [term for term in (*self.terms, *self._stored) if term.startswith(prefix)]
+
+    def document_frequencies(self, query: Query):
+        """
+        Returns the number of notes containing every word of the query and
+        every indexed word starting with one of its prefixes, to rank notes
+        of many indexes together, see `score`.
+        """
+        terms = dict.fromkeys(query.words)
+        for prefix in query.prefixes:
+            terms.update(dict.fromkeys(self._expand(prefix)))
+        frequencies = {}
+        for term in terms:
+            postings = self._postings(term)
+            if postings is not None:
+                frequencies[term] = sum(self.alive[note_id] for note_id in postings[0])
+        return frequencies
+
+    def _score(self, term: str):
+        postings = self._postings(term)
+        if postings is None or not self.count:
+            return
+        ids, frequencies = postings
+        term_idf = _idf(sum(self.alive[note_id] for note_id in ids), self.count)
+        average_length = self.total_length / self.count or 1
+        # The score of _term_score, inlined since it is computed for every
+        # posting of the term.
+        for note_id, frequency in zip(ids, frequencies):
+            if not self.alive[note_id]:
+                continue
+            norm = K1 * (1 - B + B * self.lengths[note_id] / average_length)
+            yield note_id, term_idf * frequency * (K1 + 1) / (frequency + norm)
+
+    def _positions(self, note_ids):
+        """
+        Maps note ids to display positions. A few ids are looked up in the
+        raw order array, more with a single pass over it.
+        """
+        note_ids = set(note_ids)
+        if len(note_ids) > 32:
+            return {note_id: position for position, note_id in enumerate(self.order) if note_id in note_ids}
+
+        data = self.order.tobytes()
+        positions = {}
+        for note_id in note_ids:
+            needle = array("I", [note_id]).tobytes()
+            offset = data.find(needle)
+            while offset > 0 and offset % len(needle):
+                offset = data.find(needle, offset + 1)
+            if offset >= 0:
+                positions[note_id] = offset // len(needle)
+        return positions
+
+def score(query: Query, content: str, frequencies: dict[str, int], count: int, total_length: int):
+    """
+    Scores a note matching the query like `SearchIndex.search` does, among
+    count notes of total_length words, of which frequencies[term] contain
+    every term. Notes of many indexes get comparable scores when these are
+    summed over the indexes (see `SearchIndex.document_frequencies`).
+    """
+    words = Counter(tokenize(content))
+    length = sum(words.values())
+    average_length = total_length / count or 1
+    terms = [*dict.fromkeys(query.words), *(term for prefix in query.prefixes for term in words if term.startswith(prefix))]
+    return sum(
+        _term_score(_idf(frequencies.get(term, 0), count), words[term], length, average_length)
+        for term in terms if term in words
+    )
+
+def _idf(matching: int, count: int):
+    return math.log(1 + (count - matching + 0.5) / (matching + 0.5))
+
+def _term_score(idf: float, frequency: int, length: int, average_length: float):
+    norm = K1 * (1 - B + B * length / average_length)
+    return idf * frequency * (K1 + 1) / (frequency + norm)
+
+def index_path(engine: StorageEngine):
+    return engine.path.parent / SEARCH_INDEX_FILENAME
+
+def open_index(engine: StorageEngine):
+    """
+    Loads the index of the repository if it is up to date.
+    """
+    return SearchIndex.load(index_path(engine), tag_index.stamp(engine))
+
+def get_index(engine: StorageEngine):
+    """
+    Loads the index of the repository, building and saving it first if it
+    does not exist, is out of date or holds mostly deleted notes. The tag
+    index is built as well if needed, since it is required to keep this index
+    up to date.
+    """
+    with profiling.span("search index"):
+        index = open_index(engine)
+        if index is not None and not index.outdated:
+            return index
+
+        notes_repository = engine.load()
+        try:
+            index = SearchIndex.build(notes_repository["notes"])
+            if tag_index.open_index(engine) is None:
+                tags = tag_index.TagIndex.build(notes_repository["notes"], notes_repository["config"]["statuses"])
+                tags.save(tag_index.index_path(engine), tag_index.stamp(engine))
+        except (KeyError, TypeError, AttributeError) as error:
+            raise RepositoryCorruptedError(f"Cannot index repository. {error}")
+        index.save(index_path(engine), tag_index.stamp(engine))
+        return index
+
+def _unpack_array(data: bytes, offset: int, size: int):
+    end = offset + 4 * size
+    if end > len(data):
+        raise ValueError("unexpected end of index file")
+    values = array("I")
+    values.frombytes(data[offset:end])
+    return values, end
@@ -0,0 +1,171 @@
+"""
+Resident note server started with `note serve`.
+
+The server keeps the repository loaded between commands and handles requests
+sent by commands through the `.notes.sock` Unix socket next to the
+repository (see `app.core.client`). Every request is handled in a
+`Repository` session, which takes the repository lock and saves changes with
+the storage engine like any command would, so changes are persisted before
+the response is sent. The loaded repository is kept in a `RepositoryCache`
+and read again only when the repository files were changed by other means,
+for example by `note compact`, which is not sent to the server.
+
+Requests are handled one at a time. The server stops when it receives a
+shutdown request (`note serve --stop`), SIGTERM or SIGINT, after finishing the
+request it is handling, and removes its socket.
+"""
+import contextlib
+import io
+import os
+import signal
+import socket
+
+from rich.console import Console
+
+from app.core import client, storage
+from app.core.errors import NoteAppError, RepositoryDoesNotExistError
+from app.core.models import Note, Status
+from app.core.repository import Repository, RepositoryCache
+
+READ_METHODS = {"list_notes", "search_notes", "list_tags", "list_statuses"}
+WRITE_METHODS = {"add_note", "delete_notes", "create_status", "edit_status"}
+SHUTDOWN = "shutdown"
+POLL_INTERVAL = 0.5
+REQUEST_TIMEOUT = 10
+
+class NoteServer:
+    """
+    Server of the repository in the current directory, used as a context
+    manager which listens on the socket of the repository until it exits.
+
+    Raises:
+        NoteAppError: If Unix sockets are not supported or a server is
+                      already running for the repository.
+        RepositoryDoesNotExistError: If the repository does not exist.
+    """
+    def __init__(self):
+        self.cache = RepositoryCache()
+        self.path = client.socket_path()
+        self._listener = None
+        self._handlers = {}
+        self._running = True
+
+    def __enter__(self):
+        if not client.supported():
+            raise NoteAppError("The note server is not supported on this platform.")
+        if not storage.repository_exists():
+            raise RepositoryDoesNotExistError("Notes repository does not exist. Run `note init` to initialize repository.")
+        connection = client.connect()
+        if connection is not None:
+            connection.close()
+            raise NoteAppError("A note server is already running for this repository. Run `note serve --stop` to stop it.")
+
+        self.path.unlink(missing_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # The socket is created accessible only to its owner, so no other
+            # user can connect to it before its permissions could be changed.
+            umask = os.umask(0o177)
+            try:
+                listener.bind(str(self.path))
+            finally:
+                os.umask(umask)
+            listener.listen()
+            listener.settimeout(POLL_INTERVAL)
+        except BaseException:
+            listener.close()
+            raise
+        self._listener = listener
+        self._handlers = {number: signal.signal(number, lambda *_: self.stop()) for number in (signal.SIGINT, signal.SIGTERM)}
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for number, handler in self._handlers.items():
+            signal.signal(number, handler)
+        self._listener.close()
+        self._listener = None
+        self.path.unlink(missing_ok=True)
+
+    def preload(self):
+        """
+        Loads the repository into the cache, so the first request does not
+        wait for it.
+        """
+        with Repository(read_only=True, cache=self.cache) as repo:
+            repo.repository
+
+    def serve(self):
+        """
+        Handles requests until the server is stopped. SIGINT and SIGTERM
+        stop the server once it is entered.
+        """
+        while self._running:
+            try:
+                connection, _ = self._listener.accept()
+            except socket.timeout:
+                continue
+            with connection:
+                self._respond(connection)
+
+    def stop(self):
+        self._running = False
+
+    def handle(self, request: dict):
+        """
+        Handles a request in a repository session.
+
+        Returns:
+            dict: The response, with the printed output and the error
+                  message if the request failed.
+        """
+        method = request.get("method")
+        if method not in READ_METHODS and method not in WRITE_METHODS:
+            return {"output": "", "error": f"Unknown note server request '{method}'."}
+
+        output = io.StringIO()
+        terminal = request.get("terminal") or {}
+        console = Console(file=output, width=terminal.get("width"), force_terminal=bool(terminal.get("is_terminal")))
+        try:
+            with Repository(read_only=method in READ_METHODS, cache=self.cache, console=console) as repo, contextlib.redirect_stdout(output):
+                getattr(repo, method)(*_arguments(method, request.get("args", [])))
+        except NoteAppError as error:
+            return {"output": output.getvalue(), "error": str(error)}
+        except Exception as error:
+            self.cache.clear()
+            return {"output": output.getvalue(), "error": f"The note server could not handle the request. {error}"}
+        return {"output": output.getvalue(), "error": None}
+
+    def _respond(self, connection: socket.socket):
+        connection.settimeout(REQUEST_TIMEOUT)
+        try:
+            request = client.receive(connection)
+        except (OSError, ValueError):
+            return
+        if not isinstance(request, dict):
+            return
+
+        if request.get("method") == SHUTDOWN:
+            self.stop()
+            response = {"output": "", "error": None}
+        else:
+            response = self.handle(request)
+        try:
+            client.send(connection, response)
+        except OSError:
+            pass
+
+def _arguments(method: str, args: list):
+    if method == "add_note":
+        return [Note(**args[0])]
+    if method == "create_status":
+        return [args[0], Status(**args[1])]
+    return args
+
+def stop_server():
+    """
+    Stops the server of the repository in the current directory.
+
+    Returns:
+        bool: Whether a server was running.
+    """
+    return client.forward(SHUTDOWN)
@@ -1,34 +1,92 @@
 """
-Handles low-level operations related to the note repository file, such as 
-creating, reading, and writing JSON data.
+Handles low-level operations related to the note repository file, such as
+creating, reading, and writing repository data.
 
-This module abstracts interactions with the file system to manage the 
-repository where notes are stored.
+This module abstracts interactions with the file system to manage the
+repository where notes are stored. The format of the repository file is
+handled by a storage engine (see `app.core.engines`), detected when the
+repository is opened.
 """
-import json
+import copy
+import tempfile
 from pathlib import Path
 
-from app.core import REPOSITORY_FILENAME, REPOSITORY_TEMPLATE
-from app.core.errors import RepositoryDoesNotExistError, RepositoryCorruptedError
+from app.core import REPOSITORY_FILENAME, REPOSITORY_TEMPLATE, LOCK_FILENAME, SEARCH_INDEX_FILENAME
+from app.core import engines, tag_index, profiling
+from app.core.engines import StorageEngine
+from app.core.engines.compression import NONE, compression_names, get_compression
+from app.core.locking import RepositoryLock
+from app.core.models import CompressionReport
+from app.core.errors import RepositoryDoesNotExistError, RepositoryCorruptedError, NoteAppError
+
+DEFAULT_ENGINE = "json"
 
 repository = Path() / REPOSITORY_FILENAME
 
-def create_repository():
+def create_repository(use_journal: bool = False, engine: str = DEFAULT_ENGINE):
     """
     Creates a new note repository file in the current directory.
 
+    Args:
+        use_journal (bool): Whether changes should be appended to the journal
+                            instead of rewriting the repository file.
+        engine (str): Name of the storage engine used for the repository.
+
     Raises:
         FileExistsError: If the repository file already exists.
+        NoteAppError: If the storage engine does not exist.
 
     Returns:
         Path: Absolute path to the newly created repository file.
     """
+    engine_class = engines.get_engine(engine)
+
+    notes_repository = copy.deepcopy(REPOSITORY_TEMPLATE)
+    notes_repository["config"]["journal"] = use_journal
+
+    storage_engine = engine_class(repository)
     try:
-        with repository.open("x") as file:
-            json.dump(REPOSITORY_TEMPLATE, file)
-            return repository.absolute()
+        storage_engine.create(notes_repository)
+        return repository.absolute()
     except FileExistsError:
         raise FileExistsError(f"Notes repository already initialized in {repository.absolute()}")
+    finally:
+        storage_engine.close()
+
+def open_repository() -> StorageEngine:
+    """
+    Opens the repository in the current directory with its storage engine.
+
+    Raises:
+        RepositoryDoesNotExistError: If the repository file does not exist.
+
+    Returns:
+        StorageEngine: Engine handling the repository file. It should be
+                       closed when no longer needed.
+    """
+    if not repository.exists():
+        raise RepositoryDoesNotExistError(f"Notes repository does not exist. Run `note init` to initialize repository.")
+    with profiling.span("open"):
+        return engines.detect_engine(repository)
+
+def lock_repository(shared: bool = False) -> RepositoryLock:
+    """
+    Locks the repository in the current directory, blocking until the lock
+    is acquired. Readers take a shared lock, writers an exclusive one.
+
+    Raises:
+        RepositoryDoesNotExistError: If the repository file does not exist.
+
+    Returns:
+        RepositoryLock: The acquired lock. It should be released when the
+                        repository is no longer used.
+    """
+    if not repository.exists():
+        raise RepositoryDoesNotExistError(f"Notes repository does not exist. Run `note init` to initialize repository.")
+    lock = RepositoryLock(repository.parent / LOCK_FILENAME)
+    with profiling.span("lock"):
+        lock.acquire(shared)
+    return lock
 
 def load_repository():
     """
@@ -36,37 +94,215 @@ def load_repository():
 
     Raises:
         RepositoryDoesNotExistError: If the repository file does not exist.
-        RepositoryCorruptedError: If the repository file is not valid JSON.
+        RepositoryCorruptedError: If the repository file cannot be read.
 
     Returns:
         dict: Parsed repository content as a dictionary of notes.
     """
-    if not repository.exists():
-        raise RepositoryDoesNotExistError(f"Notes repository does not exist. Run `note init` to initialize repository.")
-    
+    storage_engine = open_repository()
     try:
-        with open(REPOSITORY_FILENAME, "r") as file:
-            return json.load(file)
-    except json.JSONDecodeError as error:
-        raise RepositoryCorruptedError(f"Cannot read repository. File is not valid JSON. {error}")
+        with profiling.span("load"):
+            return storage_engine.load()
+    finally:
+        storage_engine.close()
 
-def save_repository(notes_repository: dict):
+def save_repository(notes_repository: dict, changes: list[dict] | None = None):
     """
     Saves the provided repository dictionary to the repository file.
 
     Args:
         notes_repository (dict): The repository data to save.
+        changes (list[dict] | None): Operations applied since the repository
+                                     was loaded, which lets the engine save
+                                     only what changed.
 
     Raises:
         RepositoryDoesNotExistError: If the repository file does not exist.
     """
-    if not repository.exists():
-        raise RepositoryDoesNotExistError(f"Notes repository does not exist. Run `note init` to initialize repository.")
-    
-    with repository.open("w") as file:
-        json.dump(notes_repository, file)
+    storage_engine = open_repository()
+    try:
+        with profiling.span("save"):
+            storage_engine.save(notes_repository, changes)
+    finally:
+        storage_engine.close()
+
+def save_changes(storage_engine: StorageEngine, notes_repository: dict | None, changes: list[dict]):
+    """
+    Saves changes made in a session with the storage engine and updates the
+    tag and search indexes with them (see `app.core.tag_index` and
+    `app.core.search_index`). Out of date indexes are removed, to be rebuilt
+    when next needed. The search index module is only imported if the
+    repository has a search index.
+
+    Args:
+        storage_engine (StorageEngine): Engine of the repository.
+        notes_repository (dict | None): The repository with changes applied,
+                                        or None if it was not loaded.
+        changes (list[dict]): Operations applied in the session.
+    """
+    with profiling.span("save"):
+        _save_changes(storage_engine, notes_repository, changes)
+
+def _save_changes(storage_engine: StorageEngine, notes_repository: dict | None, changes: list[dict]):
+    search_path = storage_engine.path.parent / SEARCH_INDEX_FILENAME
+    with profiling.span("read indexes"):
+        tags = tag_index.open_index(storage_engine)
+        search = None
+        if tags is not None and search_path.exists():
+            from app.core import search_index
+
+            search = search_index.open_index(storage_engine)
+    with profiling.span("write"):
+        storage_engine.save(notes_repository, changes)
+
+    if tags is None:
+        tag_index.index_path(storage_engine).unlink(missing_ok=True)
+        search_path.unlink(missing_ok=True)
+        return
+
+    with profiling.span("tag index"):
+        events = tags.apply(changes)
+        stamp = tag_index.stamp(storage_engine)
+        tags.save(tag_index.index_path(storage_engine), stamp)
+    if search is None:
+        search_path.unlink(missing_ok=True)
+        return
+    with profiling.span("search index"):
+        search.apply(events)
+        search.save(search_path, stamp)
+
+def number_notes(storage_engine: StorageEngine):
+    """
+    Assigns ids to the notes of a repository created before notes had ids,
+    in display order, so notes keep the ids they were displayed with. Must be
+    called with the exclusive repository lock held.
+
+    Returns:
+        dict: The repository configuration, with the next note id.
+    """
+    notes_repository = storage_engine.load()
+    try:
+        notes = notes_repository["notes"]
+        next_id = max((note.get("id") or 0 for note in notes), default=0) + 1
+        for note in notes:
+            if note.get("id") is None:
+                note["id"] = next_id
+                next_id += 1
+        notes_repository["config"]["next_id"] = next_id
+    except (KeyError, TypeError, AttributeError) as error:
+        raise RepositoryCorruptedError(f"Cannot number notes of repository. {error}")
+    storage_engine.save(notes_repository)
+    return notes_repository["config"]
+
+def compact_repository(use_journal: bool | None = None, compression: str | None = None):
+    """
+    Rewrites the repository file in its most compact form, merging the
+    journal into it.
+
+    Args:
+        use_journal (bool | None): If provided, enables or disables journaling
+                                   for the repository.
+        compression (str | None): If provided, name of the compression the
+                                  repository is converted to, 'none' to
+                                  store it uncompressed.
+
+    Raises:
+        RepositoryDoesNotExistError: If the repository file does not exist.
+        RepositoryCorruptedError: If the repository or journal cannot be read.
+        NoteAppError: If the compression does not exist or is not supported
+                      by the storage engine of the repository.
+
+    Returns:
+        int: Number of journal operations merged into the repository file.
+    """
+    with lock_repository():
+        storage_engine = open_repository()
+        try:
+            notes_repository = storage_engine.load()
+            if use_journal is not None:
+                notes_repository.setdefault("config", {})["journal"] = use_journal
+            if compression is not None:
+                if get_compression(compression) is not None:
+                    _check_compression(storage_engine)
+                notes_repository.setdefault("config", {})["compression"] = None if compression == NONE else compression
+            return storage_engine.compact(notes_repository)
+        finally:
+            storage_engine.close()
+
+def compression_report():
+    """
+    Measures the size of the repository file and the time needed to write and
+    read it with every available compression. The repository is not changed.
+
+    Raises:
+        RepositoryDoesNotExistError: If the repository file does not exist.
+        NoteAppError: If the storage engine does not support compression.
+
+    Returns:
+        list[CompressionReport]: One entry per compression, the one currently
+                                 used by the repository marked as current.
+    """
+    with lock_repository(shared=True):
+        storage_engine = open_repository()
+        try:
+            _check_compression(storage_engine)
+            notes_repository = storage_engine.load()
+            current = storage_engine.compression.name if storage_engine.compression else NONE
+            report = []
+            for name in compression_names():
+                size, write_time, read_time = storage_engine.measure_compression(notes_repository, get_compression(name))
+                report.append(CompressionReport(name, size, write_time, read_time, name == current))
+            return report
+        finally:
+            storage_engine.close()
+
+def migrate_repository(engine: str):
+    """
+    Converts the repository to another storage engine.
+
+    The repository is written with the new engine to a temporary directory
+    next to it and then renamed over the repository file, so an interrupted
+    migration leaves the original repository untouched.
+
+    Args:
+        engine (str): Name of the target storage engine.
+
+    Raises:
+        RepositoryDoesNotExistError: If the repository file does not exist.
+        NoteAppError: If the engine does not exist or is already used.
+
+    Returns:
+        str: Name of the storage engine the repository was migrated from.
+    """
+    engine_class = engines.get_engine(engine)
+
+    with lock_repository():
+        source = open_repository()
+        try:
+            if source.name == engine_class.name:
+                raise NoteAppError(f"Repository already uses {engine_class.name} storage engine.")
+            notes_repository = source.load()
+        finally:
+            source.close()
+
+        if not engine_class.supports_compression and "compression" in notes_repository.get("config", {}):
+            notes_repository["config"]["compression"] = None
+
+        with tempfile.TemporaryDirectory(prefix=f"{repository.name}.", dir=repository.absolute().parent) as directory:
+            target = engine_class(Path(directory) / repository.name)
+            try:
+                target.create(notes_repository)
+            finally:
+                target.close()
+            target.replace(repository)
+
+        engines.fsync_directory(repository.absolute().parent)
+        source.cleanup()
+    return source.name
+
+def _check_compression(storage_engine: StorageEngine):
+    if not storage_engine.supports_compression:
+        raise NoteAppError(f"The {storage_engine.name} storage engine does not support compression. Run `note migrate --engine json` to use a compressed repository.")
 
 def repository_exists():
     return repository.exists()
-
-# TODO Consider using with clause to work with load/save repository
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Persistent inverted index of note tags and statuses.
+
+The index maps every tag and status to the sorted positions of the notes
+using it, so listing notes with a tag filter reads only the matching notes
+and listing tags does not read notes at all. It also keeps the id of the note
+at every position, which finds a note by its id without reading notes. It is
+kept in the `.notes.tags` file next to the repository.
+
+The index is updated from the operations saved by every session (see
+`app.core.storage.save_changes`) instead of being rebuilt. It keeps the
+priorities of statuses, which is enough to tell where an added note is
+inserted and how notes are reordered when a status changes, without reading
+notes. The index records the size and modification time of the repository
+files it describes; an index that does not match them, because the
+repository was changed without updating it, is rebuilt when next needed.
+"""
+import json
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from app.core import TAG_INDEX_FILENAME, JOURNAL_FILENAME
+from app.core import operations, profiling
+from app.core.engines import StorageEngine, atomic_write
+from app.core.errors import RepositoryCorruptedError
+
+MAGIC = b"NOTETAG\x02"
+LENGTH = struct.Struct("<I")
+NO_STATUS = ""
+
+ADD = "add"
+DELETE = "delete"
+DELETE_MANY = "delete_many"
+MOVE = "move"
+
+class TagIndex:
+    def __init__(self, count: int, priorities: dict[str, int], tags: dict[str, array], statuses: dict[str, array], ids: array):
+        self.count = count
+        self.priorities = priorities
+        self.tags = tags
+        self.statuses = statuses
+        self.ids = ids
+        self._positions = None
+
+    @staticmethod
+    def build(notes: list[dict], statuses: dict):
+        ids = array("I", [note.get("id") or 0 for note in notes])
+        index = TagIndex(len(notes), {name: status["priority"] for name, status in statuses.items()}, {}, {}, ids)
+        for position, note in enumerate(notes):
+            for tag in dict.fromkeys(note["tags"] or []):
+                index.tags.setdefault(tag, array("I")).append(position)
+            index.statuses.setdefault(note["status"] or NO_STATUS, array("I")).append(position)
+        return index
+
+    @staticmethod
+    def load(path: Path, stamp: list):
+        """
+        Loads the index from path.
+
+        Returns:
+            TagIndex | None: The index, or None if it does not exist, cannot
+                             be read or was built for other repository files.
+        """
+        try:
+            with path.open("rb") as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    return None
+                (length,) = LENGTH.unpack(file.read(LENGTH.size))
+                header = json.loads(file.read(length))
+                if header["stamp"] != stamp or header["byteorder"] != sys.byteorder:
+                    return None
+                tags = {name: _read_postings(file, size) for name, size in header["tags"]}
+                statuses = {name: _read_postings(file, size) for name, size in header["statuses"]}
+                ids = _read_postings(file, header["count"])
+        except (OSError, ValueError, KeyError, TypeError, EOFError, struct.error):
+            return None
+        return TagIndex(header["count"], header["priorities"], tags, statuses, ids)
+
+    def save(self, path: Path, stamp: list):
+        header = json.dumps({
+            "stamp": stamp,
+            "byteorder": sys.byteorder,
+            "count": self.count,
+            "priorities": self.priorities,
+            "tags": [[name, len(positions)] for name, positions in self.tags.items()],
+            "statuses": [[name, len(positions)] for name, positions in self.statuses.items()]
+        }).encode()
+
+        def write(file):
+            file.write(MAGIC)
+            file.write(LENGTH.pack(len(header)))
+            file.write(header)
+            for positions in (*self.tags.values(), *self.statuses.values()):
+                positions.tofile(file)
+            self.ids.tofile(file)
+
+        atomic_write(path, write, "wb")
+
+    def positions(self, tag_filter: list[str]):
+        """
+        Returns sorted positions of notes with at least one of the tags.
+        """
+        matches = [self.tags[tag] for tag in set(tag_filter) if tag in self.tags]
+        if len(matches) == 1:
+            return list(matches[0])
+        return sorted({position for positions in matches for position in positions})
+
+    def position(self, note_id: int):
+        """
+        Returns the position of the note with the given id, or None if there
+        is no such note. Positions of all notes are hashed on first use.
+        """
+        if self._positions is None:
+            self._positions = {note_id: position for position, note_id in enumerate(self.ids) if note_id}
+        return self._positions.get(note_id)
+
+    def tag_names(self):
+        return [tag for tag, positions in self.tags.items() if positions]
+
+    def apply(self, changes: list[dict]):
+        """
+        Updates the index with operations applied to the repository, see
+        `app.core.operations.apply_operations`.
+
+        Returns:
+            list[tuple]: How the positions of notes changed, for indexes that
+                         rely on this one to track positions:
+                         ('add', position, note) for an added note,
+                         ('delete', position, None) for a deleted one,
+                         ('delete_many', None, positions) for notes deleted
+                         at once, with their sorted positions, and
+                         ('move', None, (start, end, moved, to_front)) when
+                         notes at the sorted positions moved, all between
+                         start and end, were moved to the front or the back
+                         of that range, see `moved_slice`.
+        """
+        self._positions = None
+        events = []
+        added = []
+        for change in changes:
+            kind = change["op"]
+            if kind == operations.ADD_NOTE:
+                added.append(change["note"])
+                continue
+
+            events.extend(self._add(added))
+            added = []
+            if kind == operations.DELETE_NOTE:
+                self._delete(change["position"])
+                events.append((DELETE, change["position"], None))
+            elif kind == operations.DELETE_NOTES:
+                self._delete_many(change["positions"])
+                events.append((DELETE_MANY, None, change["positions"]))
+            elif kind == operations.CREATE_STATUS:
+                self.priorities[change["name"]] = change["status"]["priority"]
+            elif kind == operations.EDIT_STATUS:
+                if change["priority"]:
+                    previous = self.priorities[change["name"]]
+                    self.priorities[change["name"]] = change["priority"]
+                    move = self._move(change["name"], previous, change["priority"])
+                    if move is not None:
+                        events.append((MOVE, None, move))
+            elif kind == operations.DELETE_STATUS:
+                previous = self.priorities.pop(change["name"])
+                move = self._move(change["name"], previous, 0)
+                if move is not None:
+                    events.append((MOVE, None, move))
+                positions = self.statuses.pop(change["name"], None)
+                if positions:
+                    # Two sorted runs, which sorting merges in linear time.
+                    merged = sorted((*self.statuses.get(NO_STATUS, ()), *positions))
+                    self.statuses[NO_STATUS] = array("I", merged)
+        events.extend(self._add(added))
+        return events
+
+    def _priority(self, status: str):
+        return 0 if status == NO_STATUS else self.priorities[status]
+
+    def _add(self, notes: list[dict]):
+        """
+        Notes are sorted by descending priority, so a note is inserted right
+        after all notes with at least its priority. Consecutive additions are
+        grouped by priority, like in `app.core.operations.apply_operations`,
+        and positions are shifted once for every group.
+
+        Returns:
+            list[tuple]: Events of the added notes, see `apply`.
+        """
+        groups = {}
+        for note in notes:
+            groups.setdefault(self._priority(note["status"] or NO_STATUS), []).append(note)
+
+        events = []
+        for priority, group in groups.items():
+            position = sum(
+                len(positions) for name, positions in self.statuses.items()
+                if self._priority(name) >= priority
+            )
+            for positions in (*self.tags.values(), *self.statuses.values()):
+                _shift(positions, position, len(group))
+
+            tags = {}
+            statuses = {}
+            for offset, note in enumerate(group, position):
+                for tag in dict.fromkeys(note["tags"] or []):
+                    tags.setdefault(tag, []).append(offset)
+                statuses.setdefault(note["status"] or NO_STATUS, []).append(offset)
+                events.append((ADD, offset, note))
+            for postings, added in ((self.tags, tags), (self.statuses, statuses)):
+                for name, added_positions in added.items():
+                    _insert(postings.setdefault(name, array("I")), added_positions)
+            self.ids[position:position] = array("I", [note.get("id") or 0 for note in group])
+            self.count += len(group)
+        return events
+
+    def _delete(self, position: int):
+        for positions in (*self.tags.values(), *self.statuses.values()):
+            idx = bisect_left(positions, position)
+            if idx < len(positions) and positions[idx] == position:
+                del positions[idx]
+            _shift(positions, position, -1)
+        del self.ids[position]
+        self.count -= 1
+
+    def _delete_many(self, removed: list[int]):
+        """
+        Removes notes at sorted positions. Every remaining position moves back
+        by the number of removed positions before it.
+        """
+        if not removed:
+            return
+        removed_set = set(removed)
+        for postings in (self.tags, self.statuses):
+            for name, positions in postings.items():
+                idx = bisect_left(positions, removed[0])
+                if idx < len(positions):
+                    positions[idx:] = array("I", [
+                        position - bisect_left(removed, position) for position in positions[idx:]
+                        if position not in removed_set
+                    ])
+        start = removed[0]
+        self.ids[start:] = array("I", [
+            note_id for position, note_id in enumerate(self.ids[start:], start) if position not in removed_set
+        ])
+        self.count -= len(removed)
+
+    def _move(self, name: str, previous: int, value: int):
+        """
+        Moves notes of the status from the bucket of its previous priority to
+        the bucket of the new one, like `app.core.operations._move_status`:
+        to the back of the new bucket if the priority grew, to its front
+        otherwise. Only positions between the two buckets change, each
+        shifted by the number of moved notes it passes.
+
+        Returns:
+            tuple | None: The range of positions the notes were moved within,
+                          see `apply`, or None if no note moved.
+        """
+        moved = self.statuses.get(name)
+        if not moved or value == previous:
+            return None
+        moved = list(moved)
+        others = [(status, positions) for status, positions in self.statuses.items() if status != name]
+        to_front = value > previous
+        if to_front:
+            start = sum(len(positions) for status, positions in others if self._priority(status) >= value)
+            end = moved[-1] + 1
+        else:
+            start = moved[0]
+            end = len(moved) + sum(len(positions) for status, positions in others if self._priority(status) > value)
+
+        moved_set = set(moved)
+        for postings in (self.tags, self.statuses):
+            for positions in postings.values():
+                _move_positions(positions, start, end, moved, moved_set, to_front)
+        self.ids[start:end] = moved_slice(self.ids[start:end], start, moved_set, to_front)
+        return start, end, moved, to_front
+
+def stamp(engine: StorageEngine):
+    """
+    Describes the current state of the repository files.
+    """
+    return path_stamp(engine.path)
+
+def path_stamp(repository_path: Path):
+    """
+    Describes the current state of the files of the repository at
+    repository_path, without opening it.
+    """
+    result = []
+    for path in (repository_path, repository_path.parent / JOURNAL_FILENAME):
+        try:
+            stat = path.stat()
+            result.append([stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            result.append(None)
+    return result
+
+def index_path(engine: StorageEngine):
+    return engine.path.parent / TAG_INDEX_FILENAME
+
+def open_index(engine: StorageEngine):
+    """
+    Loads the index of the repository if it is up to date.
+    """
+    return TagIndex.load(index_path(engine), stamp(engine))
+
+def get_index(engine: StorageEngine):
+    """
+    Loads the index of the repository, building and saving it first if it
+    does not exist or is out of date.
+    """
+    with profiling.span("tag index"):
+        index = open_index(engine)
+        if index is None:
+            notes_repository = engine.load()
+            try:
+                index = TagIndex.build(notes_repository["notes"], notes_repository["config"]["statuses"])
+            except (KeyError, TypeError) as error:
+                raise RepositoryCorruptedError(f"Cannot index repository. {error}")
+            index.save(index_path(engine), stamp(engine))
+        return index
+
+def _shift(positions: array, start: int, offset: int):
+    idx = bisect_left(positions, start)
+    if idx < len(positions):
+        positions[idx:] = array("I", [position + offset for position in positions[idx:]])
+
+def moved_slice(values: array, start: int, moved: set[int], to_front: bool):
+    """
+    Reorders values of the positions from start on like a 'move' event, see
+    `TagIndex.apply`: values of moved positions go to the front or the back,
+    both parts keep their order.
+    """
+    picked = array(values.typecode, [value for position, value in enumerate(values, start) if position in moved])
+    rest = array(values.typecode, [value for position, value in enumerate(values, start) if position not in moved])
+    return picked + rest if to_front else rest + picked
+
+def _move_positions(positions: array, start: int, end: int, moved: list[int], moved_set: set[int], to_front: bool):
+    """
+    Updates sorted positions for notes moved within start and end, see
+    `TagIndex._move`. Positions outside of the range are not touched.
+    """
+    first, last = bisect_left(positions, start), bisect_left(positions, end)
+    if first == last:
+        return
+    picked, rest = array("I"), array("I")
+    for position in positions[first:last]:
+        before = bisect_left(moved, position)
+        if position in moved_set:
+            picked.append((start if to_front else end - len(moved)) + before)
+        elif to_front:
+            rest.append(position + len(moved) - before)
+        else:
+            rest.append(position - before)
+    positions[first:last] = picked + rest if to_front else rest + picked
+
+def _insert(positions: array, added: list[int]):
+    """
+    Inserts sorted positions added within a range of positions which does
+    not contain any of the existing ones.
+    """
+    idx = bisect_left(positions, added[0])
+    positions[idx:idx] = array("I", added)
+
+def _read_postings(file, size: int):
+    positions = array("I")
+    positions.fromfile(file, size)
+    return positions
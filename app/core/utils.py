@@ -1,13 +1,27 @@
-import re
+"""
+Helpers for parsing command arguments and printing their results.
+
+Printing functions import Rich when they are called rather than with this
+module, which is imported by every command; loading Rich's rendering takes
+longer than running commands that print nothing, like `note add`.
 
-from rich import print
-from rich.table import Table
-from rich.text import Text
+Notes are printed as a table rendered in chunks of `ROWS_PER_CHUNK` rows, each
+written as soon as its notes are read, so the first rows show up before the
+remaining notes are read and the whole table is never kept in memory. Columns
+have fixed widths, so the chunks line up into one table.
+"""
+import re
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable
 
+from app.core import profiling
 from app.core.errors import NoteAppError
-from app.core.models import NoteWithStatus, Status
+from app.core.models import NoteWithStatus, Status, CompressionReport
 
-NO_TEXT = Text("-", style="italic black")
+NO_TEXT_STYLE = "italic black"
+ROWS_PER_CHUNK = 100
+DEFAULT_PAGER = "less -R"
 
 def parse_tags(tags: str):
     result = re.match("^[a-zA-Z0-9]+(,[a-zA-Z0-9]+)*$", tags)
@@ -17,27 +31,149 @@ def parse_tags(tags: str):
         "letters and numbers.")
     return tags.split(",")
 
-def print_notes(notes: list[NoteWithStatus]):
-    table = Table(title="Your Notes")
+def discard_stdout():
+    """
+    Drops output left in the standard output buffer after its reader stopped
+    reading, like `head` does, so it is not written at exit.
+    """
+    import os
+    import sys
+
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+def print_notes(notes: Iterable[NoteWithStatus], pager: bool = False, repositories: bool = False, console=None):
+    """
+    Prints notes as a table, chunk by chunk.
+
+    Args:
+        notes (Iterable[NoteWithStatus]): Notes to print, read lazily.
+        pager (bool): Whether to send the table to the pager from the PAGER
+                      environment variable (`less -R` by default) when
+                      printing to a terminal.
+        repositories (bool): Whether to add a column with the repository of
+                             every note, for notes of many repositories.
+        console (Console | None): Rich console to print to, the global one
+                                  by default.
+    """
+    with profiling.span("render"):
+        import rich
+
+        notes = profiling.timed_iter("read", notes)
+        console = console or rich.get_console()
+        if pager and console.is_terminal:
+            with _pager(console) as pager_console:
+                if pager_console is not None:
+                    try:
+                        _print_note_chunks(pager_console, notes, repositories)
+                    except BrokenPipeError:
+                        pass
+                    return
+        _print_note_chunks(console, notes, repositories)
+
+def _print_note_chunks(console, notes: Iterable[NoteWithStatus], repositories: bool = False):
+    from rich.segment import Segment, Segments
+
+    notes = iter(notes)
+    chunk = list(islice(notes, ROWS_PER_CHUNK))
+    first = True
+    while True:
+        following = list(islice(notes, ROWS_PER_CHUNK)) if chunk else []
+        last = not following
+        lines = console.render_lines(_notes_table(chunk, first, repositories), console.options, pad=False)
+        # Rows of every chunk continue the table printed so far: the top edge
+        # of later chunks and the bottom edge of all but the last one are cut.
+        lines = lines[(0 if first else 1):(None if last else -1)]
+        console.print(Segments(segment for line in lines for segment in (*line, Segment.line())), end="")
+        if last:
+            return
+        chunk, first = following, False
+
+def _notes_table(notes: list[NoteWithStatus], header: bool, repositories: bool = False):
+    from rich.table import Table
+    from rich.text import Text
+
+    no_text = Text("-", style=NO_TEXT_STYLE)
+    table = Table(title="Your Notes" if header else None, show_header=header)
+    if repositories:
+        # The repository column takes its width from the content column.
+        table.add_column("Repository", style="cyan", width=16)
     table.add_column("ID", width=6)
-    table.add_column("Content", width=50)
+    table.add_column("Content", width=34 if repositories else 50)
     table.add_column("Status", width=16)
     table.add_column("Tags", style="violet", width=16)
 
     for note_with_status in notes:
         idx, note, status = note_with_status.idx, note_with_status.note, note_with_status.status
-        tags = " ".join(f"#{tag}" for tag in note.tags) if note.tags else NO_TEXT
-        status = Text(note.status, status.style) if note.status else NO_TEXT
-        table.add_row(str(idx + 1), note.content, status, tags)
-    
-    print(table)
+        tags = " ".join(f"#{tag}" for tag in note.tags) if note.tags else no_text
+        status = Text(note.status, status.style) if note.status else no_text
+        note_id = note.id if note.id is not None else idx + 1
+        row = [str(note_id), note.content, status, tags]
+        table.add_row(*([note_with_status.repository] if repositories else []), *row)
+    return table
+
+@contextmanager
+def _pager(console):
+    """
+    Runs the pager and yields a console writing to it, or None if the pager
+    cannot be started. Exits when the pager is closed.
+    """
+    import os
+    import shlex
+    import subprocess
+    from rich.console import Console
+
+    try:
+        process = subprocess.Popen(
+            shlex.split(os.environ.get("PAGER") or DEFAULT_PAGER),
+            stdin=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+    except (OSError, ValueError):
+        yield None
+        return
+    try:
+        yield Console(file=process.stdin, width=console.width, color_system=console.color_system, force_terminal=True)
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+
+def print_tags(tags: list[str], console=None):
+    with profiling.span("render"):
+        import rich
+        from rich.text import Text
+
+        tags_list = " ".join(f"#{tag}" for tag in set(tags))
+        tags_list = Text(tags_list, style="bold violet")
+        (console or rich.get_console()).print(tags_list)
 
-def print_tags(tags: list[str]):
-    tags_list = " ".join(f"#{tag}" for tag in set(tags))
-    tags_list = Text(tags_list, style="bold violet")
-    print(tags_list)
+def print_statuses(statuses: list[tuple[str, Status]], console=None):
+    with profiling.span("render"):
+        import rich
+        from rich.text import Text
 
-def print_statuses(statuses: list[tuple[str, Status]]):
-    for name, status in statuses:
-        styled_status = Text(name, status.style)
-        print(styled_status, " priority: ", status.priority)
+        console = console or rich.get_console()
+        for name, status in statuses:
+            styled_status = Text(name, status.style)
+            console.print(styled_status, " priority: ", status.priority)
+
+def print_compression_report(report: list[CompressionReport]):
+    from rich import print
+    from rich.table import Table
+    from rich.text import Text
+
+    uncompressed = next((entry.size for entry in report if entry.compression == "none"), 0)
+    table = Table(title="Compression")
+    table.add_column("Compression", width=12)
+    table.add_column("Size", justify="right", width=12)
+    table.add_column("Ratio", justify="right", width=8)
+    table.add_column("Write", justify="right", width=10)
+    table.add_column("Read", justify="right", width=10)
+
+    for entry in report:
+        name = Text(f"{entry.compression} *", style="bold") if entry.current else entry.compression
+        ratio = f"{uncompressed / entry.size:.2f}x" if entry.size else "-"
+        table.add_row(name, f"{entry.size} B", ratio, f"{entry.write_time * 1000:.1f} ms", f"{entry.read_time * 1000:.1f} ms")
+
+    print(table)
@@ -0,0 +1,209 @@
+"""
+Measures the time of every command on generated repositories of given sizes.
+
+For every storage engine and repository size a repository is generated once
+(see `generate.py`) and every command is run on a fresh copy of it, so
+commands which change the repository are measured on the same notes each
+time. Commands are run in-process through the `app.cli.app` Typer entry
+point, as `note` runs them, and through the `Repository` API, which leaves
+out parsing arguments; the output is discarded. The median time of the runs
+is reported, copying the repository is not measured.
+
+Usage:
+    python benchmarks/commands.py [--sizes N,...] [--engines NAME,...]
+        [--runs N] [--output FILE] [--baseline FILE] [--max-regression RATIO]
+
+Results are written to --output as JSON, so a run can be used as the
+baseline of later ones. With --baseline every result is compared to the
+baseline result of the same command, and with --max-regression the script
+exits with status 1 if any command got slower by more than RATIO (0.2 for
+20%) and at least MIN_DIFFERENCE seconds, so it can catch performance
+regressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from generate import RepositorySpec, create, working_directory
+from app.cli import app
+from app.core.models import Note
+from app.core.repository import Repository, create_repository
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+MIN_DIFFERENCE = 0.005
+TAG = "tag1"
+STATUS = "TODO"
+
+def cli_commands(size: int):
+    """
+    Commands run through the Typer application, as (name, arguments, input).
+    """
+    return [
+        ("add", ["add", "Benchmark note.", "-t", "benchmark", "-s", STATUS], None),
+        ("list", ["list"], None),
+        ("list -t", ["list", "-t", TAG], None),
+        ("list -T", ["list", "-T"], None),
+        ("list -f tsv", ["list", "-f", "tsv"], None),
+        ("search", ["search", "report draft"], None),
+        ("delete", ["delete", str(size // 2 + 1)], None),
+        ("status --edit", ["status", "-e", STATUS, "-p", "-5"], None),
+        ("status --delete", ["status", "-d", STATUS], "y\n")
+    ]
+
+def api_commands(size: int):
+    """
+    Commands run with the `Repository` API, as (name, function).
+    """
+    def session(method, *args, read_only=False):
+        def run():
+            with Repository(read_only=read_only) as repo:
+                getattr(repo, method)(*args)
+        return run
+
+    return [
+        ("add", session("add_note", Note.create("Benchmark note.", ["benchmark"], STATUS))),
+        ("list", session("list_notes", read_only=True)),
+        ("list -t", session("list_notes", [TAG], read_only=True)),
+        ("list -T", session("list_tags", read_only=True)),
+        ("list -f tsv", session("list_notes", None, None, None, None, 0, False, "tsv", read_only=True)),
+        ("search", session("search_notes", "report draft", 20, read_only=True)),
+        ("delete", session("delete_notes", [size // 2 + 1])),
+        ("status --edit", session("edit_status", STATUS, None, -5)),
+        ("status --delete", session("delete_status", STATUS))
+    ]
+
+def measure(template: Path, run, runs: int):
+    """
+    Returns the median time of running function run in fresh copies of the
+    template repository directory.
+    """
+    times = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as directory:
+            copy = Path(directory) / "repository"
+            shutil.copytree(template, copy)
+            with working_directory(copy), contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def measure_init(engine: str, runs: int):
+    def run():
+        create_repository(engine=engine)
+
+    with tempfile.TemporaryDirectory() as directory:
+        template = Path(directory) / "empty"
+        template.mkdir()
+        return measure(template, run, runs)
+
+def benchmark(sizes: list[int], engines: list[str], runs: int):
+    runner = CliRunner()
+    results = {}
+
+    def report(key: str, elapsed: float):
+        results[key] = elapsed
+        print(f"{key:<48} {elapsed * 1000:10.1f} ms", flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for engine in engines:
+            report(f"{engine}/init", measure_init(engine, runs))
+            for size in sizes:
+                template = Path(directory) / f"{engine}-{size}"
+                start = time.perf_counter()
+                create(template, RepositorySpec(notes=size, engine=engine))
+                print(f"Generated {size} notes for {engine} in {time.perf_counter() - start:.2f} s.", flush=True)
+                # Indexes are built by the first command which needs them,
+                # build them in the template so every run starts with them.
+                with working_directory(template), contextlib.redirect_stdout(io.StringIO()):
+                    runner.invoke(app, ["list", "-T"])
+                    runner.invoke(app, ["search", "note"])
+
+                for name, args, stdin in cli_commands(size):
+                    def run_cli():
+                        result = runner.invoke(app, args, input=stdin)
+                        if result.exception is not None:
+                            raise result.exception
+                    report(f"{engine}/{size}/cli/{name}", measure(template, run_cli, runs))
+                for name, function in api_commands(size):
+                    with _confirmed():
+                        report(f"{engine}/{size}/api/{name}", measure(template, function, runs))
+                shutil.rmtree(template)
+    return results
+
+@contextlib.contextmanager
+def _confirmed():
+    """
+    Answers yes to confirmations asked by `Repository` methods.
+    """
+    import typer
+
+    confirm = typer.confirm
+    typer.confirm = lambda *args, **kwargs: True
+    try:
+        yield
+    finally:
+        typer.confirm = confirm
+
+def compare(results: dict[str, float], baseline: dict[str, float], max_regression: float | None):
+    """
+    Prints results next to the baseline ones.
+
+    Returns:
+        bool: Whether no result is slower than allowed by max_regression.
+    """
+    passed = True
+    for key, elapsed in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        ratio = elapsed / previous if previous else float("inf")
+        regression = (
+            max_regression is not None and ratio > 1 + max_regression
+            and elapsed - previous >= MIN_DIFFERENCE
+        )
+        passed = passed and not regression
+        marker = "  REGRESSION" if regression else ""
+        print(f"{key:<48} {previous * 1000:10.1f} ms -> {elapsed * 1000:10.1f} ms  ({ratio:.2f}x){marker}")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time of note commands on generated repositories.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated numbers of notes, for example 1000,1000000.")
+    parser.add_argument("--engines", default="json", help="Comma separated storage engines.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of runs of every command.")
+    parser.add_argument("--output", type=Path, help="File to write results to as JSON.")
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run to compare with.")
+    parser.add_argument("--max-regression", type=float, help="Maximum allowed slowdown ratio, like 0.2.")
+    options = parser.parse_args()
+
+    sizes = [int(size) for size in options.sizes.split(",")]
+    engines = options.engines.split(",")
+    results = benchmark(sizes, engines, options.runs)
+
+    if options.output is not None:
+        options.output.write_text(json.dumps({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": options.runs,
+            "results": results
+        }, indent=2) + "\n")
+    if options.baseline is not None:
+        baseline = json.loads(options.baseline.read_text())["results"]
+        if not compare(results, baseline, options.max_regression):
+            print(f"Some commands are more than {options.max_regression:.0%} slower than the baseline.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
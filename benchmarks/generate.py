@@ -0,0 +1,125 @@
+"""
+Generates note repositories of a given size for benchmarks.
+
+Notes get random contents made of words of a fixed vocabulary, so the search
+index sees realistic term frequencies, a random number of tags drawn from a
+given number of distinct tags, and statuses in the given proportions. The
+same seed always gives the same repository.
+
+Usage:
+    python benchmarks/generate.py DIRECTORY [--notes N] [--tags N]
+        [--tags-per-note N] [--statuses NAME:PRIORITY:PERCENT,...]
+        [--content-length N] [--engine ENGINE] [--journal] [--seed N]
+
+The repository is created in DIRECTORY, which must not contain one.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.core import storage
+from app.core.models import Note, Status
+from app.core.repository import Repository, create_repository
+
+WORDS = (
+    "note idea meeting report draft review plan release fix bug feature test"
+    " deploy client server design budget team call email follow update check"
+    " write read build refactor document research schedule week month today"
+    " tomorrow project milestone task issue question answer summary list"
+).split()
+
+@dataclass
+class RepositorySpec:
+    notes: int = 1000
+    tags: int = 50
+    tags_per_note: int = 3
+    # Statuses as (name, priority, percent of notes), the rest have none.
+    statuses: list[tuple[str, int, float]] = field(default_factory=lambda: [
+        ("PRIORITY", 10, 10.0), ("TODO", 5, 30.0), ("DONE", -2, 40.0)
+    ])
+    content_length: int = 12
+    engine: str = storage.DEFAULT_ENGINE
+    journal: bool = False
+    seed: int = 0
+
+def parse_statuses(value: str):
+    """
+    Parses statuses given as NAME:PRIORITY:PERCENT,...
+    """
+    statuses = []
+    for entry in filter(None, value.split(",")):
+        name, priority, percent = entry.split(":")
+        statuses.append((name, int(priority), float(percent)))
+    if sum(percent for _, _, percent in statuses) > 100:
+        raise ValueError("Statuses cannot take more than 100% of notes.")
+    return statuses
+
+def generate_notes(spec: RepositorySpec) -> Iterator[Note]:
+    """
+    Yields the notes of the repository described by spec.
+    """
+    rng = random.Random(spec.seed)
+    tags = [f"tag{idx}" for idx in range(spec.tags)]
+    names = [name for name, _, _ in spec.statuses] + [None]
+    weights = [percent for _, _, percent in spec.statuses]
+    weights.append(max(0.0, 100 - sum(weights)))
+    for idx in range(spec.notes):
+        length = max(1, int(rng.gauss(spec.content_length, spec.content_length / 4)))
+        content = f"Note {idx} " + " ".join(rng.choices(WORDS, k=length))
+        note_tags = rng.sample(tags, rng.randint(0, min(spec.tags_per_note, len(tags)))) if tags else []
+        yield Note.create(content, note_tags or None, rng.choices(names, weights)[0])
+
+@contextmanager
+def working_directory(path: Path):
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def create(directory: Path, spec: RepositorySpec):
+    """
+    Creates the repository described by spec in directory.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with working_directory(directory):
+        create_repository(spec.journal, spec.engine)
+        with Repository() as repo:
+            for name, priority, _ in spec.statuses:
+                repo.create_status(name, Status.create(priority=priority))
+            repo.import_notes((line, note) for line, note in enumerate(generate_notes(spec), 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a note repository for benchmarks.")
+    parser.add_argument("directory", type=Path, help="Directory to create the repository in.")
+    parser.add_argument("--notes", type=int, default=1000, help="Number of notes.")
+    parser.add_argument("--tags", type=int, default=50, help="Number of distinct tags.")
+    parser.add_argument("--tags-per-note", type=int, default=3, help="Maximum number of tags of a note.")
+    parser.add_argument("--statuses", type=parse_statuses, default=RepositorySpec().statuses,
+                        help="Statuses as NAME:PRIORITY:PERCENT,... The rest of notes have no status.")
+    parser.add_argument("--content-length", type=int, default=12, help="Average number of words of a note.")
+    parser.add_argument("--engine", default=storage.DEFAULT_ENGINE, help="Storage engine of the repository.")
+    parser.add_argument("--journal", action="store_true", help="Enable journaling.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator.")
+    options = parser.parse_args()
+
+    spec = RepositorySpec(
+        options.notes, options.tags, options.tags_per_note, options.statuses,
+        options.content_length, options.engine, options.journal, options.seed
+    )
+    start = time.perf_counter()
+    create(options.directory, spec)
+    print(f"Generated {spec.notes} notes in {options.directory} in {time.perf_counter() - start:.2f} s.")
+
+if __name__ == "__main__":
+    main()
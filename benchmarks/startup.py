@@ -0,0 +1,67 @@
+"""
+Measures the startup time of the `note` command.
+
+Every command is run in a new Python process, as scripts calling `note` do,
+and the wall time of the process is reported. The time of a process which
+only imports Typer is reported as well, since no command can start faster;
+the difference is the time spent importing and running the application.
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--max-overhead MS]
+
+With --max-overhead the script exits with status 1 if the median overhead of
+any command over importing Typer is larger than MS milliseconds, so it can
+be used to catch changes which slow the startup down.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = ["-c", "import typer"]
+NOTE = ["-c", "from app.cli import app; app()"]
+COMMANDS = [
+    ["--version"],
+    ["add", "Benchmark note.", "-t", "benchmark"],
+    ["list", "-t", "benchmark"]
+]
+
+def run(args: list[str], cwd: Path):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def measure(args: list[str], cwd: Path, runs: int):
+    return statistics.median(run(args, cwd) for _ in range(runs))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup time of the note command.")
+    parser.add_argument("--runs", type=int, default=20, help="Number of runs of every command.")
+    parser.add_argument("--max-overhead", type=float, help="Maximum median overhead in milliseconds.")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = Path(directory)
+        run([*NOTE, "init"], cwd)
+        baseline = measure(BASELINE, cwd, options.runs)
+        print(f"{'import typer':<40} {baseline * 1000:8.1f} ms")
+
+        slowest = 0.0
+        for command in COMMANDS:
+            elapsed = measure([*NOTE, *command], cwd, options.runs)
+            overhead = elapsed - baseline
+            slowest = max(slowest, overhead)
+            print(f"{'note ' + ' '.join(command):<40} {elapsed * 1000:8.1f} ms  (+{overhead * 1000:.1f} ms)")
+
+    if options.max_overhead is not None and slowest * 1000 > options.max_overhead:
+        print(f"Startup overhead {slowest * 1000:.1f} ms exceeds {options.max_overhead:.1f} ms.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
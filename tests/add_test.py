@@ -1,5 +1,12 @@
 import os
 import json
+import multiprocessing
+
+import pytest
+
+from app.core import LOCK_FILENAME, PENDING_DIRNAME, GROUP_COMMIT_ENV
+from app.core.models import Note
+from app.core.repository import add_note
 
 def test_add(repo_initialized, runner, test_app):
     result = runner.invoke(test_app, ["add", "New note."])
@@ -67,3 +74,70 @@ def test_add_notes_sorted_after_addition_with_status(repo_with_notes, runner, te
     assert repository["notes"][0]["content"] == "Yet another note."
     assert repository["notes"][1]["content"] == "New note."
     assert repository["notes"][2]["content"] == "Another note."
+
+def test_add_failed_does_not_rewrite_repository(repo_with_notes, runner, test_app):
+    repository = json.loads(repo_with_notes.read_text())
+    repo_with_notes.write_text(json.dumps(repository, indent=4))
+    content = repo_with_notes.read_bytes()
+
+    runner.invoke(test_app, ["add", "Note content", "-s", "NONEXISTING"])
+
+    assert repo_with_notes.read_bytes() == content
+
+def test_add_leaves_no_temporary_files(repo_initialized, runner, test_app):
+    result = runner.invoke(test_app, ["add", "New note."])
+
+    assert result.exit_code == 0
+    assert sorted(path.name for path in repo_initialized.parent.iterdir()) == [repo_initialized.name, LOCK_FILENAME]
+
+def _add_notes(worker: int, count: int):
+    for idx in range(count):
+        add_note(Note.create(f"Note {worker}-{idx}.", [f"worker{worker}"]))
+
+def _add_in_parallel(workers: int, count: int):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add_notes, args=(worker, count)) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+@pytest.mark.parametrize("group_commit", ["0", "1"])
+def test_add_concurrent_writers(repo_initialized, monkeypatch, group_commit):
+    monkeypatch.setenv(GROUP_COMMIT_ENV, group_commit)
+
+    _add_in_parallel(workers=6, count=10)
+
+    repository = json.loads(repo_initialized.read_text())
+    contents = {note["content"] for note in repository["notes"]}
+    assert len(repository["notes"]) == 60
+    assert contents == {f"Note {worker}-{idx}." for worker in range(6) for idx in range(10)}
+    assert sorted(note["id"] for note in repository["notes"]) == list(range(1, 61))
+    assert repository["config"]["next_id"] == 61
+
+def test_add_group_commit_journal(tmp_path, runner, test_app, monkeypatch):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    monkeypatch.setenv(GROUP_COMMIT_ENV, "1")
+
+    _add_in_parallel(workers=4, count=5)
+    result = runner.invoke(test_app, ["list"])
+
+    assert result.exit_code == 0
+    assert all(f"Note {worker}-{idx}." in result.stdout for worker in range(4) for idx in range(5))
+    assert not list((tmp_path / PENDING_DIRNAME).iterdir())
+
+def test_add_group_commit_rejects_invalid_batch(repo_initialized, runner, test_app, monkeypatch):
+    monkeypatch.setenv(GROUP_COMMIT_ENV, "1")
+    pending = repo_initialized.parent / PENDING_DIRNAME
+    pending.mkdir()
+    stale = Note.create("Stale note.", [], "REMOVED").to_dict()
+    (pending / "0-stale.json").write_text(json.dumps([{"op": "add_note", "note": stale}]))
+
+    result = runner.invoke(test_app, ["add", "New note."])
+    repository = json.loads(repo_initialized.read_text())
+
+    assert result.exit_code == 0
+    assert [note["content"] for note in repository["notes"]] == ["New note."]
+    assert "There is no status REMOVED" in (pending / "0-stale.failed").read_text()
@@ -1,6 +1,90 @@
+import os
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+import app
 from app import __app_name__, __version__
 
 def test_version(runner, test_app):
     result = runner.invoke(test_app, ["--version"])
     assert result.exit_code == 0
-    assert f"{__app_name__} v{__version__}" in result.stdout
\ No newline at end of file
+    assert f"{__app_name__} v{__version__}" in result.stdout
+
+def test_help_lists_all_commands(runner, test_app):
+    result = runner.invoke(test_app, ["--help"])
+    assert result.exit_code == 0
+    for command in ["init", "add", "import", "export", "list", "delete", "status", "compact", "migrate", "search", "serve"]:
+        assert command in result.stdout
+
+def test_add_imports_only_what_it_needs(repo_initialized):
+    code = (
+        "import sys\n"
+        "from app.cli import app\n"
+        "try:\n"
+        "    app(['add', 'Lazy note.'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(*sys.modules)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(Path(app.__file__).resolve().parents[1]))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    modules = result.stdout.split()
+
+    assert "app.core.repository" in modules
+    assert [module for module in modules if module.startswith("app.commands.")] == ["app.commands.add"]
+    assert not [module for module in modules if module == "rich" or module.startswith("rich.")]
+    assert not set(modules) & {
+        "app.core.engines.segmented_engine",
+        "app.core.engines.sqlite_engine",
+        "app.core.exporter",
+        "app.core.output",
+        "app.core.scanner",
+        "app.core.search_index",
+        "app.core.server",
+        "csv",
+        "socket",
+        "sqlite3",
+    }
+    assert "Lazy note." in repo_initialized.read_text()
+
+def test_list_format_does_not_import_rich(repo_with_notes):
+    code = (
+        "import sys\n"
+        "from app.cli import app\n"
+        "try:\n"
+        "    app(['list', '--format', 'tsv'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(*sys.modules, file=sys.stderr)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(Path(app.__file__).resolve().parents[1]))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    modules = result.stderr.split()
+
+    assert result.stdout.splitlines()[0] == "1\tNew note.\t\tmytag"
+    assert not [module for module in modules if module == "rich" or module.startswith("rich.")]
+
+def test_profile_reports_phases(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["--profile", "list", "-t", "mytag"])
+
+    assert result.exit_code == 0
+    assert "New note." in result.output
+    assert "Profile of `note list`" in result.output
+    for phase in ["lock", "render", "read", "filter", "other"]:
+        assert f" {phase} " in result.output
+
+def test_profile_enabled_by_environment_with_cprofile_dump(repo_with_notes, runner, test_app, tmp_path):
+    dump = tmp_path / "add.prof"
+
+    result = runner.invoke(test_app, ["add", "Profiled note."], env={"NOTE_PROFILE_DUMP": str(dump)})
+
+    assert result.exit_code == 0
+    assert "Profile of `note add`" in result.output
+    assert " save " in result.output
+    assert f"cProfile statistics written to {dump}." in result.output
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+    result = runner.invoke(test_app, ["list"])
+    assert "Profile of" not in result.output
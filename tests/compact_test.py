@@ -0,0 +1,170 @@
+import os
+import json
+
+import pytest
+
+from app.core import JOURNAL_FILENAME
+
+def test_init_with_journal(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["init", "--journal"])
+
+    with open(".notes", "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert repository["config"]["journal"] is True
+
+def test_journal_appends_changes(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    result = runner.invoke(test_app, ["add", "Journaled note.", "-t", "log"])
+
+    with open(".notes", "r") as file:
+        repository = json.load(file)
+
+    with open(JOURNAL_FILENAME, "r") as file:
+        lines = file.read().splitlines()
+
+    assert result.exit_code == 0
+    assert repository["notes"] == []
+    assert len(lines) == 2
+    assert json.loads(lines[1])["note"]["content"] == "Journaled note."
+
+def test_journal_replayed_on_load(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    runner.invoke(test_app, ["status", "-a", "URGENT", "-p", "5"])
+    runner.invoke(test_app, ["add", "First note."])
+    runner.invoke(test_app, ["add", "Urgent note.", "-s", "URGENT"])
+    runner.invoke(test_app, ["delete", "1"])
+    result = runner.invoke(test_app, ["list"])
+
+    assert result.exit_code == 0
+    assert "Urgent note." in result.stdout
+    assert "First note." not in result.stdout
+
+def test_journal_incomplete_entry_ignored(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    runner.invoke(test_app, ["add", "First note."])
+
+    with open(JOURNAL_FILENAME, "a") as file:
+        file.write('{"op": "add_note", "note": {"content": "Lost')
+
+    runner.invoke(test_app, ["add", "Second note."])
+    result = runner.invoke(test_app, ["list"])
+
+    assert result.exit_code == 0
+    assert "First note." in result.stdout
+    assert "Second note." in result.stdout
+    assert "Lost" not in result.stdout
+
+def test_compact(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    runner.invoke(test_app, ["add", "First note."])
+    runner.invoke(test_app, ["add", "Second note."])
+    result = runner.invoke(test_app, ["compact"])
+
+    with open(".notes", "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert "merged 2 journal entries" in result.stdout
+    assert not os.path.exists(JOURNAL_FILENAME)
+    assert [note["content"] for note in repository["notes"]] == ["First note.", "Second note."]
+
+def test_compact_stale_journal_not_replayed(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    runner.invoke(test_app, ["add", "First note."])
+
+    with open(JOURNAL_FILENAME, "r") as file:
+        stale_journal = file.read()
+
+    runner.invoke(test_app, ["compact"])
+
+    with open(JOURNAL_FILENAME, "w") as file:
+        file.write(stale_journal)
+
+    runner.invoke(test_app, ["add", "Second note."])
+    runner.invoke(test_app, ["compact"])
+
+    with open(".notes", "r") as file:
+        repository = json.load(file)
+
+    assert [note["content"] for note in repository["notes"]] == ["First note.", "Second note."]
+
+def test_compact_disable_journal(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["compact", "--no-journal"])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert repository["config"]["journal"] is False
+
+def test_compact_repository_not_initialized(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["compact"])
+
+    assert result.exit_code == 0
+    assert "Notes repository does not exist. Run `note init` to initialize repository." in result.stdout
+
+@pytest.mark.parametrize("compression, magic", [
+    ("zlib", b"\x78"),
+    ("gzip", b"\x1f\x8b"),
+    ("lzma", b"\xfd7zXZ\x00")
+])
+def test_compact_compression(repo_with_notes, runner, test_app, compression, magic):
+    before = runner.invoke(test_app, ["list"]).stdout
+    result = runner.invoke(test_app, ["compact", "--compression", compression])
+
+    assert result.exit_code == 0
+    assert repo_with_notes.read_bytes().startswith(magic)
+
+    runner.invoke(test_app, ["add", "Compressed note.", "-t", "mytag"])
+    runner.invoke(test_app, ["delete", "3"])
+
+    assert repo_with_notes.read_bytes().startswith(magic)
+    assert runner.invoke(test_app, ["list"]).stdout == before
+
+    runner.invoke(test_app, ["compact", "--compression", "none"])
+    repository = json.loads(repo_with_notes.read_text())
+
+    assert repository["config"]["compression"] is None
+    assert len(repository["notes"]) == 2
+
+@pytest.mark.parametrize("engine", ["json", "binary"])
+def test_compact_compression_journal(tmp_path, runner, test_app, engine):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal", "--engine", engine])
+    runner.invoke(test_app, ["compact", "--compression", "gzip"])
+    for idx in range(3):
+        runner.invoke(test_app, ["add", f"Note {idx}.", "-t", "log"])
+    result = runner.invoke(test_app, ["list", "-t", "log"])
+
+    assert (tmp_path / ".notes").read_bytes().startswith(b"\x1f\x8b")
+    assert all(f"Note {idx}." in result.stdout for idx in range(3))
+
+def test_compact_compression_report(repo_with_notes, runner, test_app):
+    content = repo_with_notes.read_bytes()
+    result = runner.invoke(test_app, ["compact", "--report"])
+
+    assert result.exit_code == 0
+    assert all(name in result.stdout for name in ("none *", "zlib", "gzip", "lzma"))
+    assert repo_with_notes.read_bytes() == content
+
+def test_compact_unknown_compression(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["compact", "--compression", "zip"])
+
+    assert result.exit_code == 0
+    assert "Unknown compression 'zip'. Available compressions: none, zlib, gzip, lzma." in result.stdout
+
+def test_compact_compression_not_supported(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", "sqlite"])
+    result = runner.invoke(test_app, ["compact", "--compression", "gzip"])
+
+    assert "The sqlite storage engine does not support compression." in result.stdout
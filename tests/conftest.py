@@ -6,9 +6,16 @@ import pytest
 from typer.testing import CliRunner
 
 from app.cli import app
-from app.core import REPOSITORY_FILENAME, REPOSITORY_TEMPLATE
+from app.core import REPOSITORY_FILENAME, REPOSITORY_TEMPLATE, CACHE_DIR_ENV
 from app.core.models import Note
 
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path_factory, monkeypatch):
+    """Keeps caches written by commands out of the user's cache directory."""
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(path))
+    return path
+
 @pytest.fixture
 def runner() -> CliRunner:
     """Provides a Typer CliRunner."""
@@ -51,7 +58,8 @@ def repo_with_notes(repo_path):
     ]
 
     repo = copy.deepcopy(REPOSITORY_TEMPLATE)
-    repo["notes"] = [note.to_dict() for note in notes]
+    repo["notes"] = [dict(note.to_dict(), id=note_id) for note_id, note in enumerate(notes, 1)]
+    repo["config"]["next_id"] = len(notes) + 1
     repo["config"]["statuses"]["COMPLETED"] = {
         "style": "green bold",
         "priority": -2
@@ -80,7 +88,8 @@ def repo_with_untagged_notes(repo_path):
     ]
 
     repo = copy.deepcopy(REPOSITORY_TEMPLATE)
-    repo["notes"] = [note.to_dict() for note in notes]
+    repo["notes"] = [dict(note.to_dict(), id=note_id) for note_id, note in enumerate(notes, 1)]
+    repo["config"]["next_id"] = len(notes) + 1
 
     with open(repo_path, "w") as file:
         json.dump(repo, file)
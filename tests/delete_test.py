@@ -1,4 +1,10 @@
 import json
+import os
+
+import pytest
+
+from app.core import storage, tag_index, search_index
+from app.core.repository import Repository
 
 def test_delete(repo_with_notes, runner, test_app):
     result = runner.invoke(test_app, ["delete", "1"])
@@ -14,4 +20,141 @@ def test_delete_non_existing_note(repo_with_notes, runner, test_app):
     result = runner.invoke(test_app, ["delete", "4"])
 
     assert result.exit_code == 0
-    assert "There is no note with id 4 in the repository. Run `note list` to see all notes." in result.stdout
\ No newline at end of file
+    assert "There is no note with id 4 in the repository. Run `note list` to see all notes." in result.stdout
+
+def test_delete_by_stable_id(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["add", "Important note.", "-s", "PRIORITY"])
+    result = runner.invoke(test_app, ["delete", "1"])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert [note["content"] for note in repository["notes"]] == ["Important note.", "Another note."]
+    assert [note["id"] for note in repository["notes"]] == [3, 2]
+
+def test_delete_ids_not_reused(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["delete", "2"])
+    runner.invoke(test_app, ["add", "Newest note."])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert [note["id"] for note in repository["notes"]] == [1, 3]
+    assert "There is no note with id 2" in runner.invoke(test_app, ["delete", "2"]).stdout
+
+def test_delete_numbers_notes_of_old_repository(repo_with_notes, runner, test_app):
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+    for note in repository["notes"]:
+        del note["id"]
+    del repository["config"]["next_id"]
+    with open(repo_with_notes, "w") as file:
+        json.dump(repository, file)
+
+    assert "│ 2 " in runner.invoke(test_app, ["list"]).stdout
+
+    result = runner.invoke(test_app, ["delete", "2"])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert repository["notes"] == [{"content": "New note.", "tags": ["mytag"], "status": None, "id": 1}]
+    assert repository["config"]["next_id"] == 3
+
+def add_notes(runner, test_app, count):
+    for idx in range(count):
+        runner.invoke(test_app, ["add", f"Bulk note {idx}.", "-t", "obsolete" if idx % 2 else "kept", "-s", "COMPLETED" if idx % 3 else "PRIORITY"])
+
+def test_delete_ids_and_ranges(repo_with_notes, runner, test_app):
+    add_notes(runner, test_app, 8)
+    result = runner.invoke(test_app, ["delete", "1", "4-6", "9", "20-30"])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert result.exit_code == 0
+    assert sorted(note["id"] for note in repository["notes"]) == [2, 3, 7, 8, 10]
+
+def test_delete_by_filters(repo_with_notes, runner, test_app):
+    add_notes(runner, test_app, 8)
+    result = runner.invoke(test_app, ["delete", "--tag", "obsolete", "--status", "COMPLETED"])
+
+    with open(repo_with_notes, "r") as file:
+        notes = json.load(file)["notes"]
+
+    assert result.exit_code == 0
+    assert not [note for note in notes if "obsolete" in note["tags"] and note["status"] == "COMPLETED"]
+    assert len(notes) == 7
+    assert "Bulk note 3." in [note["content"] for note in notes]
+
+def test_delete_by_where_filter(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["delete", "-w", "tag:mytag AND NOT status:COMPLETED"])
+
+    with open(repo_with_notes, "r") as file:
+        notes = json.load(file)["notes"]
+
+    assert result.exit_code == 0
+    assert [note["content"] for note in notes] == ["Another note."]
+
+@pytest.mark.parametrize("args, message", [
+    (["1", "7"], "There is no note with id 7 in the repository."),
+    (["5-9"], "There are no notes with the given ids in the repository."),
+    (["1", "x-2"], "'x-2' is not a note ID nor a range of IDs like 10-250."),
+    (["-t", "missing"], "There are no notes matching filter: 'missing' in repository."),
+    (["-s", "MISSING"], "There is no status MISSING in the repository configuration."),
+    (["1", "-t", "mytag"], "You must not give note IDs together with filters -t, -s and -w."),
+    ([], "Give IDs of notes to delete or filters -t, -s and -w."),
+])
+def test_delete_many_invalid(repo_with_notes, runner, test_app, args, message):
+    before = repo_with_notes.read_text()
+
+    result = runner.invoke(test_app, ["delete", *args])
+
+    assert result.exit_code == 0
+    assert message in result.stdout
+    assert repo_with_notes.read_text() == before
+
+@pytest.mark.parametrize("engine", ["json", "journal", "sqlite", "segmented"])
+def test_delete_many_updates_indexes(tmp_path, runner, test_app, engine):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"] if engine == "journal" else ["init", "--engine", engine])
+    runner.invoke(test_app, ["status", "-a", "COMPLETED", "-p", "-2"])
+    runner.invoke(test_app, ["status", "-a", "PRIORITY", "-p", "10"])
+    add_notes(runner, test_app, 12)
+    runner.invoke(test_app, ["search", "bulk"])
+
+    result = runner.invoke(test_app, ["delete", "2", "5-8", "12"])
+    assert result.exit_code == 0
+    result = runner.invoke(test_app, ["delete", "-t", "obsolete"])
+    assert result.exit_code == 0
+
+    engine_instance = storage.open_repository()
+    try:
+        notes = engine_instance.load()["notes"]
+        assert sorted(note["id"] for note in notes) == [1, 3, 9, 11]
+
+        index = tag_index.open_index(engine_instance)
+        expected = tag_index.TagIndex.build(notes, engine_instance.load()["config"]["statuses"])
+        assert index is not None
+        assert {tag: positions for tag, positions in index.tags.items() if positions} == expected.tags
+        assert {name: positions for name, positions in index.statuses.items() if positions} == \
+            {name: positions for name, positions in expected.statuses.items() if positions}
+        assert list(index.ids) == list(expected.ids)
+
+        results = search_index.open_index(engine_instance).search(search_index.Query("bulk"))
+        assert sorted(notes[position]["id"] for position, _ in results) == [1, 3, 9, 11]
+    finally:
+        engine_instance.close()
+
+def test_delete_many_from_loaded_notes(repo_with_notes, runner, test_app):
+    add_notes(runner, test_app, 6)
+    with Repository() as repo:
+        repo.repository
+        assert repo.delete_notes([1], [(4, 6)]) == 4
+        assert [view.note.id for view in repo._indexed_notes] == [3, 2, 7, 8]
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+    assert [note["id"] for note in repository["notes"]] == [3, 2, 7, 8]
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import app
+
+def test_export_jsonl_to_stdout(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["export"])
+
+    assert result.exit_code == 0
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {"id": 1, "content": "New note.", "tags": ["mytag"], "status": None},
+        {"id": 2, "content": "Another note.", "tags": ["mytag", "awesome"], "status": "COMPLETED"}
+    ]
+
+def test_export_csv_with_filters(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["add", "Buy milk, bread.", "-t", "shop,awesome", "-s", "COMPLETED"])
+
+    result = runner.invoke(test_app, ["export", "-f", "csv", "-t", "awesome", "-s", "COMPLETED"])
+
+    assert result.exit_code == 0
+    assert list(csv.reader(io.StringIO(result.stdout))) == [
+        ["id", "content", "tags", "status"],
+        ["2", "Another note.", "mytag,awesome", "COMPLETED"],
+        ["3", "Buy milk, bread.", "shop,awesome", "COMPLETED"]
+    ]
+
+def test_export_markdown_to_file(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["add", "Pipe | and\nnew line.", "-t", "md"])
+    output = repo_with_notes.parent / "notes.md"
+
+    result = runner.invoke(test_app, ["export", "-o", str(output), "-w", "NOT status:COMPLETED"])
+
+    assert result.exit_code == 0
+    assert f"Exported 2 notes to {output}." in result.stdout
+    assert output.read_text().splitlines() == [
+        "| ID | Content | Status | Tags |",
+        "| --- | --- | --- | --- |",
+        "| 1 | New note. |  | #mytag |",
+        "| 3 | Pipe \\| and<br>new line. |  | #md |"
+    ]
+
+def test_export_round_trips_through_import(repo_with_notes, runner, test_app):
+    output = repo_with_notes.parent / "notes.jsonl"
+    runner.invoke(test_app, ["export", "-o", str(output)])
+    before = json.loads(repo_with_notes.read_text())["notes"]
+
+    result = runner.invoke(test_app, ["import", str(output)])
+    notes = json.loads(repo_with_notes.read_text())["notes"]
+
+    assert "Imported 2 notes" in result.stdout
+    assert [(note["content"], note["tags"], note["status"]) for note in notes] == [
+        (note["content"], note["tags"], note["status"]) for note in (before[0], before[0], before[1], before[1])
+    ]
+
+@pytest.mark.parametrize("args, message", [
+    (["-f", "xml"], "Unknown export format 'xml'."),
+    (["-s", "MISSING"], "There is no status MISSING in the repository configuration."),
+    (["-w", "tag:"], "Invalid filter term 'tag:'."),
+])
+def test_export_invalid(repo_with_notes, runner, test_app, args, message):
+    output = repo_with_notes.parent / "notes.jsonl"
+
+    result = runner.invoke(test_app, ["export", "-o", str(output), *args])
+
+    assert result.exit_code == 0
+    assert message in result.stdout
+    assert not output.exists()
+
+def test_export_to_closed_pipe(repo_with_notes):
+    env = dict(os.environ, PYTHONPATH=str(Path(app.__file__).resolve().parents[1]))
+    process = subprocess.Popen(
+        [sys.executable, "-c", "from app.cli import app; app()", "export"],
+        cwd=repo_with_notes.parent, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    process.stdout.close()
+    _, errors = process.communicate(timeout=30)
+
+    assert b"Traceback" not in errors
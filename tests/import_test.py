@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from app.core import storage, tag_index, search_index
+
+def read_repository(repo_path):
+    with open(repo_path, "r") as file:
+        return json.load(file)
+
+def test_import_jsonl(repo_with_notes, runner, test_app):
+    records = [
+        {"content": "First imported.", "tags": ["work", "urgent"], "status": "PRIORITY"},
+        {"content": "Second imported.", "tags": "home"},
+        {"content": "Third imported.", "status": "COMPLETED"}
+    ]
+    source = repo_with_notes.parent / "notes.jsonl"
+    source.write_text("\n".join(json.dumps(record) for record in records) + "\n\n")
+
+    result = runner.invoke(test_app, ["import", str(source)])
+    repository = read_repository(repo_with_notes)
+
+    assert result.exit_code == 0
+    assert "Imported 3 notes" in result.stdout
+    assert [note["content"] for note in repository["notes"]] == [
+        "First imported.", "New note.", "Second imported.", "Another note.", "Third imported."
+    ]
+    assert [note["id"] for note in repository["notes"]] == [3, 1, 4, 2, 5]
+    assert repository["notes"][0]["tags"] == ["work", "urgent"]
+    assert repository["notes"][2]["tags"] == ["home"]
+    assert repository["config"]["next_id"] == 6
+
+def test_import_csv(repo_with_notes, runner, test_app):
+    source = repo_with_notes.parent / "notes.csv"
+    source.write_text('content,tags,status\n"Buy milk, bread",shop,\nCall Bob,"phone,home",PRIORITY\n')
+
+    result = runner.invoke(test_app, ["import", str(source)])
+    notes = read_repository(repo_with_notes)["notes"]
+
+    assert result.exit_code == 0
+    assert "Imported 2 notes" in result.stdout
+    assert notes[0] == {"content": "Call Bob", "tags": ["phone", "home"], "status": "PRIORITY", "id": 4}
+    assert notes[2] == {"content": "Buy milk, bread", "tags": ["shop"], "status": None, "id": 3}
+
+def test_import_text_from_stdin_with_defaults(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["import", "-t", "inbox", "-s", "COMPLETED"], input="One.\n\nTwo.\n")
+    notes = read_repository(repo_with_notes)["notes"]
+
+    assert result.exit_code == 0
+    assert "Imported 2 notes" in result.stdout
+    assert [(note["content"], note["tags"], note["status"]) for note in notes[-2:]] == [
+        ("One.", ["inbox"], "COMPLETED"),
+        ("Two.", ["inbox"], "COMPLETED")
+    ]
+
+@pytest.mark.parametrize("args, text, message", [
+    (["-f", "jsonl"], '{"content": "Valid."}\n{"content": "Bad tags.", "tags": ["no spaces"]}\n', "error in line 2. Tags should contain only letters and numbers."),
+    (["-f", "jsonl"], '{"content": "Valid."}\nnot json\n', "error in line 2. It is not valid JSON."),
+    (["-f", "jsonl"], '["Not an object."]\n', "error in line 1. It should be a JSON object"),
+    (["-f", "csv"], "text\nNo content column.\n", "CSV input should start with a header row with a 'content' column."),
+    (["-f", "xml"], "<note/>\n", "Unknown import format 'xml'."),
+    (["-s", "MISSING"], "Valid.\n", "error in line 1. There is no status MISSING"),
+])
+def test_import_invalid(repo_with_notes, runner, test_app, args, text, message):
+    before = repo_with_notes.read_text()
+
+    result = runner.invoke(test_app, ["import", *args], input=text)
+
+    assert result.exit_code == 0
+    assert message in result.stdout
+    assert repo_with_notes.read_text() == before
+
+def test_import_missing_file(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["import", "missing.jsonl"])
+
+    assert result.exit_code == 0
+    assert "Cannot read notes to import." in result.stdout
+
+def test_import_updates_indexes(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["search", "note"])
+    records = [{"content": f"Imported note {idx}.", "tags": ["bulk"], "status": ["PRIORITY", "COMPLETED", None][idx % 3]} for idx in range(30)]
+
+    result = runner.invoke(test_app, ["import", "-f", "jsonl"], input="".join(json.dumps(record) + "\n" for record in records))
+    assert "Imported 30 notes" in result.stdout
+
+    engine = storage.open_repository()
+    try:
+        repository = engine.load()
+        index = tag_index.open_index(engine)
+        expected = tag_index.TagIndex.build(repository["notes"], repository["config"]["statuses"])
+        assert index is not None
+        assert (index.tags, index.statuses, list(index.ids)) == (expected.tags, expected.statuses, list(expected.ids))
+
+        results = search_index.open_index(engine).search(search_index.Query("imported 29"))
+        assert [repository["notes"][position]["content"] for position, _ in results] == ["Imported note 29."]
+    finally:
+        engine.close()
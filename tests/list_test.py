@@ -1,4 +1,14 @@
+import json
 import os
+import tracemalloc
+
+import pytest
+
+from app.core import storage, TAG_INDEX_FILENAME
+from app.core.models import Note
+from app.core.note_table import NoteTable
+from app.core.repository import Repository
+from app.core.tag_index import TagIndex, open_index
 
 def test_list(repo_with_notes, runner, test_app):
     result = runner.invoke(test_app, ["list"])
@@ -66,4 +76,472 @@ def test_list_statuses_only(repo_with_notes, runner, test_app):
 
     assert result.exit_code == 0
     assert "COMPLETED  priority:  -2" in result.stdout
-    assert "PRIORITY  priority:  10" in result.stdout
\ No newline at end of file
+    assert "PRIORITY  priority:  10" in result.stdout
+
+def test_list_does_not_rewrite_repository(repo_with_notes, runner, test_app):
+    repository = json.loads(repo_with_notes.read_text())
+    repo_with_notes.write_text(json.dumps(repository, indent=4))
+    content = repo_with_notes.read_bytes()
+
+    runner.invoke(test_app, ["list"])
+    runner.invoke(test_app, ["list", "-T"])
+    runner.invoke(test_app, ["list", "-S"])
+
+    assert repo_with_notes.read_bytes() == content
+
+def test_list_reads_notes_incrementally(repo_with_notes):
+    content = repo_with_notes.read_text()
+    repo_with_notes.write_text(content[:content.index("Another note.")])
+
+    engine = storage.open_repository()
+    notes = engine.iter_notes()
+
+    assert next(notes) == (0, {"content": "New note.", "tags": ["mytag"], "status": None, "id": 1})
+
+def test_list_notes_stored_after_config(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["add", "Yet another note."])
+
+    with open(repo_with_notes, "r") as file:
+        repository = json.load(file)
+
+    assert list(repository.keys())[-1] == "notes"
+
+INDEXED_COMMANDS = [
+    ["status", "-a", "URGENT", "-p", "5"],
+    ["status", "-a", "DONE", "-p", "-1"],
+    ["add", "First note.", "-t", "alpha"],
+    ["add", "Done note.", "-s", "DONE", "-t", "beta"],
+    ["add", "Urgent note.", "-s", "URGENT", "-t", "alpha,beta"],
+    ["add", "Second note.", "-t", "gamma"],
+    ["delete", "1"],
+    ["add", "Another urgent note.", "-s", "URGENT", "-t", "gamma"],
+    ["status", "-e", "URGENT", "-p", "-2"],
+    ["add", "Third note.", "-t", "beta"],
+    ["status", "-e", "DONE", "-p", "3"],
+    ["status", "-d", "DONE"],
+    ["delete", "3"],
+]
+
+@pytest.mark.parametrize("engine", ["json", "sqlite", "segmented"])
+def test_list_tag_index_updated_incrementally(tmp_path, runner, test_app, engine):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", engine])
+    runner.invoke(test_app, ["list", "-T"])
+
+    for command in INDEXED_COMMANDS:
+        runner.invoke(test_app, command, input="y\n")
+        repository = storage.load_repository()
+        expected = TagIndex.build(repository["notes"], repository["config"]["statuses"])
+        storage_engine = storage.open_repository()
+        index = open_index(storage_engine)
+        storage_engine.close()
+
+        assert index is not None
+        assert {tag: positions for tag, positions in index.tags.items() if positions} == expected.tags
+        assert {name: positions for name, positions in index.statuses.items() if positions} == \
+            {name: positions for name, positions in expected.statuses.items() if positions}
+
+    result = runner.invoke(test_app, ["list", "-t", "beta"])
+    notes = storage.load_repository()["notes"]
+
+    assert result.exit_code == 0
+    assert "Third note." in result.stdout
+    assert all((note["content"] in result.stdout) == ("beta" in note["tags"]) for note in notes)
+
+def test_list_tag_index_rebuilt_when_out_of_date(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["list", "-t", "awesome"])
+    repository = json.loads(repo_with_notes.read_text())
+    repository["notes"][0]["tags"] = ["awesome"]
+    repo_with_notes.write_text(json.dumps(repository))
+
+    result = runner.invoke(test_app, ["list", "-t", "awesome"])
+
+    assert "New note." in result.stdout
+    assert "Another note." in result.stdout
+
+def test_list_tags_from_index(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["list", "-T"])
+    runner.invoke(test_app, ["add", "Indexed note.", "-t", "fresh"])
+    runner.invoke(test_app, ["delete", "2"])
+    runner.invoke(test_app, ["delete", "1"])
+    result = runner.invoke(test_app, ["list", "-T"])
+
+    assert (repo_with_notes.parent / TAG_INDEX_FILENAME).exists()
+    assert "#fresh" in result.stdout
+    assert "#awesome" not in result.stdout
+    assert "#mytag" not in result.stdout
+
+def test_list_status_filter(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-s", "COMPLETED"])
+
+    assert result.exit_code == 0
+    assert "Another note." in result.stdout
+    assert "New note." not in result.stdout
+
+def test_list_status_filter_with_tag_filter(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["add", "Completed note.", "-t", "other", "-s", "COMPLETED"])
+    result = runner.invoke(test_app, ["list", "-s", "COMPLETED", "-t", "other"])
+
+    assert result.exit_code == 0
+    assert "Completed note." in result.stdout
+    assert "Another note." not in result.stdout
+
+def test_list_status_filter_no_matching_notes(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-s", "PRIORITY"])
+
+    assert result.exit_code == 0
+    assert "There are no notes matching filter: 'PRIORITY' in repository." in result.stdout
+
+def test_list_status_filter_nonexisting_status(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-s", "NONEXISTING"])
+
+    assert result.exit_code == 0
+    assert "There is no status NONEXISTING in the repository configuration." in result.stdout
+
+@pytest.mark.parametrize("engine", ["json", "sqlite", "segmented"])
+def test_list_status_filter_keeps_order(tmp_path, runner, test_app, engine):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", engine])
+    for command in INDEXED_COMMANDS:
+        runner.invoke(test_app, command, input="y\n")
+    runner.invoke(test_app, ["status", "-a", "DONE", "-p", "-2"])
+    runner.invoke(test_app, ["add", "Done note.", "-s", "DONE"])
+    runner.invoke(test_app, ["add", "Last urgent note.", "-s", "URGENT"])
+
+    notes = storage.load_repository()["notes"]
+    result = runner.invoke(test_app, ["list", "-s", "URGENT"])
+    urgent = [note["content"] for note in notes if note["status"] == "URGENT"]
+
+    assert len(urgent) == 2
+    assert all(content in result.stdout for content in urgent)
+    assert result.stdout.index(urgent[0]) < result.stdout.index(urgent[1])
+    assert "Done note." not in result.stdout
+
+def test_list_note_views_cached_until_changed(repo_with_notes):
+    with Repository() as repo:
+        views = repo._indexed_notes
+
+        assert repo._indexed_notes is views
+        assert views[1].status.priority == -2
+
+        repo.add_note(Note.create("Fresh note."))
+
+        assert repo._indexed_notes is not views
+        assert [view.note.content for view in repo._indexed_notes] == ["New note.", "Fresh note.", "Another note."]
+        assert [view.note.id for view in repo._indexed_notes] == [1, 3, 2]
+
+def test_list_note_table_round_trip():
+    notes = [
+        {"content": "Tagged note.", "tags": ["a", "b"], "status": "DONE", "id": 3},
+        {"content": "Empty tags.", "tags": [], "status": None, "id": 1},
+        {"content": "Old note.", "tags": None, "status": None},
+        {"content": "Same tags.", "tags": ["a", "b"], "status": "DONE", "id": 2},
+    ]
+    table = NoteTable(notes)
+    table[1:3] = [table[2], dict(table[1], status="DONE")]
+    del table[0]
+    table.insert(1, notes[0])
+
+    assert table.to_notes() == [notes[2], notes[0], dict(notes[1], status="DONE"), notes[3]]
+    assert len(table.tags) == 2
+    assert table.has_status("DONE")
+    assert sorted(table.all_tags()) == ["a", "a", "b", "b"]
+
+def test_list_note_table_smaller_than_notes():
+    notes = [{"content": f"Note {idx}.", "tags": ["work", "todo"], "status": "DONE" if idx % 2 else None, "id": idx + 1} for idx in range(10000)]
+    tracemalloc.start()
+    try:
+        copied = json.loads(json.dumps(notes))
+        notes_size = tracemalloc.get_traced_memory()[0]
+        del copied
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        table = NoteTable(notes)
+        table_size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+    assert len(table) == len(notes)
+    assert table_size * 3 < notes_size
+
+@pytest.fixture
+def repo_with_bug_notes(repo_initialized, runner, test_app):
+    runner.invoke(test_app, ["status", "-a", "OPEN", "-p", "1"])
+    runner.invoke(test_app, ["add", "Open bug.", "-t", "bug", "-s", "OPEN"])
+    runner.invoke(test_app, ["add", "Urgent bug.", "-t", "bug,urgent"])
+    runner.invoke(test_app, ["add", "Ignored bug.", "-t", "bug,urgent,wontfix", "-s", "OPEN"])
+    runner.invoke(test_app, ["add", "Old bug.", "-t", "bug"])
+    runner.invoke(test_app, ["add", "Open task.", "-s", "OPEN"])
+    return repo_initialized
+
+NOTE_CONTENTS = ["Open bug.", "Urgent bug.", "Ignored bug.", "Old bug.", "Open task."]
+
+@pytest.mark.parametrize("where, expected", [
+    ("tag:bug AND (status:OPEN OR tag:urgent) AND NOT tag:wontfix", ["Open bug.", "Urgent bug."]),
+    ("tag:urgent or status:OPEN", ["Open bug.", "Ignored bug.", "Open task.", "Urgent bug."]),
+    ("NOT tag:bug", ["Open task."]),
+    ("NOT (tag:bug AND NOT status:OPEN)", ["Open bug.", "Ignored bug.", "Open task."]),
+])
+def test_list_where(repo_with_bug_notes, runner, test_app, where, expected):
+    result = runner.invoke(test_app, ["list", "--where", where])
+    listed = [content for line in result.stdout.splitlines() for content in NOTE_CONTENTS if content in line]
+
+    assert result.exit_code == 0
+    assert listed == expected
+
+def test_list_where_with_tag_filter(repo_with_bug_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-w", "NOT status:OPEN", "-t", "urgent"])
+
+    assert "Urgent bug." in result.stdout
+    assert "Old bug." not in result.stdout
+    assert "Ignored bug." not in result.stdout
+
+def test_list_where_no_matching_notes(repo_with_bug_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-w", "tag:bug AND tag:missing"])
+
+    assert "There are no notes matching filter: 'tag:bug AND tag:missing' in repository." in result.stdout
+
+@pytest.mark.parametrize("where, message", [
+    ("tag:bug AND", "Invalid filter, it ends unexpectedly."),
+    ("(tag:bug OR tag:urgent", "Invalid filter, missing ')'."),
+    ("tag:bug tag:urgent", "Invalid filter, unexpected 'tag:urgent'."),
+    ("bug", "Invalid filter term 'bug'. Use tag:NAME or status:NAME."),
+    ("status:MISSING", "There is no status MISSING in the repository configuration."),
+])
+def test_list_where_invalid(repo_with_bug_notes, runner, test_app, where, message):
+    result = runner.invoke(test_app, ["list", "-w", where])
+
+    assert result.exit_code == 0
+    assert message in result.stdout
+
+def listed_ids(output: str):
+    return [int(line.split("│")[1]) for line in output.splitlines() if line.startswith("│") and line.split("│")[1].strip()]
+
+@pytest.mark.parametrize("engine", ["json", "sqlite", "segmented"])
+@pytest.mark.parametrize("args, expected", [
+    (["--limit", "3"], [1, 2, 3]),
+    (["--limit", "3", "--offset", "8"], [9, 10]),
+    (["--offset", "7"], [8, 9, 10]),
+    (["--page", "2", "-n", "4"], [5, 6, 7, 8]),
+    (["--page", "2", "-n", "2", "-t", "even"], [6, 8]),
+])
+def test_list_pages(tmp_path, runner, test_app, engine, args, expected):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", engine])
+    for idx in range(1, 11):
+        runner.invoke(test_app, ["add", f"Paged note {idx}.", "-t", "even" if idx % 2 == 0 else "odd"])
+
+    result = runner.invoke(test_app, ["list", *args], env={"COLUMNS": "120"})
+
+    assert result.exit_code == 0
+    assert listed_ids(result.stdout) == expected
+
+@pytest.mark.parametrize("args, message", [
+    (["--offset", "2"], "There are no notes to list after the first 2 notes."),
+    (["--page", "2", "--offset", "1"], "You must not use --page together with --offset."),
+    (["-T", "--limit", "1"], "You must not use -T nor -S options with --limit, --offset, --page and --pager."),
+])
+def test_list_pages_invalid(repo_with_notes, runner, test_app, args, message):
+    result = runner.invoke(test_app, ["list", *args])
+
+    assert result.exit_code == 0
+    assert message in result.stdout
+
+def test_list_printed_in_chunks(repo_initialized, runner, test_app, monkeypatch):
+    monkeypatch.setattr("app.core.utils.ROWS_PER_CHUNK", 3)
+    for idx in range(1, 8):
+        runner.invoke(test_app, ["add", f"Chunked note {idx}."])
+
+    result = runner.invoke(test_app, ["list"], env={"COLUMNS": "120"})
+    lines = result.stdout.splitlines()
+
+    assert listed_ids(result.stdout) == list(range(1, 8))
+    assert sum("Your Notes" in line for line in lines) == 1
+    assert [line[0] for line in lines[1:]] == ["┏", "┃", "┡", *["│"] * 7, "└"]
+
+def test_list_pager(repo_with_notes, tmp_path, monkeypatch):
+    import rich
+
+    paged = tmp_path / "paged.txt"
+    monkeypatch.setenv("PAGER", f"sh -c 'cat > {paged}'")
+    rich.reconfigure(force_terminal=True, width=120)
+    try:
+        with Repository(read_only=True) as repo:
+            repo.list_notes(pager=True)
+    finally:
+        rich.reconfigure()
+
+    assert "New note." in paged.read_text()
+    assert "Another note." in paged.read_text()
+
+@pytest.mark.parametrize("output_format, expected", [
+    ("plain", "1 New note. #mytag\n3 Tab\\tand\\nline.\n2 Another note. [COMPLETED] #mytag #awesome\n"),
+    ("tsv", "1\tNew note.\t\tmytag\n3\tTab\\tand\\nline.\t\t\n2\tAnother note.\tCOMPLETED\tmytag,awesome\n"),
+    ("ndjson",
+        '{"id": 1, "content": "New note.", "tags": ["mytag"], "status": null}\n'
+        '{"id": 3, "content": "Tab\\tand\\nline.", "tags": [], "status": null}\n'
+        '{"id": 2, "content": "Another note.", "tags": ["mytag", "awesome"], "status": "COMPLETED"}\n'),
+])
+def test_list_format(repo_with_notes, runner, test_app, output_format, expected):
+    runner.invoke(test_app, ["add", "Tab\tand\nline."])
+
+    result = runner.invoke(test_app, ["list", "--format", output_format])
+
+    assert result.exit_code == 0
+    assert result.stdout == expected
+
+def test_list_format_json(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-f", "json", "-t", "awesome"])
+    assert json.loads(result.stdout) == [{"id": 2, "content": "Another note.", "tags": ["mytag", "awesome"], "status": "COMPLETED"}]
+
+    result = runner.invoke(test_app, ["list", "-f", "json", "-s", "PRIORITY"])
+    assert json.loads(result.stdout) == []
+
+    result = runner.invoke(test_app, ["list", "-f", "json", "-T"])
+    assert json.loads(result.stdout) == ["mytag", "awesome"]
+
+    result = runner.invoke(test_app, ["list", "-f", "json", "-S"])
+    assert json.loads(result.stdout) == [
+        {"name": "COMPLETED", "style": "green bold", "priority": -2},
+        {"name": "PRIORITY", "style": "red", "priority": 10}
+    ]
+
+def test_list_format_tags_and_statuses(repo_with_notes, runner, test_app):
+    assert runner.invoke(test_app, ["list", "-f", "plain", "-T"]).stdout == "mytag\nawesome\n"
+    assert runner.invoke(test_app, ["list", "-f", "tsv", "-S"]).stdout == "COMPLETED\t-2\tgreen bold\nPRIORITY\t10\tred\n"
+
+def test_list_format_invalid(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["list", "-f", "xml"])
+    assert "Unknown output format 'xml'. Available formats: plain, tsv, json, ndjson." in result.stdout
+
+    result = runner.invoke(test_app, ["list", "-f", "json", "--pager"])
+    assert "You must not use --pager together with --format." in result.stdout
+
+@pytest.fixture
+def repo_tree(tmp_path, runner, test_app):
+    """
+    Initializes repositories of different engines in subdirectories of the
+    temporary directory, and one in a hidden directory which is not scanned.
+    """
+    for path, engine, notes in [
+        ("work", "json", [["Write report.", "-t", "todo"], ["Call client.", "-s", "DONE"]]),
+        ("home/notes", "sqlite", [["Buy milk.", "-t", "todo"]]),
+        (".archive", "json", [["Archived note."]]),
+    ]:
+        (tmp_path / path).mkdir(parents=True)
+        os.chdir(tmp_path / path)
+        runner.invoke(test_app, ["init", "--engine", engine])
+        runner.invoke(test_app, ["status", "-a", "DONE", "-p", "-1"])
+        for note in notes:
+            runner.invoke(test_app, ["add", *note])
+    (tmp_path / "empty").mkdir()
+    os.chdir(tmp_path)
+    return tmp_path
+
+def listed_repositories(output: str):
+    return [
+        (columns[1].strip(), columns[3].strip()) for columns in
+        (line.split("│") for line in output.splitlines() if line.startswith("│"))
+    ]
+
+def test_list_recursive(repo_tree, runner, test_app):
+    result = runner.invoke(test_app, ["list", "--recursive", "."], env={"COLUMNS": "120"})
+
+    assert result.exit_code == 0
+    assert "Repository" in result.stdout
+    assert listed_repositories(result.stdout) == [
+        ("home/notes", "Buy milk."),
+        ("work", "Write report."),
+        ("work", "Call client.")
+    ]
+
+@pytest.mark.parametrize("args, expected", [
+    (["-t", "todo"], [("home/notes", "Buy milk."), ("work", "Write report.")]),
+    (["-s", "DONE"], [("work", "Call client.")]),
+    (["-w", "tag:todo AND NOT status:DONE"], [("home/notes", "Buy milk."), ("work", "Write report.")]),
+    (["-n", "1", "--offset", "1"], [("work", "Write report.")]),
+])
+def test_list_recursive_filters(repo_tree, runner, test_app, args, expected):
+    result = runner.invoke(test_app, ["list", "-r", str(repo_tree), *args], env={"COLUMNS": "120"})
+
+    assert result.exit_code == 0
+    assert listed_repositories(result.stdout) == expected
+
+def test_list_recursive_from_subdirectory(repo_tree, runner, test_app):
+    os.chdir(repo_tree / "work")
+    result = runner.invoke(test_app, ["list", "-r", "."], env={"COLUMNS": "120"})
+
+    assert listed_repositories(result.stdout) == [(".", "Write report."), (".", "Call client.")]
+
+def test_list_recursive_skips_repositories_which_cannot_match(repo_tree, runner, test_app, cache_directory, monkeypatch):
+    from app.core import scanner
+
+    scanned = []
+    scan_repository = scanner._scan_repository
+    monkeypatch.setattr(scanner, "_scan_repository", lambda path, **kwargs: scanned.append(path) or scan_repository(path, **kwargs))
+    (repo_tree / "ideas").mkdir()
+    os.chdir(repo_tree / "ideas")
+    runner.invoke(test_app, ["init"])
+    runner.invoke(test_app, ["add", "Untagged idea."])
+    os.chdir(repo_tree)
+
+    runner.invoke(test_app, ["list", "-r", ".", "-t", "todo"])
+    assert scanned == ["home/notes", "ideas", "work"]
+    assert len(list((cache_directory / "scan").iterdir())) == 1
+
+    scanned.clear()
+    runner.invoke(test_app, ["list", "-r", ".", "-t", "todo"])
+    assert scanned == ["home/notes", "work"]
+
+    scanned.clear()
+    runner.invoke(test_app, ["list", "-r", ".", "-s", "DONE"])
+    assert scanned == ["home/notes", "work"]
+
+    os.chdir(repo_tree / "ideas")
+    runner.invoke(test_app, ["add", "Tagged idea.", "-t", "todo"])
+    os.chdir(repo_tree)
+    scanned.clear()
+    result = runner.invoke(test_app, ["list", "-r", ".", "-t", "todo"], env={"COLUMNS": "120"})
+
+    assert scanned == ["home/notes", "ideas", "work"]
+    assert ("ideas", "Tagged idea.") in listed_repositories(result.stdout)
+
+def test_list_recursive_does_not_write_to_scanned_tree(repo_tree, runner, test_app):
+    for lock in repo_tree.rglob(".notes.lock"):
+        lock.unlink()
+    files = sorted(repo_tree.rglob("*"))
+
+    result = runner.invoke(test_app, ["list", "-r", ".", "-t", "todo"], env={"COLUMNS": "120"})
+
+    assert len(listed_repositories(result.stdout)) == 2
+    assert sorted(repo_tree.rglob("*")) == files
+
+def test_list_recursive_parallel(repo_tree, runner, test_app, monkeypatch):
+    from app.core import scanner
+
+    monkeypatch.setattr(scanner, "PARALLEL_REPOSITORIES", 1)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    result = runner.invoke(test_app, ["list", "-r", "."], env={"COLUMNS": "120"})
+
+    assert len(listed_repositories(result.stdout)) == 3
+
+def test_list_recursive_skips_unreadable_repository(repo_tree, runner, test_app):
+    (repo_tree / "broken").mkdir()
+    (repo_tree / "broken" / ".notes").write_text("{not json")
+
+    result = runner.invoke(test_app, ["list", "-r", "."], env={"COLUMNS": "120"})
+
+    assert "Cannot read repository broken." in result.stdout
+    assert len(listed_repositories(result.stdout)) == 3
+
+@pytest.mark.parametrize("args, message", [
+    (["-r", "empty"], "There are no note repositories under empty."),
+    (["-r", "missing"], "Cannot scan missing, it is not a directory."),
+    (["-r", ".", "-s", "URGENT"], "There is no status URGENT in any of the repositories."),
+    (["-r", ".", "-t", "nothing"], "There are no notes matching filter: 'nothing' in repositories under .."),
+    (["-r", ".", "-T"], "You must not use -T, -S nor --format options with --recursive."),
+    (["-r", ".", "-f", "tsv"], "You must not use -T, -S nor --format options with --recursive."),
+])
+def test_list_recursive_invalid(repo_tree, runner, test_app, args, message):
+    result = runner.invoke(test_app, ["list", *args])
+    assert message in result.stdout
@@ -0,0 +1,205 @@
+import os
+import json
+
+import pytest
+
+from app.core import storage, SEGMENTS_DIRNAME
+from app.core.engines import segmented_engine
+from app.core.repository import Repository
+
+COMMANDS = [
+    ["status", "-a", "URGENT", "-p", "5"],
+    ["status", "-a", "DONE", "-p", "-1"],
+    ["add", "First note.", "-t", "alpha"],
+    ["add", "Done note.", "-s", "DONE"],
+    ["add", "Urgent note.", "-s", "URGENT", "-t", "alpha,beta"],
+    ["add", "Second note."],
+    ["add", "Another urgent note.", "-s", "URGENT"],
+    ["status", "-e", "URGENT", "-p", "-1"],
+    ["add", "Third note.", "-t", "beta"],
+    ["delete", "2"],
+    ["status", "-e", "DONE", "-p", "3"],
+    ["status", "-d", "URGENT"],
+    ["add", "Last note.", "-s", "DONE"],
+]
+
+def run_commands(runner, test_app, path, engine):
+    path.mkdir()
+    os.chdir(path)
+    runner.invoke(test_app, ["init", "--engine", engine])
+    for command in COMMANDS:
+        runner.invoke(test_app, command, input="y\n")
+    return storage.load_repository()
+
+def test_init_sqlite(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["init", "--engine", "sqlite"])
+
+    assert result.exit_code == 0
+    assert (tmp_path / ".notes").read_bytes().startswith(b"SQLite format 3")
+
+def test_init_unknown_engine(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["init", "--engine", "unknown"])
+
+    assert result.exit_code == 0
+    assert "Unknown storage engine 'unknown'." in result.stdout
+    assert not (tmp_path / ".notes").exists()
+
+def test_init_binary(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["init", "--engine", "binary"])
+
+    assert result.exit_code == 0
+    assert (tmp_path / ".notes").read_bytes().startswith(b"NOTEBIN")
+
+@pytest.mark.parametrize("engine", ["sqlite", "binary", "segmented"])
+def test_engine_same_results_as_json(tmp_path, runner, test_app, engine):
+    json_repository = run_commands(runner, test_app, tmp_path / "json", "json")
+    engine_repository = run_commands(runner, test_app, tmp_path / engine, engine)
+
+    assert len(json_repository["notes"]) == 6
+    assert engine_repository["notes"] == json_repository["notes"]
+    assert engine_repository["config"] == json_repository["config"]
+
+@pytest.mark.parametrize("engine", ["sqlite", "binary", "segmented"])
+def test_engine_list(tmp_path, runner, test_app, engine):
+    run_commands(runner, test_app, tmp_path / engine, engine)
+    result = runner.invoke(test_app, ["list", "-t", "beta"])
+
+    assert result.exit_code == 0
+    assert "Urgent note." in result.stdout
+    assert "Third note." in result.stdout
+    assert "First note." not in result.stdout
+
+@pytest.mark.parametrize("engine, header", [
+    ("sqlite", b"SQLite format 3"),
+    ("binary", b"NOTEBIN"),
+    ("segmented", b"NOTESEG")
+])
+def test_migrate_and_back(repo_with_notes, runner, test_app, engine, header):
+    with open(repo_with_notes, "r") as file:
+        original = json.load(file)
+
+    result = runner.invoke(test_app, ["migrate", "--engine", engine])
+
+    assert result.exit_code == 0
+    assert f"Migrated repository from json to {engine} storage engine." in result.stdout
+    assert repo_with_notes.read_bytes().startswith(header)
+
+    result = runner.invoke(test_app, ["migrate", "--engine", "json"])
+
+    with open(repo_with_notes, "r") as file:
+        migrated = json.load(file)
+
+    assert result.exit_code == 0
+    assert migrated == original
+
+def test_binary_smaller_than_json(repo_with_notes, runner, test_app):
+    for idx in range(100):
+        runner.invoke(test_app, ["add", f"Note {idx}.", "-t", "mytag,awesome", "-s", "COMPLETED"])
+    json_size = repo_with_notes.stat().st_size
+
+    runner.invoke(test_app, ["migrate", "--engine", "binary"])
+
+    assert repo_with_notes.stat().st_size * 2 < json_size
+
+def test_binary_journal(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", "binary", "--journal"])
+    runner.invoke(test_app, ["add", "Journaled note.", "-t", "log"])
+
+    assert (tmp_path / ".notes.journal").exists()
+    assert storage.load_repository()["notes"][0]["content"] == "Journaled note."
+
+    runner.invoke(test_app, ["compact"])
+
+    assert not (tmp_path / ".notes.journal").exists()
+    assert storage.load_repository()["notes"][0]["tags"] == ["log"]
+
+def test_segmented_small_segments(tmp_path, runner, test_app, monkeypatch):
+    monkeypatch.setattr(segmented_engine, "SEGMENT_SIZE", 2)
+    monkeypatch.setattr(segmented_engine, "PARALLEL_SEGMENTS", 2)
+    json_repository = run_commands(runner, test_app, tmp_path / "json", "json")
+    segmented_repository = run_commands(runner, test_app, tmp_path / "segmented", "segmented")
+
+    assert len(list((tmp_path / "segmented" / SEGMENTS_DIRNAME).iterdir())) > 1
+    assert segmented_repository == json_repository
+
+def test_segmented_session_reads_segments_in_parallel(tmp_path, runner, test_app, monkeypatch):
+    import concurrent.futures
+
+    monkeypatch.setattr(segmented_engine, "SEGMENT_SIZE", 2)
+    monkeypatch.setattr(segmented_engine, "PARALLEL_SEGMENTS", 2)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", "segmented"])
+    for idx in range(6):
+        runner.invoke(test_app, ["add", f"Note {idx}.", "-t", "odd" if idx % 2 else "even"])
+
+    pools = []
+    executor = concurrent.futures.ProcessPoolExecutor
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", lambda: pools.append(1) or executor(2))
+    with Repository(read_only=True) as repo:
+        notes = [note["content"] for note in repo.repository["notes"]]
+
+    assert pools == [1]
+    assert notes == [f"Note {idx}." for idx in range(6)]
+    engine = storage.open_repository()
+    assert [note["content"] for _, note in engine.iter_notes(["odd"])] == ["Note 1.", "Note 3.", "Note 5."]
+    engine.close()
+
+def test_segmented_delete_leaves_tombstone(tmp_path, runner, test_app, monkeypatch):
+    monkeypatch.setattr(segmented_engine, "SEGMENT_SIZE", 4)
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--engine", "segmented"])
+    for idx in range(8):
+        runner.invoke(test_app, ["add", f"Note {idx}."])
+    segments = tmp_path / SEGMENTS_DIRNAME
+    files = sorted(path.name for path in segments.iterdir())
+
+    result = runner.invoke(test_app, ["delete", "6"])
+
+    assert result.exit_code == 0
+    assert sorted(path.name for path in segments.iterdir()) == files
+    assert "Note 5." not in runner.invoke(test_app, ["list"]).stdout
+
+    runner.invoke(test_app, ["delete", "1"])
+    runner.invoke(test_app, ["delete", "2"])
+    runner.invoke(test_app, ["compact"])
+    notes = [note["content"] for note in storage.load_repository()["notes"]]
+
+    assert notes == ["Note 2.", "Note 3.", "Note 4.", "Note 6.", "Note 7."]
+    assert len(list(segments.iterdir())) == 2
+
+def test_migrate_from_segmented_removes_segments(repo_with_notes, runner, test_app):
+    runner.invoke(test_app, ["migrate", "--engine", "segmented"])
+
+    assert (repo_with_notes.parent / SEGMENTS_DIRNAME).exists()
+
+    runner.invoke(test_app, ["migrate", "--engine", "json"])
+
+    assert not (repo_with_notes.parent / SEGMENTS_DIRNAME).exists()
+
+def test_migrate_merges_journal(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    runner.invoke(test_app, ["init", "--journal"])
+    runner.invoke(test_app, ["add", "Journaled note."])
+    result = runner.invoke(test_app, ["migrate", "--engine", "sqlite"])
+
+    assert result.exit_code == 0
+    assert not (tmp_path / ".notes.journal").exists()
+    assert storage.load_repository()["notes"][0]["content"] == "Journaled note."
+
+def test_migrate_same_engine(repo_with_notes, runner, test_app):
+    result = runner.invoke(test_app, ["migrate", "--engine", "json"])
+
+    assert result.exit_code == 0
+    assert "Repository already uses json storage engine." in result.stdout
+
+def test_migrate_repository_not_initialized(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["migrate", "--engine", "sqlite"])
+
+    assert result.exit_code == 0
+    assert "Notes repository does not exist. Run `note init` to initialize repository." in result.stdout
@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from app.core import storage, SEARCH_INDEX_FILENAME
+from app.core.search_index import SearchIndex, Query, open_index
+
+@pytest.fixture
+def repo_with_texts(repo_initialized, runner, test_app):
+    runner.invoke(test_app, ["status", "-a", "DONE", "-p", "-1"])
+    for content, status in [
+        ("Write the quarterly report.", None),
+        ("Report bug, report again.", None),
+        ("Meeting next week about the report.", "DONE"),
+        ("Buy milk.", None),
+        ("Next meeting: plan the week.", None),
+    ]:
+        runner.invoke(test_app, ["add", content] + (["-s", status] if status else []))
+    return repo_initialized
+
+def test_search(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "report"])
+    rows = [line for line in result.stdout.splitlines() if line.startswith("│")]
+
+    assert result.exit_code == 0
+    assert "Buy milk." not in result.stdout
+    assert "Report bug" in rows[0]
+    assert "Meeting next week" in result.stdout
+    assert "quarterly" in result.stdout
+
+def test_search_all_words_required(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "report week"])
+
+    assert "Meeting next week" in result.stdout
+    assert "quarterly" not in result.stdout
+
+def test_search_phrase(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", '"next week"'])
+
+    assert "Meeting next week" in result.stdout
+    assert "plan the week" not in result.stdout
+
+def test_search_prefix(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "meet*"])
+
+    assert "Meeting next week" in result.stdout
+    assert "Next meeting" in result.stdout
+    assert "report" not in result.stdout.lower().replace("meeting next week about the report", "")
+
+def test_search_shows_note_ids(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "milk"])
+    repository = storage.load_repository()
+    note_id = next(note["id"] for note in repository["notes"] if note["content"] == "Buy milk.")
+
+    assert f"│ {note_id} " in result.stdout
+
+def test_search_limit(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "report", "-n", "1"])
+
+    assert "Report bug" in result.stdout
+    assert "quarterly" not in result.stdout
+
+def test_search_no_matches(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "nothing"])
+
+    assert result.exit_code == 0
+    assert "There are no notes matching query: 'nothing' in repository." in result.stdout
+
+def test_search_no_words(repo_with_texts, runner, test_app):
+    result = runner.invoke(test_app, ["search", "..."])
+
+    assert "Search query does not contain any words." in result.stdout
+
+def test_search_index_updated_incrementally(repo_with_texts, runner, test_app):
+    runner.invoke(test_app, ["search", "report"])
+    commands = [
+        ["add", "Urgent report for the board.", "-s", "DONE"],
+        ["delete", "2"],
+        ["status", "-e", "DONE", "-p", "4"],
+        ["add", "Another report."],
+        ["status", "-d", "DONE"],
+    ]
+    for command in commands:
+        runner.invoke(test_app, command, input="y\n")
+        storage_engine = storage.open_repository()
+        index = open_index(storage_engine)
+        storage_engine.close()
+        expected = SearchIndex.build(storage.load_repository()["notes"])
+
+        assert index is not None
+        assert index.search(Query("report")) == expected.search(Query("report"))
+        assert index.search(Query("the")) == expected.search(Query("the"))
+
+    assert (repo_with_texts.parent / SEARCH_INDEX_FILENAME).exists()
+
+def test_search_repository_not_initialized(tmp_path, runner, test_app):
+    os.chdir(tmp_path)
+    result = runner.invoke(test_app, ["search", "note"])
+
+    assert result.exit_code == 0
+    assert "Notes repository does not exist. Run `note init` to initialize repository." in result.stdout
+
+def test_search_all(tmp_path, runner, test_app):
+    for path, contents in [("a", ["Weekly report.", "Buy milk."]), ("b/c", ["Report on the report."])]:
+        (tmp_path / path).mkdir(parents=True)
+        os.chdir(tmp_path / path)
+        runner.invoke(test_app, ["init"])
+        for content in contents:
+            runner.invoke(test_app, ["add", content])
+    os.chdir(tmp_path)
+
+    result = runner.invoke(test_app, ["search", "--all", "report"], env={"COLUMNS": "120"})
+    rows = [line for line in result.stdout.splitlines() if line.startswith("│")]
+
+    assert result.exit_code == 0
+    assert len(rows) == 2
+    assert "b/c" in rows[0] and "Report on the report." in rows[0]
+    assert "a " in rows[1] and "Weekly report." in rows[1]
+
+    result = runner.invoke(test_app, ["search", "-a", '"on the report"', "-n", "1"])
+    assert "Weekly report." not in result.stdout
+
+    result = runner.invoke(test_app, ["search", "-a", "invoice"])
+    assert "There are no notes matching query: 'invoice' in repositories under .." in result.stdout
+
+def test_score_matches_index_scores():
+    from app.core.search_index import score
+
+    notes = [{"content": content} for content in [
+        "Write the quarterly report.", "Report bug, report again.", "Meeting next week about the report.", "Buy milk."
+    ]]
+    index = SearchIndex.build(notes)
+    for text in ["report", "report week", "rep* the", '"the report"']:
+        query = Query(text)
+        frequencies = index.document_frequencies(query)
+        for position, expected in index.search(query):
+            assert score(query, notes[position]["content"], frequencies, index.count, index.total_length) == pytest.approx(expected)
@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import app
+from app.core import SOCKET_FILENAME
+from app.core.engines import snapshot
+from app.core.models import Note
+from app.core.repository import Repository, RepositoryCache
+
+def note_process(args: list[str], cwd: Path, **kwargs):
+    env = dict(os.environ, PYTHONPATH=str(Path(app.__file__).resolve().parents[1]))
+    return subprocess.Popen(
+        [sys.executable, "-c", "from app.cli import app; app()", *args],
+        cwd=cwd, env=env, stdout=subprocess.PIPE, text=True, **kwargs
+    )
+
+@pytest.fixture
+def server(repo_with_notes):
+    """
+    Runs `note serve` for the repository with sample notes.
+
+    Returns:
+        subprocess.Popen: The server process, ready to handle requests.
+    """
+    process = note_process(["serve"], repo_with_notes.parent)
+    assert "Serving notes repository" in process.stdout.readline()
+    yield process
+    if process.poll() is None:
+        process.terminate()
+        process.wait(10)
+    process.stdout.close()
+
+@pytest.fixture
+def no_local_sessions(monkeypatch):
+    """
+    Makes commands fail if they open the repository themselves instead of
+    sending requests to the server.
+    """
+    def fail(self):
+        raise AssertionError("Repository opened by the client.")
+    monkeypatch.setattr(Repository, "__enter__", fail)
+
+def test_serve_handles_commands(runner, test_app, repo_with_notes, server, no_local_sessions):
+    result = runner.invoke(test_app, ["add", "Served note.", "-t", "served", "-s", "COMPLETED"])
+    assert result.exit_code == 0
+    assert result.stdout == ""
+
+    result = runner.invoke(test_app, ["list", "-t", "served"])
+    assert result.exit_code == 0
+    assert "Served note." in result.stdout
+    assert "New note." not in result.stdout
+
+    result = runner.invoke(test_app, ["delete", "1"])
+    assert result.exit_code == 0
+
+    with open(repo_with_notes) as file:
+        notes = json.load(file)["notes"]
+    assert [note["content"] for note in notes] == ["Another note.", "Served note."]
+    assert notes[1]["id"] == 3
+
+def test_serve_handles_machine_readable_output(runner, test_app, server, no_local_sessions):
+    result = runner.invoke(test_app, ["list", "-f", "ndjson", "-s", "COMPLETED"])
+    assert result.exit_code == 0
+    assert [json.loads(line)["content"] for line in result.stdout.splitlines()] == ["Another note."]
+
+    result = runner.invoke(test_app, ["list", "-f", "plain", "-T"])
+    assert result.stdout == "mytag\nawesome\n"
+
+def test_serve_reports_errors(runner, test_app, server, no_local_sessions):
+    result = runner.invoke(test_app, ["list", "-s", "MISSING"])
+    assert result.exit_code == 0
+    assert "There is no status MISSING" in result.stdout
+
+    result = runner.invoke(test_app, ["delete", "10"])
+    assert "There is no note with id 10" in result.stdout
+
+def test_serve_reloads_repository_changed_by_other_commands(runner, test_app, repo_with_notes, server):
+    with open(repo_with_notes) as file:
+        repository = json.load(file)
+    repository["notes"].append({"content": "Written by hand.", "tags": None, "status": None, "id": 3})
+    repository["config"]["next_id"] = 4
+    with open(repo_with_notes, "w") as file:
+        json.dump(repository, file)
+
+    result = runner.invoke(test_app, ["list"])
+    assert "Written by hand." in result.stdout
+
+def test_serve_already_running(repo_with_notes, server):
+    process = note_process(["serve"], repo_with_notes.parent)
+    output, _ = process.communicate(timeout=10)
+    assert "A note server is already running" in output
+    assert server.poll() is None
+
+def test_serve_stop(runner, test_app, repo_with_notes, server):
+    result = runner.invoke(test_app, ["serve", "--stop"])
+    assert result.exit_code == 0
+    assert server.wait(10) == 0
+    assert not (repo_with_notes.parent / SOCKET_FILENAME).exists()
+
+    result = runner.invoke(test_app, ["serve", "--stop"])
+    assert "There is no note server running" in result.stdout
+
+    result = runner.invoke(test_app, ["list"])
+    assert "New note." in result.stdout
+
+def test_serve_stopped_by_sigterm(repo_with_notes, server):
+    server.terminate()
+    assert server.wait(10) == 0
+    assert not (repo_with_notes.parent / SOCKET_FILENAME).exists()
+
+def test_serve_cache_kept_through_journal_compaction(repo_with_notes, monkeypatch):
+    with open(repo_with_notes) as file:
+        repository = json.load(file)
+    repository["config"]["journal"] = True
+    with open(repo_with_notes, "w") as file:
+        json.dump(repository, file)
+    monkeypatch.setattr(snapshot, "JOURNAL_COMPACTION_SIZE", 200)
+
+    cache = RepositoryCache()
+    with Repository(read_only=True, cache=cache) as repo:
+        repo.repository
+    for idx in range(5):
+        with Repository(cache=cache) as repo:
+            repo.add_note(Note.create(f"Cached note {idx}."))
+        assert cache.repository is not None
+
+    with Repository(read_only=True) as repo:
+        contents = [note["content"] for note in repo.repository["notes"]]
+    assert contents == ["New note."] + [f"Cached note {idx}." for idx in range(5)] + ["Another note."]
+
+def test_serve_socket_only_for_owner(repo_with_notes, server):
+    assert (repo_with_notes.parent / SOCKET_FILENAME).stat().st_mode & 0o777 == 0o600
+
+def test_serve_requests_do_not_replace_console(repo_with_notes):
+    import rich
+    from app.core.server import NoteServer
+
+    file = rich.get_console().file
+    response = NoteServer().handle({"method": "list_notes", "args": [], "terminal": {"width": 120}})
+
+    assert "New note." in response["output"]
+    assert response["error"] is None
+    assert rich.get_console().file is file
+
+def test_serve_cache_keeps_tag_index_until_changed(repo_with_notes, capsys):
+    cache = RepositoryCache()
+    with Repository(read_only=True, cache=cache) as repo:
+        repo.repository
+        repo.list_notes(where="tag:awesome")
+    index = cache.index
+    assert index is not None
+
+    with Repository(read_only=True, cache=cache) as repo:
+        repo.list_notes(where="NOT tag:awesome")
+    assert cache.index is index
+
+    with Repository(cache=cache) as repo:
+        repo.add_note(Note.create("Awesome note.", ["awesome"]))
+    assert cache.index is None
+    capsys.readouterr()
+
+    with Repository(read_only=True, cache=cache) as repo:
+        repo.list_notes(where="tag:awesome")
+    output = capsys.readouterr().out
+    assert "Awesome note." in output and "Another note." in output and "New note." not in output
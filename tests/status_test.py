@@ -70,4 +70,33 @@ def test_status_exactly_one_option_valid(repo_initialized, runner, test_app):
     result = runner.invoke(test_app, ["status", "-a", "NEW_STATUS", "-d", "OLD_STATUS"])
 
     assert result.exit_code == 0
-    assert "You must use exactly one of --add, --edit or --delete." in result.stdout
\ No newline at end of file
+    assert "You must use exactly one of --add, --edit or --delete." in result.stdout
+
+def test_status_changes_keep_stable_sort_order(repo_initialized, runner, test_app):
+    commands = [
+        ["status", "-a", "LOW", "-p", "-1"],
+        ["status", "-a", "HIGH", "-p", "2"],
+        ["status", "-a", "OTHER", "-p", "2"],
+        ["add", "First."],
+        ["add", "Second.", "-s", "HIGH"],
+        ["add", "Third.", "-s", "LOW"],
+        ["add", "Fourth.", "-s", "OTHER"],
+        ["add", "Fifth.", "-s", "HIGH"],
+        ["status", "-e", "HIGH", "-p", "-1"],
+        ["add", "Sixth.", "-s", "LOW"],
+        ["status", "-e", "LOW", "-p", "2"],
+        ["status", "-d", "OTHER"],
+        ["status", "-e", "HIGH", "-p", "5"],
+    ]
+    expected = []
+    for command in commands:
+        runner.invoke(test_app, command, input="y\n")
+        with open(repo_initialized, "r") as file:
+            repository = json.load(file)
+        statuses = repository["config"]["statuses"]
+        if command[0] == "add":
+            expected.append(repository["notes"][[note["content"] for note in repository["notes"]].index(command[1])])
+        expected = [next(note for note in repository["notes"] if note["content"] == old["content"]) for old in expected]
+        expected.sort(key=lambda note: 0 if note["status"] is None else -statuses[note["status"]]["priority"])
+
+        assert repository["notes"] == expected